@@ -3,18 +3,70 @@ Copyright (c) 2022
 """
 
 import os
+import random
 import struct
 import errno
-
-from typing import List, Optional, Type
+import time
+
+from contextlib import contextmanager, ExitStack, nullcontext
+from typing import (
+    ContextManager,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+)
 from types import TracebackType
 from cc1101.config import RXConfig, TXConfig, CONFIG_SIZE
 from cc1101 import ioctl
+from cc1101.batch import PacketBatch
 from cc1101.errors import DeviceError, DeviceException
+from cc1101.filters import PacketFilter
+from cc1101.profile import Hook, Stage
+from cc1101.stats import RadioStats
+from cc1101.trace import DEFAULT_TRACE_SIZE, Opcode, TraceRing
 
 # CC1101 datasheet Table 31
 RSSI_OFFSET = 74
 
+_NO_HOOKS = nullcontext()
+
+
+def rssi_to_dbm(rssi_dec: int) -> float:
+    """Convert a raw RSSI register value to dBm"""
+    # Formula from CC1101 datasheet section 17.3
+    if rssi_dec >= 128:
+        return (int(rssi_dec) - 256) / 2 - RSSI_OFFSET
+    else:
+        return int(rssi_dec) / 2 - RSSI_OFFSET
+
+
+def dbm_to_rssi(rssi_dbm: float) -> int:
+    """Convert an RSSI in dBm to the raw register value"""
+    return round((rssi_dbm + RSSI_OFFSET) * 2) & 0xFF
+
+
+@contextmanager
+def _run_hooks(hooks: List[Hook], stage: Stage) -> Iterator[None]:
+    """Run each hook's context manager around a stage"""
+    with ExitStack() as stack:
+        for hook in hooks:
+            stack.enter_context(hook(stage))
+        yield
+
+
+class LBTResult(NamedTuple):
+    """Outcome of a listen before talk transmission"""
+
+    transmitted: bool
+    # Time from the first RSSI sample until the channel was clear, or until giving up (s)
+    busy_time: float
+    samples: int
+    # Last sampled RSSI (dBm)
+    rssi: float
+
 
 class CC1101Handle:
     """Class to hold a file handle to a CC1101 device"""
@@ -50,11 +102,23 @@ class CC1101:
     dev: str
     rx_config: Optional[RXConfig] = None
     handle: Optional[CC1101Handle] = None
+    stats: RadioStats
+    trace: TraceRing
+    trace_path: Optional[str] = None
+    hooks: List[Hook]
+    packet_filter: Optional[PacketFilter] = None
 
     def __init__(
-        self, dev: str, rx_config: Optional[RXConfig] = None, blocking: bool = False
+        self,
+        dev: str,
+        rx_config: Optional[RXConfig] = None,
+        blocking: bool = False,
+        trace_size: int = DEFAULT_TRACE_SIZE,
     ):
         self.dev = dev
+        self.stats = RadioStats()
+        self.trace = TraceRing(trace_size)
+        self.hooks = []
 
         if blocking:
             self.handle = CC1101Handle(self._open(), True)
@@ -67,19 +131,26 @@ class CC1101:
             self.handle.close()
 
     def _open(self) -> int:
-        if not os.path.exists(self.dev):
-            raise OSError(f"{self.dev} does not exist")
+        with self.stage(Stage.OPEN):
+            if not os.path.exists(self.dev):
+                raise OSError(f"{self.dev} does not exist")
 
-        fh = os.open(self.dev, os.O_RDWR)
+            start = time.perf_counter_ns()
+            fh = os.open(self.dev, os.O_RDWR)
+            self.trace.record(
+                Opcode.OPEN, -1, 0, 0, start, time.perf_counter_ns() - start
+            )
 
-        version = bytearray(4)
-        ioctl.read(fh, ioctl.IOCTL.GET_VERSION, version)
-        (version,) = struct.unpack("I", version)
+            version = bytearray(4)
+            self._ioctl_read(fh, ioctl.IOCTL.GET_VERSION, version)
+            (version,) = struct.unpack("I", version)
 
-        if version != self.VERSION:
-            raise OSError(f"Version mismatch - got {version}, expected {self.VERSION}")
+            if version != self.VERSION:
+                raise OSError(
+                    f"Version mismatch - got {version}, expected {self.VERSION}"
+                )
 
-        return fh
+            return fh
 
     def _get_handle(self) -> CC1101Handle:
 
@@ -88,15 +159,84 @@ class CC1101:
         else:
             return self.handle
 
+    def add_hook(self, hook: Hook) -> None:
+        """Register a hook to run around each stage
+
+        A hook is called with the Stage being entered and returns a context manager that is
+        entered for the duration of the stage.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Unregister a hook"""
+        self.hooks.remove(hook)
+
+    def stage(self, stage: Stage) -> ContextManager[None]:
+        """Get a context manager running the registered hooks around a stage"""
+        if len(self.hooks) == 0:
+            return _NO_HOOKS
+        elif len(self.hooks) == 1:
+            return self.hooks[0](stage)
+        else:
+            return _run_hooks(self.hooks, stage)
+
+    def _device_error(self, e: DeviceException) -> None:
+        """Record a device error, dumping the trace if a path is set"""
+        self.stats.record_error(e.error)
+
+        if self.trace_path is not None:
+            self.trace.dump(self.trace_path)
+
+    def _record_ioctl(
+        self, command: ioctl.IOCTL, size: int, err: int, start: int
+    ) -> None:
+        """Record the latency of an IOCTL in the stats and trace"""
+        duration = time.perf_counter_ns() - start
+        self.stats.record_ioctl(command, duration / 1e9)
+        self.trace.record(Opcode.IOCTL, command, size, err, start, duration)
+
+    def _ioctl_call(self, fh: int, command: ioctl.IOCTL) -> None:
+        """Call a driver function, recording latency and errors"""
+        start = time.perf_counter_ns()
+        try:
+            ioctl.call(fh, command)
+        except DeviceException as e:
+            self._record_ioctl(command, 0, e.errno, start)
+            self._device_error(e)
+            raise
+        self._record_ioctl(command, 0, 0, start)
+
+    def _ioctl_write(self, fh: int, command: ioctl.IOCTL, data: bytearray) -> None:
+        """Write data to the driver, recording latency and errors"""
+        start = time.perf_counter_ns()
+        try:
+            ioctl.write(fh, command, data)
+        except DeviceException as e:
+            self._record_ioctl(command, len(data), e.errno, start)
+            self._device_error(e)
+            raise
+        self._record_ioctl(command, len(data), 0, start)
+
+    def _ioctl_read(self, fh: int, command: ioctl.IOCTL, out: bytearray) -> None:
+        """Read data from the driver, recording latency and errors"""
+        start = time.perf_counter_ns()
+        try:
+            ioctl.read(fh, command, out)
+        except DeviceException as e:
+            self._record_ioctl(command, len(out), e.errno, start)
+            self._device_error(e)
+            raise
+        self._record_ioctl(command, len(out), 0, start)
+
     def reset(self) -> None:
         """Reset the CC1101 device"""
         with self._get_handle() as fh:
-            ioctl.call(fh, ioctl.IOCTL.RESET)
+            self._ioctl_call(fh, ioctl.IOCTL.RESET)
 
     def set_tx_config(self, tx_config: TXConfig) -> None:
         """Set the device transmit configuration"""
         with self._get_handle() as fh:
-            ioctl.write(fh, ioctl.IOCTL.SET_TX_CONF, tx_config.to_bytes())
+            self._ioctl_write(fh, ioctl.IOCTL.SET_TX_CONF, tx_config.to_bytes())
 
     def set_rx_config(self, rx_config: RXConfig) -> None:
         """Set the device receive configuration"""
@@ -112,57 +252,256 @@ class CC1101:
                 # If the config on the device differs (i.e it has been reconfigured from under us)
                 if rx_config.to_bytes() != device_config:
                     # Reconfigure the device
+                    self.stats.reconfigurations += 1
                     with self._get_handle() as fh:
-                        ioctl.write(
+                        self._ioctl_write(
                             fh, ioctl.IOCTL.SET_RX_CONF, self.rx_config.to_bytes()
                         )
 
         # Otherwise, update the stored config and reconfigure the device
         else:
             self.rx_config = rx_config
+            self.stats.reconfigurations += 1
             with self._get_handle() as fh:
-                ioctl.write(fh, ioctl.IOCTL.SET_RX_CONF, self.rx_config.to_bytes())
+                self._ioctl_write(
+                    fh, ioctl.IOCTL.SET_RX_CONF, self.rx_config.to_bytes()
+                )
+
+    def switch_rx_config(self, rx_config: RXConfig, config_bytes: bytearray) -> None:
+        """Set the device receive configuration from struct bytes serialized in advance
+
+        Unlike set_rx_config, the new config isn't serialized or compared with the current
+        config, so switching between known configs only costs the IOCTL.
+        """
+        self.rx_config = rx_config
+        self.stats.reconfigurations += 1
+        with self._get_handle() as fh:
+            self._ioctl_write(fh, ioctl.IOCTL.SET_RX_CONF, config_bytes)
+
+    def _write(self, fh: int, packet: bytes) -> None:
+        """Write a packet to transmit to the driver, recording it in the trace"""
+        start = time.perf_counter_ns()
+        try:
+            os.write(fh, packet)
+        except OSError as e:
+            self.trace.record(
+                Opcode.WRITE,
+                -1,
+                len(packet),
+                e.errno or 0,
+                start,
+                time.perf_counter_ns() - start,
+            )
+            raise
+        self.trace.record(
+            Opcode.WRITE, -1, len(packet), 0, start, time.perf_counter_ns() - start
+        )
 
     def transmit(self, tx_config: TXConfig, packet: bytes) -> None:
         """Transmit a sequence of bytes using a TX configuration"""
-        with self._get_handle() as fh:
-            ioctl.write(fh, ioctl.IOCTL.SET_TX_CONF, tx_config.to_bytes())
-            os.write(fh, packet)
+        with self.stage(Stage.TRANSMIT), self._get_handle() as fh:
+            self._ioctl_write(fh, ioctl.IOCTL.SET_TX_CONF, tx_config.to_bytes())
+            self._write(fh, packet)
+
+    def transmit_batch(
+        self,
+        tx_config: TXConfig,
+        packets: Sequence[bytes],
+        times: Optional[Sequence[int]] = None,
+    ) -> List[int]:
+        """Transmit packets using a TX configuration, configuring the device once
+
+        The device handle is held for the whole batch. If times are given, each packet is
+        transmitted no earlier than its time in ns after the first, otherwise packets are
+        transmitted as fast as possible. Returns the time each transmission started, in
+        ns after the first.
+        """
+        sent = []
+
+        with self.stage(Stage.TRANSMIT), self._get_handle() as fh:
+            self._ioctl_write(fh, ioctl.IOCTL.SET_TX_CONF, tx_config.to_bytes())
+            start = time.perf_counter_ns()
+
+            for i, packet in enumerate(packets):
+                if times is not None:
+                    delay = start + times[i] - time.perf_counter_ns()
+                    if delay > 0:
+                        time.sleep(delay / 1e9)
+
+                sent.append(time.perf_counter_ns() - start)
+                self._write(fh, packet)
+
+        return sent
+
+    def transmit_configs(
+        self, configs: Sequence[bytearray], packets: Sequence[bytes]
+    ) -> List[int]:
+        """Transmit each packet with its own TX config, as struct bytes serialized in advance
+
+        The device handle is held for all packets, so each packet only costs the config
+        IOCTL and the write. Returns the time taken to set each config in ns.
+        """
+        config_times = []
+
+        with self.stage(Stage.TRANSMIT), self._get_handle() as fh:
+            for config_bytes, packet in zip(configs, packets):
+                start = time.perf_counter_ns()
+                self._ioctl_write(fh, ioctl.IOCTL.SET_TX_CONF, config_bytes)
+                config_times.append(time.perf_counter_ns() - start)
+                self._write(fh, packet)
+
+        return config_times
+
+    def transmit_lbt(
+        self,
+        tx_config: TXConfig,
+        packet: bytes,
+        threshold_dbm: float,
+        max_wait: float = 1.0,
+        backoff: float = 0.005,
+    ) -> LBTResult:
+        """Transmit a packet once the channel is clear (listen before talk)
+
+        The TX config is set and the RSSI is sampled with the handle held, so the packet is
+        written as soon as a sample is below threshold_dbm. After each busy sample, waits a
+        random time of up to backoff seconds, so senders don't retry in step. Gives up
+        without transmitting if the channel is still busy after max_wait seconds.
+
+        The RSSI is measured with the RX config, so a ValueError is raised unless it is on
+        the TX frequency.
+        """
+        tx_frequency = tx_config.get_common_config().get_frequency()
+        if (
+            self.rx_config is None
+            or self.rx_config.get_common_config().get_frequency() != tx_frequency
+        ):
+            raise ValueError(f"RX config is not on the TX frequency {tx_frequency} MHz")
+
+        config_bytes = tx_config.to_bytes()
+        samples = 0
+
+        with self.stage(Stage.TRANSMIT), self._get_handle() as fh:
+            self._ioctl_write(fh, ioctl.IOCTL.SET_TX_CONF, config_bytes)
+
+            start = time.perf_counter()
+            deadline = start + max_wait
+
+            while True:
+                rssi = self._read_rssi(fh)
+                samples += 1
+                end = time.perf_counter()
+
+                if rssi < threshold_dbm:
+                    self._write(fh, packet)
+                    transmitted = True
+                    break
+
+                if end >= deadline:
+                    transmitted = False
+                    break
+
+                time.sleep(random.uniform(0, backoff))
+
+        busy_time = end - start if samples > 1 else 0.0
+        self.stats.record_lbt(busy_time, transmitted)
+
+        return LBTResult(transmitted, busy_time, samples, rssi)
 
     def receive(self) -> List[bytes]:
         """Read a sequence of packets from the device's receive buffer"""
+        return self.receive_batch().packets
+
+    def receive_batch(self, read_rssi: bool = False) -> PacketBatch:
+        """Read a sequence of packets from the device's receive buffer with the drain time
+
+        If packet_filter is set, packets failing it are dropped from the batch. The RSSI is
+        sampled after a non-empty drain if read_rssi is set or the filter has an RSSI
+        threshold.
+        """
 
         if self.rx_config is not None:
-            self.set_rx_config(self.rx_config)
+            with self.stage(Stage.CONFIG_CHECK):
+                self.set_rx_config(self.rx_config)
             packets = []
 
-            with self._get_handle() as fh:
+            with self.stage(Stage.DRAIN), self._get_handle() as fh:
                 while True:
+                    start = time.perf_counter_ns()
                     try:
                         packets.append(os.read(fh, self.rx_config.packet_length))
                     except OSError as e:
+                        self.trace.record(
+                            Opcode.READ,
+                            -1,
+                            self.rx_config.packet_length,
+                            e.errno or 0,
+                            start,
+                            time.perf_counter_ns() - start,
+                        )
+
                         if e.errno == errno.ENOMSG:
-                            return packets
+                            self.stats.record_drain(
+                                len(packets), self.rx_config.packet_length
+                            )
+                            timestamp = time.monotonic_ns()
+
+                            rssi = None
+                            packet_filter = self.packet_filter
+                            if packets and (
+                                read_rssi
+                                or (
+                                    packet_filter is not None
+                                    and packet_filter.min_rssi is not None
+                                )
+                            ):
+                                rssi = self._read_rssi(fh)
+
+                            indices = None
+                            drained = len(packets)
+                            if packet_filter is not None:
+                                indices = packet_filter.select(packets, rssi)
+                                packets = [packets[i] for i in indices]
+
+                            return PacketBatch(
+                                packets,
+                                self.rx_config.packet_length,
+                                timestamp,
+                                rssi,
+                                indices,
+                                drained,
+                            )
                         elif e.errno == errno.EMSGSIZE:
-                            raise DeviceException(DeviceError.PACKET_SIZE)
+                            error = DeviceException(DeviceError.PACKET_SIZE, e.errno)
+                            self._device_error(error)
+                            raise error
                         elif e.errno == errno.EFAULT:
-                            raise DeviceException(DeviceError.COPY)
+                            error = DeviceException(DeviceError.COPY, e.errno)
+                            self._device_error(error)
+                            raise error
+                    else:
+                        self.trace.record(
+                            Opcode.READ,
+                            -1,
+                            self.rx_config.packet_length,
+                            0,
+                            start,
+                            time.perf_counter_ns() - start,
+                        )
 
         raise IOError("RX config not set")
 
     def get_rssi(self) -> float:
         """Read the current RSSI value from the device"""
+        with self._get_handle() as fh:
+            return self._read_rssi(fh)
+
+    def _read_rssi(self, fh: int) -> float:
+        """Read the current RSSI value using an open handle"""
         rssi_byte = bytearray(1)
-        self._ioctl(ioctl.IOCTL.GET_RSSI, rssi_byte)
+        self._ioctl_read(fh, ioctl.IOCTL.GET_RSSI, rssi_byte)
         (rssi_dec,) = struct.unpack("B", rssi_byte)
 
-        # Formula from CC1101 datasheet section 17.3
-        if rssi_dec >= 128:
-            rssi_dbm = (int(rssi_dec) - 256) / 2 - RSSI_OFFSET
-        else:
-            rssi_dbm = int(rssi_dec) / 2 - RSSI_OFFSET
-
-        return rssi_dbm
+        return rssi_to_dbm(rssi_dec)
 
     def get_max_packet_size(self) -> int:
         """Read the configured maximum packet size from the driver"""
@@ -175,7 +514,7 @@ class CC1101:
     def _ioctl(self, command: ioctl.IOCTL, out: bytearray) -> None:
         """Helper to read a device config"""
         with self._get_handle() as fh:
-            return ioctl.read(fh, command, out)
+            return self._ioctl_read(fh, command, out)
 
     def get_device_config(self) -> bytes:
         """Get the current device configuration registers as a sequence of bytes"""
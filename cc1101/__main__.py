@@ -4,11 +4,27 @@ Copyright (c) 2022
 
 import argparse
 import sys
-import time
 
 from binascii import hexlify, unhexlify
+from contextlib import contextmanager, ExitStack
+from typing import BinaryIO, Iterator, List, Optional, Union
 
 from . import config, CC1101
+from .batch import packet_duration
+from .capture import CaptureReader, CaptureWriter, is_capture
+from .errors import ConfigException
+from .exporter import MetricsExporter
+from .filters import PacketFilter
+from .output import DEFAULT_FLUSH_INTERVAL, DEFAULT_QUEUE_SIZE, DropPolicy, OutputWriter
+from .parallel import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, decode_file, registry
+from .pcapng import PcapngWriter
+from .poll import AdaptivePoller
+from .profile import Stage, StageProfiler
+from .protocols import PROTOCOLS
+from .replay import load as load_replay, replay as replay_packets
+from .server import DEFAULT_SOCKET, RadioServer
+from .sinks import JsonSink, MsgpackSink, RecordSink
+from .trace import format_timeline, load as load_trace
 
 
 def tx(args: argparse.Namespace) -> None:
@@ -54,8 +70,8 @@ def tx(args: argparse.Namespace) -> None:
         config.print_raw_config(cc1101.get_device_config())
 
 
-def rx(args: argparse.Namespace) -> None:
-    """Handle the rx subcommand"""
+def rx_config_from_args(args: argparse.Namespace) -> config.RXConfig:
+    """Construct a RXConfig from the common RX arguments"""
 
     modulation = config.Modulation(args.modulation)
     frequency = float(args.frequency)
@@ -79,67 +95,409 @@ def rx(args: argparse.Namespace) -> None:
         carrier_sense_mode = config.CarrierSenseMode.ABSOLUTE
         carrier_sense = int(args.carrier_sense)
 
+    return config.RXConfig.new(
+        frequency,
+        modulation,
+        baud_rate,
+        packet_size,
+        bandwidth=args.bandwidth,
+        magn_target=args.magn_target,
+        max_lna_gain=args.max_lna_gain,
+        max_dvga_gain=args.max_dvga_gain,
+        carrier_sense_mode=carrier_sense_mode,
+        carrier_sense=carrier_sense,
+        deviation=args.deviation,
+        sync_word=sync_word,
+    )
+
+
+def rx(args: argparse.Namespace) -> None:
+    """Handle the rx subcommand"""
+
     try:
-        rx_config = config.RXConfig.new(
-            frequency,
-            modulation,
-            baud_rate,
-            packet_size,
-            bandwidth=args.bandwidth,
-            magn_target=args.magn_target,
-            max_lna_gain=args.max_lna_gain,
-            max_dvga_gain=args.max_dvga_gain,
-            carrier_sense_mode=carrier_sense_mode,
-            carrier_sense=carrier_sense,
-            deviation=args.deviation,
-            sync_word=sync_word,
-        )
+        rx_config = rx_config_from_args(args)
     except ValueError as e:
         print(f"Error: {e}")
         return
 
+    try:
+        packet_filter = parse_filter(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    if args.out_format == "cap" and args.output is None:
+        print("Error: --output is required for the cap format")
+        return
+
     cc1101 = CC1101(args.device, rx_config, args.block)
+    cc1101.packet_filter = packet_filter
+
+    if args.trace is not None:
+        cc1101.trace_path = args.trace
+        cc1101.trace.install_signal_handler(args.trace)
 
     if args.print_registers:
         config.print_raw_config(cc1101.get_device_config())
 
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler()
+        cc1101.add_hook(profiler)
+
     if not args.config_only:
-        count = 1
-        min_rssi = None
-        max_rssi = None
+        try:
+            receive_loop(cc1101, args)
+        finally:
+            if profiler is not None:
+                print("\n".join(profiler.report()), file=sys.stderr)
+
+            if packet_filter is not None:
+                print(f"Filter passed {packet_filter.passed} packets", file=sys.stderr)
+                for name, count in packet_filter.dropped.items():
+                    print(f"Filter {name} dropped {count} packets", file=sys.stderr)
+
+
+def parse_filter(args: argparse.Namespace) -> Optional[PacketFilter]:
+    """Construct the packet filter from the --filter arguments"""
+
+    if args.filter is None:
+        return None
+
+    return PacketFilter.parse(args.filter)
+
+
+def receive_loop(cc1101: CC1101, args: argparse.Namespace) -> None:
+    """Receive and output packets until interrupted"""
+
+    count = 1
+    min_rssi = None
+    max_rssi = None
+
+    print("Receiving Packets", file=sys.stderr)
+    while True:
+        if args.out_format == "rssi":
+            rssi = cc1101.get_rssi()
+
+            if min_rssi is None or rssi < min_rssi:
+                min_rssi = rssi
+
+            if max_rssi is None or rssi > max_rssi:
+                max_rssi = rssi
+
+            output = f"\rCurrent: {rssi} dB / Min: {min_rssi} dB / Max: {max_rssi} dB"
+            sys.stdout.write("\r" + " " * count)
+            sys.stdout.write("\r" + output)
+            count = len(output)
+        elif args.out_format == "cap":
+            capture_loop(cc1101, args)
+        elif args.out_format in ["pcapng", "jsonl", "msgpack"]:
+            sink_loop(cc1101, args)
+        else:
+            output_loop(cc1101, args)
+
+
+@contextmanager
+def output_writer(args: argparse.Namespace) -> Iterator[OutputWriter]:
+    """Write to stdout from a thread, reporting dropped output on exit"""
+
+    output = OutputWriter(
+        sys.stdout.buffer,
+        args.queue_size,
+        args.drop_policy,
+        flush_interval=args.flush_interval,
+    )
+
+    try:
+        yield output
+    finally:
+        output.close()
 
-        print("Receiving Packets", file=sys.stderr)
+        if output.dropped > 0:
+            print(f"Output dropped {output.dropped} packets", file=sys.stderr)
+
+
+def output_loop(cc1101: CC1101, args: argparse.Namespace) -> None:
+    """Receive and output packets as hex, info or binary until interrupted"""
+
+    count = 1
+    poller = AdaptivePoller.for_radio(cc1101)
+
+    with output_writer(args) as output:
         while True:
-            if args.out_format == "rssi":
-                rssi = cc1101.get_rssi()
-
-                if min_rssi is None or rssi < min_rssi:
-                    min_rssi = rssi
-
-                if max_rssi is None or rssi > max_rssi:
-                    max_rssi = rssi
-
-                output = (
-                    f"\rCurrent: {rssi} dB / Min: {min_rssi} dB / Max: {max_rssi} dB"
-                )
-                sys.stdout.write("\r" + " " * count)
-                sys.stdout.write("\r" + output)
-                count = len(output)
-            else:
-                for packet in cc1101.receive():
-                    if args.out_format in ["hex", "info"]:
+            batch = cc1101.receive_batch()
+            packets = batch.packets
+
+            with cc1101.stage(Stage.DELIVER):
+                if args.out_format == "hex":
+                    output.put([hexlify(packet) + b"\n" for packet in packets])
+
+                elif args.out_format == "info":
+                    lines = []
+                    for packet in packets:
                         packet_hex = hexlify(packet).decode("ascii")
+                        line = f"[{count} - {cc1101.get_rssi()} dB] {packet_hex}\n"
+                        lines.append(line.encode("ascii"))
+                        count += 1
+                    output.put(lines)
+
+                else:
+                    output.put(packets)
+
+            poller.wait(batch.drained)
+
+
+def capture_loop(cc1101: CC1101, args: argparse.Namespace) -> None:
+    """Receive packets into capture files until interrupted"""
+
+    assert cc1101.rx_config is not None
+    poller = AdaptivePoller.for_radio(cc1101)
+
+    with CaptureWriter(
+        args.output,
+        cc1101.rx_config,
+        args.rotate_size,
+        args.rotate_interval,
+    ) as writer:
+        try:
+            while True:
+                batch = cc1101.receive_batch(read_rssi=True)
+
+                with cc1101.stage(Stage.DELIVER):
+                    writer.write_batch(batch)
+
+                poller.wait(batch.drained)
+        finally:
+            print(
+                f"Captured {writer.records} packets to {', '.join(writer.files)}",
+                file=sys.stderr,
+            )
+
+
+def sink_loop(cc1101: CC1101, args: argparse.Namespace) -> None:
+    """Receive packets into a pcapng, jsonl or msgpack file or stdout until interrupted"""
+
+    rx_config = cc1101.rx_config
+    assert rx_config is not None
+
+    protocol_registry = None
+    if args.protocol is not None:
+        _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+        protocol_registry = registry(
+            baud_rate,
+            args.protocol,
+            packet_duration(rx_config.packet_length, baud_rate),
+        )
+
+    with ExitStack() as stack:
+        f: BinaryIO
+        if args.output is not None:
+            f = stack.enter_context(open(args.output, "wb"))
+        else:
+            f = stack.enter_context(output_writer(args))  # type: ignore
+
+        writer: Union[PcapngWriter, RecordSink]
+        if args.out_format == "pcapng":
+            writer = PcapngWriter(f, rx_config, cc1101.dev)
+        elif args.out_format == "jsonl":
+            writer = JsonSink(f, rx_config, cc1101.dev)
+        else:
+            writer = MsgpackSink(f, rx_config, cc1101.dev)
+
+        poller = AdaptivePoller.for_radio(cc1101)
+        while True:
+            batch = cc1101.receive_batch(read_rssi=True)
+
+            with cc1101.stage(Stage.DELIVER):
+                if protocol_registry is not None:
+                    assert isinstance(writer, RecordSink)
+                    writer.write_batch(batch, protocol_registry.feed(batch))
+                else:
+                    writer.write_batch(batch)
+                writer.flush()
+
+            poller.wait(batch.drained)
+
+
+def exporter(args: argparse.Namespace) -> None:
+    """Handle the exporter subcommand"""
+
+    try:
+        rx_config = rx_config_from_args(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    radios = [CC1101(device, rx_config, args.block) for device in args.device]
 
-                        if args.out_format == "info":
-                            print(f"[{count} - {cc1101.get_rssi()} dB] {packet_hex}")
-                        else:
-                            print(packet_hex)
+    try:
+        for radio in radios:
+            radio.packet_filter = parse_filter(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(
+        f"Serving metrics on http://{args.address}:{args.port}/metrics",
+        file=sys.stderr,
+    )
+    MetricsExporter(radios).serve(args.address, args.port)
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Handle the serve subcommand"""
+
+    try:
+        rx_config = rx_config_from_args(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    # The devices are held open while serving
+    radios = [CC1101(device, rx_config, True) for device in args.device]
+
+    try:
+        for radio in radios:
+            radio.packet_filter = parse_filter(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"Serving {', '.join(args.device)} on {args.socket}", file=sys.stderr)
+    RadioServer(radios, args.queue_size, args.drop_policy).serve(args.socket)
+
+
+def decode(args: argparse.Namespace) -> None:
+    """Handle the decode subcommand"""
+
+    protocols = args.protocol
+    if protocols is None:
+        protocols = [p.name for p in PROTOCOLS]
+
+    if is_capture(args.file):
+        decode_capture(args, protocols)
+        return
+
+    if args.baud_rate is None:
+        print("Error: baud_rate is required for a capture without a header")
+        return
+
+    try:
+        messages = decode_file(
+            args.file,
+            args.baud_rate,
+            protocols,
+            args.packet_size,
+            args.processes,
+            args.chunk_size,
+            args.overlap,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    # Frame end offsets are in samples, received at the baud rate
+    sample_time = 1 / (args.baud_rate * 1000)
+
+    for message in messages:
+        fields = " ".join(f"{k}={v}" for k, v in message.fields.items())
+        print(f"{message.frame.end * sample_time:.6f} {message.protocol} {fields}")
+
+
+def decode_capture(args: argparse.Namespace, protocols: List[str]) -> None:
+    """Decode a time range of a .cc1101cap capture, as if it was being received"""
+
+    with CaptureReader(args.file) as reader:
+        header = reader.header
+        baud_rate = args.baud_rate
 
-                    else:
-                        sys.stdout.buffer.write(packet)
+        if baud_rate is None:
+            rx_config = header.rx_config()
+            if rx_config is None:
+                print("Error: Invalid RX config in capture")
+                return
+            _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
 
-                    count += 1
-                time.sleep(0.1)
+        # --start and --end are relative to when the capture was started
+        start = None
+        if args.start is not None:
+            start = header.monotonic_time + round(args.start * 1e9)
+
+        end = None
+        if args.end is not None:
+            end = header.monotonic_time + round(args.end * 1e9)
+
+        try:
+            protocol_registry = registry(
+                baud_rate,
+                protocols,
+                packet_duration(header.packet_length, baud_rate),
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
+        for batch in reader.read_range(start, end).batches():
+            offset = (batch.timestamp - header.monotonic_time) / 1e9
+
+            for message in protocol_registry.feed(batch):
+                fields = " ".join(f"{k}={v}" for k, v in message.fields.items())
+                print(f"{offset:.6f} {message.protocol} {fields}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    """Handle the replay subcommand"""
+
+    try:
+        with CaptureReader(args.file) as reader:
+            rx_config = reader.header.rx_config()
+            if rx_config is None:
+                print("Error: Invalid RX config in capture")
+                return
+
+            start = None
+            if args.start is not None:
+                start = reader.header.monotonic_time + round(args.start * 1e9)
+
+            end = None
+            if args.end is not None:
+                end = reader.header.monotonic_time + round(args.end * 1e9)
+
+            packets, times = load_replay(reader, start, end)
+
+        tx_config = config.TXConfig.from_rx_config(rx_config, 0)
+        if args.raw:
+            tx_config.set_tx_power_raw(int(args.tx_power, 16))
+        else:
+            tx_config.set_tx_power(float(args.tx_power))
+
+    except (ValueError, ConfigException) as e:
+        print(f"Error: {e}")
+        return
+
+    speed = None if args.max_speed else args.speed
+
+    print(f"Replaying {len(packets)} packets", file=sys.stderr)
+
+    cc1101 = CC1101(args.device, None, True)
+    result = replay_packets(cc1101, tx_config, packets, times, speed)
+
+    print(
+        f"Sent {result.packets} packets in {result.duration:.3f}s "
+        f"({result.packet_rate:.1f} packets/s, {result.byte_rate:.0f} bytes/s)"
+    )
+    if speed is not None:
+        print(
+            f"Timing error: mean {result.mean_error / 1e6:.3f}ms, "
+            f"max {result.max_error / 1e6:.3f}ms"
+        )
+
+
+def trace(args: argparse.Namespace) -> None:
+    """Handle the trace subcommand"""
+
+    for line in format_timeline(load_trace(args.file)):
+        print(line)
 
 
 def conf(args: argparse.Namespace) -> None:
@@ -172,6 +530,86 @@ def reset(args: argparse.Namespace) -> None:
     cc1101.reset()
 
 
+def add_rx_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments used to construct a RXConfig to a subcommand parser"""
+
+    parser.add_argument("frequency", help="frequency (MHz")
+    parser.add_argument(
+        "modulation",
+        type=config.Modulation.from_string,
+        choices=list(config.Modulation),
+    )
+    parser.add_argument("baud_rate", help="baud rate (kBaud)")
+    parser.add_argument("packet_size", help="receive packet size (bytes)")
+    parser.add_argument(
+        "--sync_word", help="sync word (2 or 4 bytes hexadecimal)", default="0"
+    )
+    parser.add_argument(
+        "--deviation",
+        type=float,
+        default=47.607422,
+        help="frequency deviation for FSK modulations (MHz)",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=int,
+        choices=sorted(
+            [
+                int(config.RXConfig.config_to_bandwidth(m, e))
+                for m in reversed(range(0, 4))
+                for e in reversed(range(0, 4))
+            ]
+        ),
+        default=203,
+        help="recieve bandwidth (kHz)",
+    )
+    parser.add_argument(
+        "--magn-target",
+        type=int,
+        choices=[24, 27, 30, 33, 36, 38, 40, 42],
+        default=33,
+        help="target channel filter amplitude (dB)",
+    )
+    parser.add_argument(
+        "--max-lna-gain",
+        type=int,
+        choices=[0, 3, 6, 7, 9, 12, 15, 17],
+        default=0,
+        help="maximum LNA Gain (-dB)",
+    )
+    parser.add_argument(
+        "--max-dvga-gain",
+        type=int,
+        choices=[0, 6, 12, 18],
+        default=0,
+        help="maximum LNA Gain (-dB)",
+    )
+    parser.add_argument(
+        "--carrier-sense",
+        choices=["+6", "+10", "+14"] + [str(i) for i in range(-7, 8)],
+        help="carrier sense threshold (dB). +6, +10 and +14 are relative increases to RSSI. -7 to 7 are absolute values. Disables carrier sense if not set",
+    )
+
+
+def add_filter_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the packet filter argument to a subcommand parser"""
+
+    parser.add_argument(
+        "--filter",
+        action="append",
+        help="drop received packets not matching a condition, can be repeated: len>=N, "
+        "len<=N, len==N, transitions>=F, nonconstant, rssi>=N, [O]&M==V, [O:E]&M==V",
+    )
+
+
+def positive_float(value: str) -> float:
+    """Parse a float argument that must be greater than 0"""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not greater than 0")
+    return number
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(prog="cc1101")
     subparsers = parser.add_subparsers()
@@ -215,84 +653,212 @@ def main() -> None:
 
     rx_parser = subparsers.add_parser("rx", help="Receive Packets")
     rx_parser.add_argument("device", help="CC1101 Device")
-    rx_parser.add_argument("frequency", help="frequency (MHz")
+    add_rx_config_arguments(rx_parser)
     rx_parser.add_argument(
-        "modulation",
-        type=config.Modulation.from_string,
-        choices=list(config.Modulation),
+        "--config-only",
+        action="store_true",
+        help="configure the radio, but don't receive",
     )
-    rx_parser.add_argument("baud_rate", help="baud rate (kBaud)")
-    rx_parser.add_argument("packet_size", help="receive packet size (bytes)")
     rx_parser.add_argument(
-        "--sync_word", help="sync word (2 or 4 bytes hexadecimal)", default="0"
+        "--print-registers",
+        action="store_true",
+        help="print raw register values after configuration",
     )
     rx_parser.add_argument(
-        "--deviation",
-        type=float,
-        default=47.607422,
-        help="frequency deviation for FSK modulations (MHz)",
+        "--block", action="store_true", help="obtain an exclusive lock on the device"
     )
     rx_parser.add_argument(
-        "--bandwidth",
-        type=int,
-        choices=sorted(
-            [
-                int(config.RXConfig.config_to_bandwidth(m, e))
-                for m in reversed(range(0, 4))
-                for e in reversed(range(0, 4))
-            ]
-        ),
-        default=203,
-        help="recieve bandwidth (kHz)",
+        "--out-format",
+        choices=["hex", "bin", "info", "rssi", "cap", "pcapng", "jsonl", "msgpack"],
+        default="hex",
+        help="output format",
     )
     rx_parser.add_argument(
-        "--magn-target",
-        type=int,
-        choices=[24, 27, 30, 33, 36, 38, 40, 42],
-        default=33,
-        help="target channel filter amplitude (dB)",
+        "--output",
+        help="file to write the cap (.cc1101cap), pcapng, jsonl or msgpack formats to. "
+        "Formats other than cap are written to stdout if not set",
     )
     rx_parser.add_argument(
-        "--max-lna-gain",
+        "--rotate-size",
         type=int,
-        choices=[0, 3, 6, 7, 9, 12, 15, 17],
-        default=0,
-        help="maximum LNA Gain (-dB)",
+        help="start a new capture file when it reaches this size (bytes)",
     )
     rx_parser.add_argument(
-        "--max-dvga-gain",
+        "--rotate-interval",
+        type=float,
+        help="start a new capture file after this interval (seconds)",
+    )
+    rx_parser.add_argument(
+        "--queue-size",
         type=int,
-        choices=[0, 6, 12, 18],
-        default=0,
-        help="maximum LNA Gain (-dB)",
+        default=DEFAULT_QUEUE_SIZE,
+        help="packets queued for output before the drop policy applies",
     )
     rx_parser.add_argument(
-        "--carrier-sense",
-        choices=["+6", "+10", "+14"] + [str(i) for i in range(-7, 8)],
-        help="carrier sense threshold (dB). +6, +10 and +14 are relative increases to RSSI. -7 to 7 are absolute values. Disables carrier sense if not set",
+        "--drop-policy",
+        type=DropPolicy,
+        choices=list(DropPolicy),
+        default=DropPolicy.OLDEST,
+        help="packets to drop when the output queue is full, or block receiving",
     )
     rx_parser.add_argument(
-        "--config-only",
-        action="store_true",
-        help="configure the radio, but don't receive",
+        "--flush-interval",
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL,
+        help="maximum time output is buffered before it is written (seconds)",
     )
     rx_parser.add_argument(
-        "--print-registers",
-        action="store_true",
-        help="print raw register values after configuration",
+        "--protocol",
+        action="append",
+        choices=[p.name for p in PROTOCOLS],
+        help="add messages decoded with a protocol to jsonl and msgpack records, can be "
+        "repeated",
     )
+    add_filter_argument(rx_parser)
     rx_parser.add_argument(
-        "--block", action="store_true", help="obtain an exclusive lock on the device"
+        "--profile",
+        action="store_true",
+        help="print the time spent in each stage of receiving on exit",
     )
     rx_parser.add_argument(
-        "--out-format",
-        choices=["hex", "bin", "info", "rssi"],
-        default="hex",
-        help="output format",
+        "--trace",
+        help="dump a trace of recent device operations to this file on error or SIGUSR1",
     )
 
     rx_parser.set_defaults(func=rx)
 
+    serve_parser = subparsers.add_parser(
+        "serve", help="Share Devices With Clients Over a Unix Socket"
+    )
+    serve_parser.add_argument("device", nargs="+", help="CC1101 Device(s)")
+    add_rx_config_arguments(serve_parser)
+    serve_parser.add_argument(
+        "--socket", default=DEFAULT_SOCKET, help="path of the Unix socket to listen on"
+    )
+    serve_parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="maximum number of drains queued for each client",
+    )
+    serve_parser.add_argument(
+        "--drop-policy",
+        type=DropPolicy,
+        choices=list(DropPolicy),
+        default=DropPolicy.OLDEST,
+        help="drains to drop when a client's queue is full, or block receiving",
+    )
+    add_filter_argument(serve_parser)
+    serve_parser.set_defaults(func=serve)
+
+    exporter_parser = subparsers.add_parser(
+        "exporter", help="Receive Packets and Serve OpenMetrics Statistics"
+    )
+    exporter_parser.add_argument("device", nargs="+", help="CC1101 Device(s)")
+    add_rx_config_arguments(exporter_parser)
+    exporter_parser.add_argument(
+        "--address", default="127.0.0.1", help="address to serve /metrics on"
+    )
+    exporter_parser.add_argument(
+        "--port", type=int, default=9101, help="port to serve /metrics on"
+    )
+    exporter_parser.add_argument(
+        "--block", action="store_true", help="obtain an exclusive lock on the device"
+    )
+    add_filter_argument(exporter_parser)
+    exporter_parser.set_defaults(func=exporter)
+
+    decode_parser = subparsers.add_parser(
+        "decode", help="Decode Protocols From a Capture File"
+    )
+    decode_parser.add_argument(
+        "file", help="capture of received packets (rx --out-format bin or cap)"
+    )
+    decode_parser.add_argument(
+        "baud_rate",
+        type=float,
+        nargs="?",
+        help="baud rate the capture was received at (kBaud). Read from cap captures",
+    )
+    decode_parser.add_argument(
+        "--protocol",
+        action="append",
+        choices=[p.name for p in PROTOCOLS],
+        help="protocol to decode, can be repeated. Defaults to all protocols",
+    )
+    decode_parser.add_argument(
+        "--packet-size",
+        type=int,
+        default=1,
+        help="receive packet size (bytes) to align chunks to",
+    )
+    decode_parser.add_argument(
+        "--processes",
+        type=int,
+        help="number of decoder processes. Defaults to the number of CPUs",
+    )
+    decode_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="bytes decoded by a process at a time",
+    )
+    decode_parser.add_argument(
+        "--overlap",
+        type=int,
+        default=DEFAULT_OVERLAP,
+        help="bytes decoded either side of each chunk, at least the longest frame",
+    )
+    decode_parser.add_argument(
+        "--start",
+        type=float,
+        help="decode cap captures from this time (seconds from the start of capture)",
+    )
+    decode_parser.add_argument(
+        "--end",
+        type=float,
+        help="decode cap captures up to this time (seconds from the start of capture)",
+    )
+    decode_parser.set_defaults(func=decode)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Transmit the Packets of a Capture File"
+    )
+    replay_parser.add_argument("file", help="capture to replay (rx --out-format cap)")
+    replay_parser.add_argument("device", help="CC1101 Device")
+    replay_parser.add_argument("tx_power", help="transmit power (hex or dBm)")
+    replay_parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="use hex values for TX Power",
+    )
+    replay_parser.add_argument(
+        "--speed",
+        type=positive_float,
+        default=1.0,
+        help="multiplier of the original packet timing, greater than 0 (see --max-speed)",
+    )
+    replay_parser.add_argument(
+        "--max-speed",
+        action="store_true",
+        help="ignore the original packet timing and transmit as fast as possible",
+    )
+    replay_parser.add_argument(
+        "--start",
+        type=float,
+        help="replay from this time (seconds from the start of capture)",
+    )
+    replay_parser.add_argument(
+        "--end",
+        type=float,
+        help="replay up to this time (seconds from the start of capture)",
+    )
+    replay_parser.set_defaults(func=replay)
+
+    trace_parser = subparsers.add_parser("trace", help="Print a Trace Dump")
+    trace_parser.add_argument("file", help="trace dump file")
+    trace_parser.set_defaults(func=trace)
+
     conf_parser = subparsers.add_parser("config", help="Get Device Configs")
     conf_parser.add_argument("device", help="CC1101 Device")
     conf_parser.add_argument(
@@ -309,6 +875,13 @@ def main() -> None:
     args = parser.parse_args()
 
     if "func" in args:
+        if (
+            args.func is rx
+            and args.protocol is not None
+            and args.out_format not in ("jsonl", "msgpack")
+        ):
+            rx_parser.error("--protocol requires --out-format jsonl or msgpack")
+
         args.func(args)
     else:
         parser.print_help()
@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2022
+"""
+
+from typing import Iterator, List, Optional
+
+
+def packet_duration(packet_length: int, baud_rate: float) -> int:
+    """Get the time in ns to receive a packet at a baud rate in kBaud"""
+    return round(packet_length * 8 * 1e6 / baud_rate)
+
+
+class PacketBatch:
+    """Packets returned by a single drain of the receive buffer
+
+    timestamp is time.monotonic_ns() when the drain completed. Packets are received
+    back-to-back, so the last packet ended at most one packet duration before it. rssi is
+    the RSSI in dBm sampled after the drain, if it was read.
+
+    If packets were dropped from the drain (e.g by a PacketFilter), indices holds the
+    position of each remaining packet in the drain and drained the number of packets the
+    drain returned, so packet times and gaps in the stream can still be recovered.
+    """
+
+    packets: List[bytes]
+    packet_length: int
+    timestamp: int
+    rssi: Optional[float]
+    indices: Optional[List[int]]
+    drained: int
+    _data: Optional[bytes]
+
+    def __init__(
+        self,
+        packets: List[bytes],
+        packet_length: int,
+        timestamp: int,
+        rssi: Optional[float] = None,
+        indices: Optional[List[int]] = None,
+        drained: Optional[int] = None,
+    ):
+        self.packets = packets
+        self.packet_length = packet_length
+        self.timestamp = timestamp
+        self.rssi = rssi
+        self.indices = indices
+        self.drained = drained if drained is not None else len(packets)
+        self._data = None
+
+    def __len__(self) -> int:
+        return len(self.packets)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.packets)
+
+    def __getitem__(self, index: int) -> bytes:
+        return self.packets[index]
+
+    @property
+    def contiguous(self) -> bool:
+        """Whether no packets were dropped from the drain"""
+        return len(self.packets) == self.drained
+
+    def positions(self) -> List[int]:
+        """Get the position of each packet in the drain"""
+        if self.indices is not None:
+            return self.indices
+        return list(range(len(self.packets)))
+
+    @property
+    def data(self) -> bytes:
+        """The packets joined into a single contiguous buffer"""
+        if self._data is None:
+            self._data = b"".join(self.packets)
+        return self._data
+
+    def packet_times(self, baud_rate: float) -> List[int]:
+        """Estimate the time each packet ended, assuming the last drained ended at the timestamp"""
+        duration = packet_duration(self.packet_length, baud_rate)
+        last = self.drained - 1
+        return [self.timestamp - (last - i) * duration for i in self.positions()]
@@ -0,0 +1,654 @@
+"""
+Copyright (c) 2022
+"""
+
+import mmap
+import os
+import struct
+import time
+
+from bisect import bisect_left
+from enum import IntFlag
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cc1101 import dbm_to_rssi, rssi_to_dbm
+from cc1101.batch import PacketBatch
+from cc1101.config import RXConfig
+
+CAPTURE_MAGIC = b"CC1101CP"
+CAPTURE_VERSION = 1
+CAPTURE_SUFFIX = ".cc1101cap"
+
+# Header - magic, version, header size, packet length, record size, RX config size,
+# wall clock time (ns) and monotonic time (ns) when the file was created.
+# Followed by the cc1101_rx_config struct bytes, padded to a multiple of 8 bytes
+CAPTURE_HEADER = struct.Struct("<8sHHIIIqq")
+
+# Record - monotonic time (ns), raw RSSI register value, flags, position of the packet in
+# its drain and number of packets drained (0 if none were dropped), padding. Followed by
+# the packet, padded to a multiple of 8 bytes
+RECORD_HEADER = struct.Struct("<qBBHH2x")
+
+INDEX_MAGIC = b"CC1101IX"
+INDEX_SUFFIX = ".idx"
+
+# Index header - magic, records between entries
+INDEX_HEADER = struct.Struct("<8sI4x")
+
+# Index entry - timestamp (ns), record number
+INDEX_ENTRY = struct.Struct("<qQ")
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_INDEX_INTERVAL = 1024
+
+
+class RecordFlags(IntFlag):
+    """Flags stored with each record"""
+
+    # RSSI was sampled for the drain the packet was received in
+    RSSI = 1
+    # First packet of a drain of the receive buffer
+    DRAIN_START = 2
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def record_size(packet_length: int) -> int:
+    """Get the size of a record holding a packet"""
+    return _align(RECORD_HEADER.size + packet_length)
+
+
+def record_dtype(packet_length: int) -> Dict[str, Any]:
+    """Get a NumPy dtype specification of a record
+
+    Pass to numpy.dtype(), then view a mapped file from the header size as an array of it.
+    """
+    return {
+        "names": ["timestamp", "rssi_raw", "flags", "position", "drained", "packet"],
+        "formats": ["<i8", "u1", "u1", "<u2", "<u2", ("u1", (packet_length,))],
+        "offsets": [0, 8, 9, 10, 12, RECORD_HEADER.size],
+        "itemsize": record_size(packet_length),
+    }
+
+
+class CaptureHeader(NamedTuple):
+    """Header of a capture file"""
+
+    header_size: int
+    packet_length: int
+    record_size: int
+    wall_time: int
+    monotonic_time: int
+    rx_config_bytes: bytes
+
+    def rx_config(self) -> Optional[RXConfig]:
+        return RXConfig.from_bytes(self.rx_config_bytes)
+
+    def fingerprint(self) -> str:
+        rx_config = self.rx_config()
+        return rx_config.fingerprint() if rx_config is not None else ""
+
+
+class Record(NamedTuple):
+    """A received packet read from a capture"""
+
+    timestamp: int
+    rssi_raw: int
+    flags: RecordFlags
+    packet: bytes
+    # Position in the drain and number of packets drained, if packets were dropped
+    position: int = 0
+    drained: int = 0
+
+    @property
+    def rssi(self) -> Optional[float]:
+        """RSSI in dBm, if it was sampled"""
+        if self.flags & RecordFlags.RSSI:
+            return rssi_to_dbm(self.rssi_raw)
+        return None
+
+
+def pack_header(rx_config: RXConfig) -> bytes:
+    """Build the header of a capture of packets received with a config"""
+    config_bytes = bytes(rx_config.to_bytes())
+    header_size = _align(CAPTURE_HEADER.size + len(config_bytes))
+
+    header = CAPTURE_HEADER.pack(
+        CAPTURE_MAGIC,
+        CAPTURE_VERSION,
+        header_size,
+        rx_config.packet_length,
+        record_size(rx_config.packet_length),
+        len(config_bytes),
+        time.time_ns(),
+        time.monotonic_ns(),
+    )
+
+    header += config_bytes
+    return header + bytes(header_size - len(header))
+
+
+def read_header(f: BinaryIO) -> CaptureHeader:
+    """Read the header from the start of a capture file"""
+    data = f.read(CAPTURE_HEADER.size)
+    if len(data) != CAPTURE_HEADER.size:
+        raise ValueError("Not a CC1101 capture")
+
+    (
+        magic,
+        version,
+        header_size,
+        packet_length,
+        size,
+        config_size,
+        wall_time,
+        monotonic_time,
+    ) = CAPTURE_HEADER.unpack(data)
+
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+        raise ValueError("Not a CC1101 capture")
+
+    config_bytes = f.read(config_size)
+    f.read(header_size - CAPTURE_HEADER.size - config_size)
+
+    return CaptureHeader(
+        header_size, packet_length, size, wall_time, monotonic_time, config_bytes
+    )
+
+
+def is_capture(path: str) -> bool:
+    """Check if a file is a capture, rather than raw packets"""
+    with open(path, "rb") as f:
+        return f.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC
+
+
+def iter_records(path: str) -> Iterator[Record]:
+    """Read the records of a capture file in order"""
+    with open(path, "rb") as f:
+        header = read_header(f)
+        payload = header.packet_length
+
+        while True:
+            data = f.read(header.record_size)
+            if len(data) < header.record_size:
+                return
+
+            timestamp, rssi_raw, flags, position, drained = RECORD_HEADER.unpack_from(
+                data
+            )
+            yield Record(
+                timestamp,
+                rssi_raw,
+                RecordFlags(flags),
+                data[RECORD_HEADER.size : RECORD_HEADER.size + payload],
+                position,
+                drained,
+            )
+
+
+def index_path(path: str) -> str:
+    """Get the path of the sparse index of a capture file"""
+    return path + INDEX_SUFFIX
+
+
+def _writev(fd: int, buffers: List[bytes]) -> None:
+    """Write all buffers, in as few writev calls as the system allows"""
+    iov_max = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+    for i in range(0, len(buffers), iov_max):
+        chunk = buffers[i : i + iov_max]
+        total = sum(len(b) for b in chunk)
+        written = os.writev(fd, chunk)
+
+        if written < total:
+            os.write(fd, b"".join(chunk)[written:])
+
+
+class CaptureWriter:
+    """Write received packets to .cc1101cap files
+
+    Records are fixed size and 8 byte aligned, so a file can be mapped and viewed as an
+    array (see record_dtype()). Records are buffered as separate header, packet and padding
+    buffers and written with writev once buffer_size bytes are pending.
+
+    If rotate_size (bytes) or rotate_interval (seconds) are set, a new file is started when
+    either is exceeded, named with an increasing index before the suffix.
+
+    Unless index_interval is None, the timestamp of every index_interval-th record is
+    written to a sparse index file alongside each capture (see CaptureReader).
+    """
+
+    path: str
+    rx_config: RXConfig
+    rotate_size: Optional[int]
+    rotate_interval: Optional[float]
+    buffer_size: int
+    index_interval: Optional[int]
+    records: int
+    files: List[str]
+    _fd: int
+    _index_fd: int
+    _index_pending: List[bytes]
+    _file_records: int
+    _size: int
+    _opened: float
+    _pending: List[bytes]
+    _pending_size: int
+    _padding: bytes
+    _index: int
+
+    def __init__(
+        self,
+        path: str,
+        rx_config: RXConfig,
+        rotate_size: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        index_interval: Optional[int] = DEFAULT_INDEX_INTERVAL,
+    ):
+        self.path = path
+        self.rx_config = rx_config
+        self.rotate_size = rotate_size
+        self.rotate_interval = rotate_interval
+        self.buffer_size = buffer_size
+        self.index_interval = index_interval
+        self.records = 0
+        self.files = []
+        self._fd = -1
+        self._index_fd = -1
+        self._index_pending = []
+        self._pending = []
+        self._pending_size = 0
+        self._padding = bytes(
+            record_size(rx_config.packet_length)
+            - RECORD_HEADER.size
+            - rx_config.packet_length
+        )
+        self._index = 0
+        self._open()
+
+    def _file_path(self) -> str:
+        if self.rotate_size is None and self.rotate_interval is None:
+            return self.path
+
+        root, ext = os.path.splitext(self.path)
+        if ext == "":
+            ext = CAPTURE_SUFFIX
+
+        return f"{root}.{self._index:04d}{ext}"
+
+    def _open(self) -> None:
+        path = self._file_path()
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.files.append(path)
+
+        header = pack_header(self.rx_config)
+        os.write(self._fd, header)
+        self._size = len(header)
+        self._opened = time.monotonic()
+        self._index += 1
+        self._file_records = 0
+
+        if self.index_interval is not None:
+            self._index_fd = os.open(
+                index_path(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
+            )
+            os.write(
+                self._index_fd, INDEX_HEADER.pack(INDEX_MAGIC, self.index_interval)
+            )
+
+    def _close(self) -> None:
+        self.flush()
+        os.close(self._fd)
+        self._fd = -1
+
+        if self._index_fd != -1:
+            os.close(self._index_fd)
+            self._index_fd = -1
+
+    def _rotate(self) -> None:
+        self._close()
+        self._open()
+
+    def write(
+        self,
+        packet: bytes,
+        timestamp: int,
+        rssi: Optional[float] = None,
+        flags: int = 0,
+        position: int = 0,
+        drained: int = 0,
+    ) -> None:
+        """Add a record for a packet received at a monotonic time in ns
+
+        position and drained are the packet's position in its drain and the number of packets
+        drained, if packets were dropped from the drain.
+        """
+        packet_length = self.rx_config.packet_length
+
+        if (
+            self.rotate_size is not None
+            and self._size + self._pending_size >= self.rotate_size
+        ) or (
+            self.rotate_interval is not None
+            and time.monotonic() - self._opened >= self.rotate_interval
+        ):
+            self._rotate()
+
+        rssi_raw = 0
+        if rssi is not None:
+            rssi_raw = dbm_to_rssi(rssi)
+            flags |= RecordFlags.RSSI
+
+        if len(packet) != packet_length:
+            packet = packet[:packet_length].ljust(packet_length, b"\x00")
+
+        header = RECORD_HEADER.pack(timestamp, rssi_raw, flags, position, drained)
+        self._pending += [header, packet, self._padding]
+        self._pending_size += len(header) + packet_length + len(self._padding)
+
+        if (
+            self.index_interval is not None
+            and self._file_records % self.index_interval == 0
+        ):
+            self._index_pending.append(INDEX_ENTRY.pack(timestamp, self._file_records))
+
+        self._file_records += 1
+        self.records += 1
+
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+
+    def write_batch(self, batch: PacketBatch) -> None:
+        """Add records for the packets of a drain, timestamped with the drain time"""
+        flags = RecordFlags.DRAIN_START
+        drained = 0 if batch.contiguous else batch.drained
+
+        for packet, position in zip(batch.packets, batch.positions()):
+            self.write(packet, batch.timestamp, batch.rssi, flags, position, drained)
+            flags = RecordFlags(0)
+
+    def flush(self) -> None:
+        """Write the pending records to the file"""
+        if len(self._pending) == 0:
+            return
+
+        _writev(self._fd, [b for b in self._pending if len(b) > 0])
+        self._size += self._pending_size
+        self._pending = []
+        self._pending_size = 0
+
+        # Only index records once they are in the file
+        if len(self._index_pending) > 0:
+            os.write(self._index_fd, b"".join(self._index_pending))
+            self._index_pending = []
+
+    def close(self) -> None:
+        """Write the pending records and close the file"""
+        if self._fd != -1:
+            self._close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class RecordRange:
+    """A contiguous range of records in a mapped capture
+
+    Records are read from the mapping on access. data is a zero-copy view of the raw
+    records, which must be released before the reader is closed.
+    """
+
+    reader: "CaptureReader"
+    start: int
+    end: int
+
+    def __init__(self, reader: "CaptureReader", start: int, end: int):
+        self.reader = reader
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, index: int) -> Record:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        return self.reader.record(self.start + index)
+
+    def __iter__(self) -> Iterator[Record]:
+        record = self.reader.record
+        for i in range(self.start, self.end):
+            yield record(i)
+
+    @property
+    def data(self) -> memoryview:
+        """View of the raw records, e.g for numpy.frombuffer() with record_dtype()"""
+        return memoryview(self.reader._mm)[
+            self.reader._offset(self.start) : self.reader._offset(self.end)
+        ]
+
+    def packets(self) -> List[bytes]:
+        """Get the packets of the records"""
+        return [r.packet for r in self]
+
+    def batches(self) -> Iterator[PacketBatch]:
+        """Regroup the records into the drains they were received in
+
+        The batches can be fed to a StreamReassembler or ProtocolRegistry as if they were
+        being received.
+        """
+        packets: List[bytes] = []
+        indices: List[int] = []
+        timestamp = 0
+        rssi = None
+        drained = 0
+
+        for record in self:
+            if len(packets) > 0 and (
+                record.flags & RecordFlags.DRAIN_START or record.timestamp != timestamp
+            ):
+                yield self._batch(packets, timestamp, rssi, indices, drained)
+                packets = []
+                indices = []
+
+            packets.append(record.packet)
+            indices.append(record.position)
+            timestamp = record.timestamp
+            rssi = record.rssi
+            drained = record.drained
+
+        if len(packets) > 0:
+            yield self._batch(packets, timestamp, rssi, indices, drained)
+
+    def _batch(
+        self,
+        packets: List[bytes],
+        timestamp: int,
+        rssi: Optional[float],
+        indices: List[int],
+        drained: int,
+    ) -> PacketBatch:
+        packet_length = self.reader.header.packet_length
+        if drained == 0:
+            return PacketBatch(packets, packet_length, timestamp, rssi)
+        return PacketBatch(packets, packet_length, timestamp, rssi, indices, drained)
+
+
+class CaptureReader:
+    """Memory-mapped reader of a .cc1101cap file with time range queries
+
+    A sparse index of the timestamp of every Nth record is loaded from the file written
+    alongside the capture, and built or extended from the capture if it is missing or
+    behind. A time is found by bisecting the index, then scanning at most N records.
+    """
+
+    path: str
+    header: CaptureHeader
+    records: int
+    index_interval: int
+    _file: BinaryIO
+    _mm: mmap.mmap
+    _index_times: List[int]
+    _index_records: List[int]
+
+    def __init__(self, path: str, index_interval: int = DEFAULT_INDEX_INTERVAL):
+        self.path = path
+        self._file = open(path, "rb")
+
+        try:
+            self.header = read_header(self._file)
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+
+        self.records = (
+            len(self._mm) - self.header.header_size
+        ) // self.header.record_size
+        self.index_interval = index_interval
+        self._index_times = []
+        self._index_records = []
+        self._load_index()
+
+    def _offset(self, record: int) -> int:
+        return self.header.header_size + record * self.header.record_size
+
+    def _timestamp(self, record: int) -> int:
+        return int(struct.unpack_from("<q", self._mm, self._offset(record))[0])
+
+    def _read_index(self) -> List[Tuple[int, int]]:
+        """Read the entries of the index file that match the capture"""
+        try:
+            with open(index_path(self.path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return []
+
+        if len(data) < INDEX_HEADER.size:
+            return []
+
+        magic, interval = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or interval == 0:
+            return []
+
+        self.index_interval = interval
+
+        # Ignore a partially written entry, and entries past the end of the capture
+        end = len(data) - (len(data) - INDEX_HEADER.size) % INDEX_ENTRY.size
+        entries = [
+            e
+            for e in INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size : end])
+            if e[1] < self.records
+        ]
+
+        # An index left by an earlier capture to the same path
+        if len(entries) > 0 and self._timestamp(entries[-1][1]) != entries[-1][0]:
+            return []
+
+        return entries
+
+    def _load_index(self) -> None:
+        entries = self._read_index()
+        indexed = len(entries)
+        interval = self.index_interval
+
+        next_record = entries[-1][1] + interval if indexed > 0 else 0
+        for record in range(next_record, self.records, interval):
+            entries.append((self._timestamp(record), record))
+
+        self._index_times = [e[0] for e in entries]
+        self._index_records = [e[1] for e in entries]
+
+        if len(entries) == indexed:
+            return
+
+        # Save the entries built from the capture, if the index can be written
+        try:
+            with open(index_path(self.path), "r+b" if indexed > 0 else "wb") as f:
+                if indexed > 0:
+                    f.seek(INDEX_HEADER.size + indexed * INDEX_ENTRY.size)
+                    f.truncate()
+                else:
+                    f.write(INDEX_HEADER.pack(INDEX_MAGIC, interval))
+                f.write(b"".join(INDEX_ENTRY.pack(*e) for e in entries[indexed:]))
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return self.records
+
+    def record(self, index: int) -> Record:
+        """Read a record"""
+        offset = self._offset(index)
+        timestamp, rssi_raw, flags, position, drained = RECORD_HEADER.unpack_from(
+            self._mm, offset
+        )
+        start = offset + RECORD_HEADER.size
+
+        return Record(
+            timestamp,
+            rssi_raw,
+            RecordFlags(flags),
+            self._mm[start : start + self.header.packet_length],
+            position,
+            drained,
+        )
+
+    def find(self, timestamp: int) -> int:
+        """Get the index of the first record at or after a timestamp"""
+        i = bisect_left(self._index_times, timestamp)
+        record = self._index_records[i - 1] if i > 0 else 0
+
+        while record < self.records and self._timestamp(record) < timestamp:
+            record += 1
+
+        return record
+
+    def read_range(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> RecordRange:
+        """Get the records from a start timestamp up to, but not including, an end"""
+        return RecordRange(
+            self,
+            0 if start is None else self.find(start),
+            self.records if end is None else self.find(end),
+        )
+
+    def filter(
+        self,
+        rssi_min: Optional[float] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Iterator[Record]:
+        """Get the records in a time range with an RSSI of at least rssi_min dBm"""
+        records = self.read_range(start, end)
+        if rssi_min is None:
+            yield from records
+            return
+
+        # Compare raw register values with a table rather than converting each record
+        passes = [rssi_to_dbm(raw) >= rssi_min for raw in range(256)]
+        mm = self._mm
+
+        for i in range(records.start, records.end):
+            offset = self._offset(i)
+            if mm[offset + 9] & RecordFlags.RSSI and passes[mm[offset + 8]]:
+                yield self.record(i)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
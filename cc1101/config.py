@@ -4,6 +4,7 @@ Copyright (c) 2022
 
 import ctypes
 import math
+import zlib
 
 from enum import IntEnum
 from typing import Dict, Tuple, Type, Optional
@@ -607,6 +608,10 @@ class RXConfig:
         """Serialize a RXConfig to a cc1101_rx_config struct bytes"""
         return bytearray(self.to_struct())
 
+    def fingerprint(self) -> str:
+        """Get a short identifier for the configuration (CRC32 of the struct bytes)"""
+        return f"{zlib.crc32(self.to_bytes()):08x}"
+
     def __repr__(self) -> str:
         ret = self._common_config.__repr__()
         ret += f"Bandwidth: {self.get_bandwidth()} kHz\n"
@@ -680,6 +685,13 @@ class TXConfig:
         )
         return cls(common_config, tx_power)
 
+    @classmethod
+    def from_rx_config(
+        cls: Type["TXConfig"], rx_config: RXConfig, tx_power: int
+    ) -> "TXConfig":
+        """Construct a TXConfig transmitting with the common settings of a RXConfig and a raw PATABLE TX power value"""
+        return cls(rx_config.get_common_config(), tx_power)
+
     def get_common_config(self) -> CommonConfig:
         return self._common_config
 
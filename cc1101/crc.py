@@ -0,0 +1,218 @@
+"""
+Copyright (c) 2022
+"""
+
+import binascii
+import operator
+import zlib
+
+from abc import ABC, abstractmethod
+from array import array
+from functools import reduce
+from typing import Dict, List, Optional, Union
+
+from cc1101.batch import PacketBatch
+
+Buffer = Union[bytes, bytearray, memoryview, "array[int]"]
+
+
+def _reflect(value: int, width: int) -> int:
+    """Reverse the order of the low width bits of a value"""
+    return int(format(value, f"0{width}b")[::-1], 2)
+
+
+class Checksum(ABC):
+    """Base for checksums stored big or little endian in the last bytes of a frame"""
+
+    width: int
+    byteorder: str
+
+    def __init__(self, width: int, byteorder: str = "big"):
+        self.width = width
+        self.byteorder = byteorder
+
+    @property
+    def size(self) -> int:
+        """Number of bytes the checksum is stored in"""
+        return (self.width + 7) // 8
+
+    @abstractmethod
+    def compute(self, data: Buffer) -> int:
+        """Compute the checksum of data"""
+
+    def check(self, frame: Buffer) -> bool:
+        """Check a frame ending with its checksum"""
+        view = memoryview(frame)
+        end = len(view) - self.size
+        if end < 0:
+            return False
+
+        expected = int.from_bytes(view[end:], self.byteorder)  # type: ignore
+        return self.compute(view[:end]) == expected
+
+    def check_batch(
+        self,
+        frames: Union[PacketBatch, Buffer],
+        frame_length: Optional[int] = None,
+    ) -> List[bool]:
+        """Check each frame of a batch or a buffer of equal length frames
+
+        A buffer can be any object supporting the buffer protocol, e.g a NumPy array of
+        frames. Frames are checked through memoryview slices without copying.
+        """
+        if isinstance(frames, PacketBatch):
+            return [self.check(packet) for packet in frames.packets]
+
+        if frame_length is None:
+            raise ValueError("frame_length is required for a buffer")
+
+        view = memoryview(frames).cast("B")
+        check = self.check
+
+        return [
+            check(view[i : i + frame_length])
+            for i in range(0, len(view) - frame_length + 1, frame_length)
+        ]
+
+    def filter(self, frames: List[bytes]) -> List[bytes]:
+        """Get the frames with a valid checksum"""
+        return [frame for frame in frames if self.check(frame)]
+
+
+class CRC(Checksum):
+    """Table-driven CRC, parameterized as in the Rocksoft model
+
+    A 256 entry table is built once so each byte is a lookup, shift and XOR. The CRC-16 and
+    CRC-32 variants implemented by binascii and zlib are computed by those instead.
+    """
+
+    poly: int
+    init: int
+    refin: bool
+    refout: bool
+    xorout: int
+    _table: List[int]
+    _mask: int
+
+    def __init__(
+        self,
+        width: int,
+        poly: int,
+        init: int = 0,
+        refin: bool = False,
+        refout: bool = False,
+        xorout: int = 0,
+        byteorder: str = "big",
+    ):
+        if width < 8:
+            raise ValueError("CRC width must be at least 8 bits")
+
+        super().__init__(width, byteorder)
+        self.poly = poly
+        self.init = init
+        self.refin = refin
+        self.refout = refout
+        self.xorout = xorout
+        self._mask = (1 << width) - 1
+        self._table = self._build_table()
+
+        if (width, poly, refin, refout) == (16, 0x1021, False, False):
+            self.compute = self._compute_hqx  # type: ignore
+        elif (width, poly, init, refin, refout, xorout) == (
+            32,
+            0x04C11DB7,
+            0xFFFFFFFF,
+            True,
+            True,
+            0xFFFFFFFF,
+        ):
+            self.compute = self._compute_crc32  # type: ignore
+
+    def _build_table(self) -> List[int]:
+        table = []
+
+        if self.refin:
+            poly = _reflect(self.poly, self.width)
+            for i in range(256):
+                crc = i
+                for _ in range(8):
+                    crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+                table.append(crc)
+        else:
+            top = 1 << (self.width - 1)
+            for i in range(256):
+                crc = i << (self.width - 8)
+                for _ in range(8):
+                    crc = ((crc << 1) ^ self.poly) if crc & top else crc << 1
+                table.append(crc & self._mask)
+
+        return table
+
+    def compute_table(self, data: Buffer) -> int:
+        """Compute the CRC of data with the table, even if binascii or zlib implement it"""
+        table = self._table
+
+        if self.refin:
+            crc = _reflect(self.init, self.width)
+            for b in data:
+                crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+            if not self.refout:
+                crc = _reflect(crc, self.width)
+        else:
+            crc = self.init
+            mask = self._mask
+            shift = self.width - 8
+            for b in data:
+                crc = ((crc << 8) & mask) ^ table[((crc >> shift) ^ b) & 0xFF]
+            if self.refout:
+                crc = _reflect(crc, self.width)
+
+        return crc ^ self.xorout
+
+    compute = compute_table
+
+    def _compute_hqx(self, data: Buffer) -> int:
+        crc = binascii.crc_hqx(data, self.init)
+        if self.refout:
+            crc = _reflect(crc, 16)
+        return crc ^ self.xorout
+
+    def _compute_crc32(self, data: Buffer) -> int:
+        return zlib.crc32(data)
+
+
+class Sum(Checksum):
+    """Sum of the bytes, truncated to width bits"""
+
+    def compute(self, data: Buffer) -> int:
+        return sum(data) & ((1 << self.width) - 1)
+
+
+class Xor(Checksum):
+    """XOR of the bytes"""
+
+    def __init__(self) -> None:
+        super().__init__(8)
+
+    def compute(self, data: Buffer) -> int:
+        return reduce(operator.xor, data, 0)
+
+
+# Presets for checks used by ISM band sensors and the CC1101 itself
+PRESETS: Dict[str, Checksum] = {
+    # Fine Offset, LaCrosse and others
+    "crc8": CRC(8, 0x31),
+    # Dallas/Maxim 1-Wire, used by Oregon Scientific v3 and others
+    "crc8/maxim": CRC(8, 0x31, refin=True, refout=True),
+    "crc8/smbus": CRC(8, 0x07),
+    "crc16/xmodem": CRC(16, 0x1021),
+    "crc16/ccitt-false": CRC(16, 0x1021, init=0xFFFF),
+    "crc16/kermit": CRC(16, 0x1021, refin=True, refout=True, byteorder="little"),
+    "crc16/arc": CRC(16, 0x8005, refin=True, refout=True, byteorder="little"),
+    "crc16/modbus": CRC(16, 0x8005, 0xFFFF, True, True, byteorder="little"),
+    # CC1101 hardware packet CRC
+    "crc16/cc1101": CRC(16, 0x8005, init=0xFFFF),
+    "crc32": CRC(32, 0x04C11DB7, 0xFFFFFFFF, True, True, 0xFFFFFFFF, "little"),
+    "sum8": Sum(8),
+    "xor8": Xor(),
+}
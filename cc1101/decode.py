@@ -0,0 +1,261 @@
+"""
+Copyright (c) 2022
+"""
+
+import math
+
+from enum import IntEnum
+from typing import Collection, Dict, List, NamedTuple, Optional, Tuple
+
+# Symbols are coded per sample as the sum of the ASCII '0'/'1' of the zero and one planes
+# (weighted 1 and 2) plus 4 if invalid. Samples without a symbol are 3 * '0'.
+_NONE = 3 * ord("0")
+_SYNC = _NONE + 3
+
+# Symbol code to character, deleting samples without a symbol
+_SYMBOLS = bytes.maketrans(bytes(range(_NONE, _NONE + 5)), b"\x0001SX")
+
+# Convert a string of '0' and '1' to bytes of 0 and 1
+_BIT_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class LineCoding(IntEnum):
+    """OOK line codings supported by PulseDecoder"""
+
+    # Pulse distance/position - each bit is a fixed pulse followed by a short or long gap
+    PPM = 0
+    # Pulse width - each bit is a short or long pulse followed by a fixed gap
+    PWM = 1
+
+
+class Frame(NamedTuple):
+    """A decoded frame"""
+
+    # Frame bits, first received bit is the most significant
+    bits: int
+    # Number of bits in the frame
+    length: int
+    # Sample offset of the sync gap ending the frame
+    end: int
+
+
+def to_bit_string(data: bytes) -> str:
+    """Convert bytes to a string of '0' and '1' characters"""
+    if len(data) == 0:
+        return ""
+
+    return format(int.from_bytes(data, "big"), f"0{len(data) * 8}b")
+
+
+class _Runs:
+    """Masks of the sample positions where a run of set bits of at least a length starts
+
+    Bit positions count down from the first sample, so a run continues towards bit 0.
+    Masks for lengths are built from cached power of two lengths with shifts and ANDs.
+    """
+
+    _masks: Dict[int, int]
+
+    def __init__(self, value: int):
+        self._masks = {1: value}
+
+    def _power(self, length: int) -> int:
+        if length not in self._masks:
+            half = self._power(length // 2)
+            self._masks[length] = half & (half << (length // 2))
+        return self._masks[length]
+
+    def at_least(self, length: int) -> int:
+        if length in self._masks:
+            return self._masks[length]
+
+        ret = -1
+        offset = 0
+        power = 1
+
+        while length > 0:
+            if length & 1:
+                ret &= self._power(power) << offset
+                offset += power
+            length >>= 1
+            power <<= 1
+
+        return ret
+
+    def between(self, low: int, high: int) -> int:
+        return self.at_least(low) & ~self.at_least(high + 1)
+
+
+class PulseDecoder:
+    """Run-length decoder for OOK pulse codings
+
+    Received data is treated as a sequence of samples, one per bit at the configured baud
+    rate, where 1 is carrier and 0 is no carrier. Run lengths of pulses and gaps are
+    measured in samples and classified against the configured ranges.
+
+    For PPM, the gap after each pulse determines the bit and the pulse must be within
+    separator. For PWM, the pulse width determines the bit and the gap after it must be
+    within separator. In both, a gap of at least sync samples ends a frame. Any other
+    run length is invalid and discards the bits decoded so far.
+
+    Runs are classified for all samples at once using shifts and masks of the data as a
+    single integer, so no Python code runs per sample or per pulse.
+    """
+
+    coding: LineCoding
+    zero: Tuple[int, int]
+    one: Tuple[int, int]
+    sync: int
+    separator: Optional[Tuple[int, int]]
+    lengths: Optional[Collection[int]]
+
+    def __init__(
+        self,
+        coding: LineCoding,
+        zero: Tuple[int, int],
+        one: Tuple[int, int],
+        sync: int,
+        separator: Optional[Tuple[int, int]] = None,
+        lengths: Optional[Collection[int]] = None,
+    ):
+        self.coding = coding
+        self.zero = zero
+        self.one = one
+        self.sync = sync
+        self.separator = separator
+        self.lengths = lengths
+
+    @classmethod
+    def from_timing(
+        cls,
+        coding: LineCoding,
+        baud_rate: float,
+        zero: float,
+        one: float,
+        sync: float,
+        separator: Optional[float] = None,
+        lengths: Optional[Collection[int]] = None,
+    ) -> "PulseDecoder":
+        """Construct a decoder from nominal timings in microseconds and a baud rate in kBaud
+
+        Ranges are split at the midpoints between the nominal zero, one and sync lengths.
+        """
+        sample = 1000 / baud_rate
+
+        zero_samples = zero / sample
+        one_samples = one / sample
+        sync_samples = sync / sample
+
+        zero_one = math.floor((zero_samples + one_samples) / 2)
+        one_sync = math.floor((one_samples + sync_samples) / 2)
+
+        separator_range = None
+        if separator is not None:
+            separator_samples = separator / sample
+            separator_range = (
+                max(1, math.floor(separator_samples / 2)),
+                math.ceil(separator_samples * 2),
+            )
+
+        return cls(
+            coding,
+            (1, zero_one),
+            (zero_one + 1, one_sync),
+            one_sync + 1,
+            separator_range,
+            lengths,
+        )
+
+    def _symbols(self, value: int, length: int) -> bytes:
+        """Get a code for each sample, with symbols at the pulse or gap starts that code bits"""
+        mask = (1 << length) - 1
+        zeros = value ^ mask
+        previous = value >> 1
+
+        pulse_starts = value & ~previous
+        gap_starts = zeros & previous
+
+        pulses = _Runs(value)
+        gaps = _Runs(zeros)
+
+        sync = gap_starts & gaps.at_least(self.sync)
+
+        if self.coding == LineCoding.PPM:
+            one = gap_starts & gaps.between(*self.one) & ~sync
+            zero = gap_starts & gaps.between(*self.zero) & ~sync & ~one
+            invalid = gap_starts & ~(sync | one | zero)
+
+            if self.separator is not None:
+                invalid |= pulse_starts & ~pulses.between(*self.separator)
+        else:
+            separator = self.separator
+            if separator is None:
+                separator = (1, self.sync - 1)
+
+            one = pulse_starts & pulses.between(*self.one)
+            zero = pulse_starts & pulses.between(*self.zero) & ~one
+            invalid = pulse_starts & ~(zero | one)
+            invalid |= gap_starts & ~(sync | gaps.between(*separator))
+
+        # Expand each bit plane to an ASCII byte per sample and sum them as integers.
+        # Each byte is at most _NONE + 4, so there are no carries between samples.
+        sample_format = f"0{length}b"
+
+        codes = 0
+        for plane, weight in [(zero | sync, 1), (one | sync, 2)]:
+            plane_bytes = format(plane & mask, sample_format).encode("ascii")
+            codes += int.from_bytes(plane_bytes, "big") * weight
+
+        # Invalid runs are rare, so only add their plane when needed
+        invalid &= mask
+        if invalid != 0:
+            plane_bytes = format(invalid, sample_format).encode("ascii")
+            codes += int.from_bytes(plane_bytes.translate(_BIT_BYTES), "big") << 2
+
+        return codes.to_bytes(length, "big")
+
+    def decode_int(self, value: int, length: int) -> Tuple[List[Frame], int]:
+        """Decode frames from samples held in an integer, first sample most significant
+
+        Returns the frames ended by a sync gap and the number of samples that have been
+        completely decoded. Samples from that offset onwards may be the start of a frame
+        that continues beyond the end of the data.
+        """
+        if length == 0:
+            return [], 0
+
+        codes = self._symbols(value, length)
+        symbols = codes.translate(_SYMBOLS, bytes([_NONE]))
+
+        segments = symbols.split(b"S")
+
+        frames = []
+        position = -1
+
+        # The final segment is not ended by a sync
+        for segment in segments[:-1]:
+            position = codes.index(_SYNC, position + 1)
+
+            invalid = segment.rfind(b"X")
+            if invalid != -1:
+                segment = segment[invalid + 1 :]
+
+            bits = segment
+            if len(bits) == 0:
+                continue
+
+            if self.lengths is not None and len(bits) not in self.lengths:
+                continue
+
+            frames.append(Frame(int(bits, 2), len(bits), position))
+
+        if position == -1:
+            # No syncs - only a leading gap can be discarded
+            return frames, length - value.bit_length()
+
+        return frames, min(position + self.sync, length)
+
+    def decode(self, data: bytes) -> List[Frame]:
+        """Decode frames from received bytes"""
+        frames, _ = self.decode_int(int.from_bytes(data, "big"), len(data) * 8)
+        return frames
@@ -0,0 +1,142 @@
+"""
+Copyright (c) 2022
+"""
+
+from collections import OrderedDict, deque
+from typing import Deque, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from cc1101.protocols import Message
+
+DEFAULT_WINDOW = 2.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class Repeats(NamedTuple):
+    """Summary of the copies of a message received within a window"""
+
+    message: Message
+    copies: int
+    best_rssi: Optional[float]
+    first: int
+    last: int
+
+
+class _Entry:
+    message: Message
+    copies: int
+    best_rssi: Optional[float]
+    first: int
+    last: int
+
+    def __init__(self, message: Message, timestamp: int, rssi: Optional[float]):
+        self.message = message
+        self.copies = 1
+        self.best_rssi = rssi
+        self.first = timestamp
+        self.last = timestamp
+
+    def summary(self) -> Repeats:
+        return Repeats(self.message, self.copies, self.best_rssi, self.first, self.last)
+
+
+class Deduplicator:
+    """Drop repeated copies of a message received within a time window
+
+    Messages are keyed by protocol and frame bits. The first copy is passed on immediately
+    and later copies within window seconds of it are counted. When the window closes, a
+    summary with the number of copies and best RSSI is returned by expire().
+
+    Entries are held in first-seen order, which is also expiry order, so expiring is a
+    scan from the oldest entry. At most max_entries are held - under a flood of distinct
+    messages the oldest windows are closed early. At most max_entries summaries of closed
+    windows are held until expire() is called, and the oldest are dropped and counted in
+    lost.
+    """
+
+    window: int
+    max_entries: int
+    duplicates: int
+    evicted: int
+    lost: int
+    _entries: "OrderedDict[Hashable, _Entry]"
+    _closed: Deque[Repeats]
+
+    def __init__(
+        self, window: float = DEFAULT_WINDOW, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.window = round(window * 1e9)
+        self.max_entries = max_entries
+        self.duplicates = 0
+        self.evicted = 0
+        self.lost = 0
+        self._entries = OrderedDict()
+        self._closed = deque(maxlen=max_entries)
+
+    @staticmethod
+    def key(message: Message) -> Tuple[str, int, int]:
+        """Get the key identifying copies of a message"""
+        return (message.protocol, message.frame.bits, message.frame.length)
+
+    def add(
+        self, message: Message, timestamp: int, rssi: Optional[float] = None
+    ) -> bool:
+        """Add a message received at a time in ns, returning True if it is the first copy"""
+        key = self.key(message)
+        entry = self._entries.get(key)
+
+        if entry is not None and timestamp - entry.first < self.window:
+            entry.copies += 1
+            entry.last = timestamp
+            if rssi is not None and (entry.best_rssi is None or rssi > entry.best_rssi):
+                entry.best_rssi = rssi
+
+            self.duplicates += 1
+            return False
+
+        if entry is not None:
+            # Window has closed but not yet been expired
+            self._close(self._entries.pop(key))
+
+        if len(self._entries) >= self.max_entries:
+            self._close(self._entries.popitem(last=False)[1])
+            self.evicted += 1
+
+        self._entries[key] = _Entry(message, timestamp, rssi)
+        return True
+
+    def filter(
+        self, messages: Sequence[Message], timestamp: int, rssi: Optional[float] = None
+    ) -> List[Message]:
+        """Get the messages that are first copies"""
+        return [m for m in messages if self.add(m, timestamp, rssi)]
+
+    def _close(self, entry: _Entry) -> None:
+        if len(self._closed) == self.max_entries:
+            self.lost += 1
+        self._closed.append(entry.summary())
+
+    def expire(self, now: int) -> List[Repeats]:
+        """Close the windows that ended before a time in ns and get their summaries"""
+        closed = list(self._closed)
+        self._closed.clear()
+
+        entries = self._entries
+        while len(entries) > 0:
+            key, entry = next(iter(entries.items()))
+            if now - entry.first < self.window:
+                break
+
+            del entries[key]
+            closed.append(entry.summary())
+
+        return closed
+
+    def flush(self) -> List[Repeats]:
+        """Close all windows and get their summaries"""
+        closed = list(self._closed) + [e.summary() for e in self._entries.values()]
+        self._closed.clear()
+        self._entries.clear()
+        return closed
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,290 @@
+"""
+Copyright (c) 2022
+"""
+
+import time
+
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from cc1101 import CC1101
+from cc1101.batch import packet_duration
+from cc1101.config import TXConfig
+
+# Duty cycles are measured over an hour
+DEFAULT_WINDOW = 3600.0
+
+# Preamble bytes transmitted before each packet (the CC1101 default)
+PREAMBLE_LENGTH = 4
+
+
+class SubBand(NamedTuple):
+    """A frequency range with a maximum duty cycle"""
+
+    name: str
+    # Frequency range (MHz)
+    low: float
+    high: float
+    # Maximum fraction of the window spent transmitting
+    duty_cycle: float
+
+
+# Non-specific short range device sub-bands from ETSI EN 300 220-2 / ERC Rec 70-03
+ETSI_SUB_BANDS = [
+    SubBand("433", 433.05, 434.79, 0.1),
+    SubBand("h1.3", 863.0, 865.0, 0.001),
+    SubBand("h1.4", 865.0, 868.0, 0.01),
+    SubBand("h1.5", 868.0, 868.6, 0.01),
+    SubBand("h1.6", 868.7, 869.2, 0.001),
+    SubBand("h1.7", 869.4, 869.65, 0.1),
+    SubBand("h1.8", 869.7, 870.0, 0.01),
+]
+
+
+def airtime(tx_config: TXConfig, length: int) -> int:
+    """Get the time in ns to transmit a packet, including the preamble and sync word"""
+    common_config = tx_config.get_common_config()
+    _, baud_rate = common_config.get_modulation_and_baud_rate()
+
+    sync_word = common_config.get_sync_word()
+    sync_length = 0 if sync_word == 0 else 2 if sync_word <= 0xFFFF else 4
+
+    return packet_duration(PREAMBLE_LENGTH + sync_length + length, baud_rate)
+
+
+class DutyCycleWindow:
+    """Airtime used in a sub-band over a sliding window"""
+
+    sub_band: SubBand
+    window: float
+    # Airtime allowed in the window (s)
+    budget: float
+    # Airtime of the transmissions in the window (s)
+    used: float
+    _transmissions: Deque[Tuple[float, float]]
+
+    def __init__(self, sub_band: SubBand, window: float = DEFAULT_WINDOW):
+        self.sub_band = sub_band
+        self.window = window
+        self.budget = sub_band.duty_cycle * window
+        self.used = 0.0
+        self._transmissions = deque()
+
+    def expire(self, now: float) -> None:
+        """Forget transmissions that started before the window ending now"""
+        transmissions = self._transmissions
+        while len(transmissions) > 0 and transmissions[0][0] <= now - self.window:
+            self.used -= transmissions.popleft()[1]
+
+        if len(transmissions) == 0:
+            self.used = 0.0
+
+    def remaining(self, now: float) -> float:
+        """Get the airtime left in the window ending now (s)"""
+        self.expire(now)
+        return max(0.0, self.budget - self.used)
+
+    def delay(self, duration: float, now: float) -> float:
+        """Get the time until a transmission of duration seconds fits the budget"""
+        self.expire(now)
+
+        used = self.used
+        if used + duration <= self.budget:
+            return 0.0
+
+        # Wait for the oldest transmissions to leave the window
+        for start, expired in self._transmissions:
+            used -= expired
+            if used + duration <= self.budget:
+                return start + self.window - now
+
+        raise ValueError(f"Transmission is longer than the {self.sub_band.name} budget")
+
+    def record(self, start: float, duration: float) -> None:
+        """Record a transmission"""
+        self._transmissions.append((start, duration))
+        self.used += duration
+
+
+class QueuedPacket(NamedTuple):
+    """A packet waiting for duty cycle budget"""
+
+    tx_config: TXConfig
+    # TX config struct bytes, to group packets with the same config
+    config_bytes: bytes
+    packet: bytes
+    # Airtime (s)
+    duration: float
+    queued: float
+
+
+class DutyCycleScheduler:
+    """Transmit packets as soon as the duty cycle limits of their sub-band allow
+
+    Each packet's airtime is estimated from its length and TX config, and charged to the
+    sub-band containing the TX frequency over a sliding window. Packets are queued per
+    sub-band, so an exhausted sub-band doesn't hold up the others, and each queue is
+    released in order as soon as its budget allows. Frequencies outside every sub-band
+    are not limited.
+    """
+
+    radio: CC1101
+    sub_bands: List[SubBand]
+    windows: Dict[str, DutyCycleWindow]
+    queues: Dict[Optional[str], Deque[QueuedPacket]]
+    transmitted: int
+    # Total and maximum time packets waited in the queues (s)
+    total_delay: float
+    max_delay: float
+
+    def __init__(
+        self,
+        radio: CC1101,
+        sub_bands: Sequence[SubBand] = ETSI_SUB_BANDS,
+        window: float = DEFAULT_WINDOW,
+    ):
+        self.radio = radio
+        self.sub_bands = list(sub_bands)
+        self.windows = {b.name: DutyCycleWindow(b, window) for b in sub_bands}
+        self.queues = {}
+        self.transmitted = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+    def sub_band(self, frequency: float) -> Optional[SubBand]:
+        """Get the sub-band containing a frequency in MHz"""
+        for sub_band in self.sub_bands:
+            if sub_band.low <= frequency < sub_band.high:
+                return sub_band
+
+        return None
+
+    def _window(self, tx_config: TXConfig) -> Optional[DutyCycleWindow]:
+        sub_band = self.sub_band(tx_config.get_common_config().get_frequency())
+        return self.windows[sub_band.name] if sub_band is not None else None
+
+    def submit(self, tx_config: TXConfig, packet: bytes) -> None:
+        """Queue a packet to transmit"""
+        duration = airtime(tx_config, len(packet)) / 1e9
+        window = self._window(tx_config)
+
+        if window is not None and duration > window.budget:
+            raise ValueError(
+                f"Packet is longer than the {window.sub_band.name} duty cycle budget"
+            )
+
+        name = window.sub_band.name if window is not None else None
+        queue = self.queues.setdefault(name, deque())
+        queue.append(
+            QueuedPacket(
+                tx_config,
+                bytes(tx_config.to_bytes()),
+                packet,
+                duration,
+                time.monotonic(),
+            )
+        )
+
+    def remaining(self, frequency: float) -> float:
+        """Get the airtime left in the sub-band of a frequency in MHz (s)"""
+        sub_band = self.sub_band(frequency)
+        if sub_band is None:
+            return float("inf")
+
+        return self.windows[sub_band.name].remaining(time.monotonic())
+
+    def queue_delay(self, frequency: float) -> float:
+        """Get the time until every packet queued for a frequency's sub-band is transmitted"""
+        sub_band = self.sub_band(frequency)
+        name = sub_band.name if sub_band is not None else None
+        queue = self.queues.get(name, deque())
+
+        if sub_band is None or len(queue) == 0:
+            return 0.0
+
+        # Replay the queue against a copy of the window
+        original = self.windows[sub_band.name]
+        window = DutyCycleWindow(sub_band, original.window)
+        window._transmissions = deque(original._transmissions)
+        window.used = original.used
+
+        now = time.monotonic()
+        at = now
+        for queued in queue:
+            at += window.delay(queued.duration, at)
+            window.record(at, queued.duration)
+            at += queued.duration
+
+        return at - now
+
+    def transmit_ready(self) -> int:
+        """Transmit the queued packets the duty cycle limits allow now
+
+        Consecutive packets with the same TX config are transmitted with one configuration
+        of the device. Returns the number of packets transmitted.
+        """
+        transmitted = 0
+
+        for name, queue in self.queues.items():
+            window = self.windows[name] if name is not None else None
+
+            while len(queue) > 0:
+                now = time.monotonic()
+                config_bytes = queue[0].config_bytes
+                run: List[QueuedPacket] = []
+
+                # Each packet of a run starts once the previous one has been sent
+                start = now
+                while len(queue) > 0 and queue[0].config_bytes == config_bytes:
+                    queued = queue[0]
+                    if window is not None:
+                        if window.delay(queued.duration, now) > 0:
+                            break
+                        window.record(start, queued.duration)
+
+                    run.append(queue.popleft())
+                    start += queued.duration
+
+                if len(run) == 0:
+                    break
+
+                self.radio.transmit_batch(run[0].tx_config, [q.packet for q in run])
+
+                for queued in run:
+                    delay = now - queued.queued
+                    self.total_delay += delay
+                    self.max_delay = max(self.max_delay, delay)
+                transmitted += len(run)
+
+        self.transmitted += transmitted
+        return transmitted
+
+    def next_release(self) -> Optional[float]:
+        """Get the time until a queued packet can be sent, or None if none are queued"""
+        now = time.monotonic()
+        delays = [
+            (
+                self.windows[name].delay(queue[0].duration, now)
+                if name is not None
+                else 0.0
+            )
+            for name, queue in self.queues.items()
+            if len(queue) > 0
+        ]
+
+        return min(delays) if len(delays) > 0 else None
+
+    def run(self) -> None:
+        """Transmit the queued packets, waiting for budget, until the queues are empty"""
+        while True:
+            self.transmit_ready()
+
+            delay = self.next_release()
+            if delay is None:
+                return
+            time.sleep(delay)
+
+    @property
+    def mean_delay(self) -> float:
+        """Mean time transmitted packets waited in the queues (s)"""
+        return self.total_delay / self.transmitted if self.transmitted > 0 else 0.0
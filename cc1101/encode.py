@@ -0,0 +1,158 @@
+"""
+Copyright (c) 2022
+"""
+
+from functools import lru_cache
+from typing import List, NamedTuple
+
+from cc1101.decode import LineCoding, PulseDecoder
+from cc1101.protocols import Timing
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _samples(count: float) -> int:
+    """Round a length in samples, to at least one sample"""
+    return max(1, round(count))
+
+
+def to_bytes(samples: str) -> bytes:
+    """Convert a string of '0' and '1' samples to bytes, padding the end with 0"""
+    if len(samples) == 0:
+        return b""
+
+    samples += "0" * (-len(samples) % 8)
+    return int(samples, 2).to_bytes(len(samples) // 8, "big")
+
+
+class LineEncoder:
+    """Encode bits as samples, one per bit at the transmit baud rate
+
+    Each bit is replaced by a fixed string of samples, with end appended after the last bit.
+    The samples for every byte value are precomputed, so encoding looks up and joins one
+    table entry per byte of the payload.
+    """
+
+    zero: str
+    one: str
+    end: str
+    _bits: List[str]
+    _bytes: List[str]
+
+    def __init__(self, zero: str, one: str, end: str = ""):
+        self.zero = zero
+        self.one = one
+        self.end = end
+        self._bits = [zero, one]
+        self._bytes = [
+            "".join(one if value & (0x80 >> i) else zero for i in range(8))
+            for value in range(256)
+        ]
+
+    @classmethod
+    def ppm(cls, pulse: int, zero: int, one: int, sync: int) -> "LineEncoder":
+        """Pulse distance - a pulse followed by a zero or one length gap, ending with a sync"""
+        return cls(
+            "1" * pulse + "0" * zero, "1" * pulse + "0" * one, "1" * pulse + "0" * sync
+        )
+
+    @classmethod
+    def pwm(cls, zero: int, one: int, gap: int, sync: int) -> "LineEncoder":
+        """Pulse width - a zero or one length pulse followed by a gap, the last gap a sync"""
+        return cls("1" * zero + "0" * gap, "1" * one + "0" * gap, "0" * (sync - gap))
+
+    @classmethod
+    def manchester(cls, half: int = 1) -> "LineEncoder":
+        """Manchester (IEEE 802.3) - zero is high then low, one is low then high"""
+        return cls("1" * half + "0" * half, "0" * half + "1" * half)
+
+    @classmethod
+    def nrz(cls, width: int = 1) -> "LineEncoder":
+        """Non-return-to-zero - each bit is width samples of its value"""
+        return cls("0" * width, "1" * width)
+
+    @classmethod
+    def from_timing(cls, timing: Timing, baud_rate: float) -> "LineEncoder":
+        """Construct an encoder from nominal timings in microseconds and a baud rate in kBaud
+
+        For PPM, separator is the pulse length. For PWM, it is the gap after each pulse.
+        """
+        sample = 1000 / baud_rate
+        separator = timing.separator if timing.separator is not None else sample
+
+        if timing.coding == LineCoding.PPM:
+            return cls.ppm(
+                _samples(separator / sample),
+                _samples(timing.zero / sample),
+                _samples(timing.one / sample),
+                _samples(timing.sync / sample),
+            )
+        else:
+            return cls.pwm(
+                _samples(timing.zero / sample),
+                _samples(timing.one / sample),
+                _samples(separator / sample),
+                _samples(timing.sync / sample),
+            )
+
+    @classmethod
+    def for_decoder(cls, decoder: PulseDecoder) -> "LineEncoder":
+        """Construct an encoder producing samples in the middle of a decoder's ranges"""
+
+        def middle(low: int, high: int) -> int:
+            return (low + high) // 2
+
+        separator = decoder.separator if decoder.separator is not None else (1, 1)
+
+        if decoder.coding == LineCoding.PPM:
+            return cls.ppm(
+                middle(*separator),
+                middle(*decoder.zero),
+                middle(*decoder.one),
+                decoder.sync,
+            )
+        else:
+            return cls.pwm(
+                middle(*decoder.zero),
+                middle(*decoder.one),
+                middle(*separator),
+                decoder.sync,
+            )
+
+    def encode_bits(self, bits: int, length: int) -> str:
+        """Encode the low length bits of an integer, most significant first, to samples"""
+        head = length % 8
+        table = self._bits
+
+        samples = "".join(
+            table[(bits >> i) & 1] for i in range(length - 1, length - head - 1, -1)
+        )
+
+        body = (bits & ((1 << (length - head)) - 1)).to_bytes(
+            (length - head) // 8, "big"
+        )
+        return samples + "".join(map(self._bytes.__getitem__, body)) + self.end
+
+    def encode(self, data: bytes) -> str:
+        """Encode bytes to samples"""
+        return "".join(map(self._bytes.__getitem__, data)) + self.end
+
+
+class FrameTemplate(NamedTuple):
+    """Layout of a transmission of a frame
+
+    preamble is sent once at the start, then header and the encoded frame repeats times.
+    Both are strings of '0' and '1' samples.
+    """
+
+    encoder: LineEncoder
+    repeats: int = 1
+    preamble: str = ""
+    header: str = ""
+
+
+@lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def encode_frame(template: FrameTemplate, bits: int, length: int) -> bytes:
+    """Encode a frame of length bits to bytes to transmit, caching recent frames"""
+    frame = template.header + template.encoder.encode_bits(bits, length)
+    return to_bytes(template.preamble + frame * template.repeats)
@@ -34,8 +34,9 @@ class CC1101Exception(Exception):
 
 
 class DeviceException(CC1101Exception):
-    def __init__(self, error: DeviceError):
+    def __init__(self, error: DeviceError, errno: int = 0):
         self.error = error
+        self.errno = errno
 
 
 class ConfigException(CC1101Exception):
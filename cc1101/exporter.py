@@ -0,0 +1,246 @@
+"""
+Copyright (c) 2022
+"""
+
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, List, Optional, Tuple
+
+from cc1101 import CC1101
+from cc1101.errors import DeviceException
+from cc1101.poll import DEFAULT_LATENCY, AdaptivePoller
+from cc1101.stats import Histogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Metric families in output order - (name, type, help)
+FAMILIES = [
+    ("cc1101_packets", "counter", "Packets received"),
+    ("cc1101_bytes", "counter", "Bytes received"),
+    ("cc1101_packet_rate", "gauge", "Packets received per second"),
+    ("cc1101_byte_rate", "gauge", "Bytes received per second"),
+    ("cc1101_reconfigurations", "counter", "RX configuration writes to the device"),
+    ("cc1101_drain_batch_packets", "histogram", "Packets returned per buffer drain"),
+    ("cc1101_rssi_dbm", "histogram", "RSSI sampled after each non-empty drain"),
+    ("cc1101_ioctl_latency_seconds", "histogram", "IOCTL latency"),
+    ("cc1101_errors", "counter", "Device errors"),
+    ("cc1101_lbt_transmits", "counter", "Packets transmitted after listen before talk"),
+    (
+        "cc1101_lbt_timeouts",
+        "counter",
+        "Listen before talk attempts the channel was busy for",
+    ),
+    (
+        "cc1101_channel_busy_seconds",
+        "histogram",
+        "Time listen before talk waited for a clear channel",
+    ),
+    ("cc1101_filter_passed", "counter", "Packets passed by the receive filter"),
+    ("cc1101_filter_dropped", "counter", "Packets dropped by the receive filter"),
+]
+
+
+def _label_value(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    """Render the samples of a histogram"""
+    lines = []
+
+    for bound, count in zip(list(histogram.bounds) + ["+Inf"], histogram.cumulative()):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+
+    return lines
+
+
+class MetricsExporter:
+    """Receive from a set of CC1101 devices and serve their statistics in OpenMetrics format
+
+    Each receive loop periodically renders the statistics for its device. A scrape only joins
+    the most recently rendered samples, so never waits on or interrupts a receive loop.
+    """
+
+    radios: List[CC1101]
+    render_interval: float
+    latency: float
+    _samples: Dict[str, Dict[str, List[str]]]
+
+    def __init__(
+        self,
+        radios: List[CC1101],
+        render_interval: float = 1.0,
+        latency: float = DEFAULT_LATENCY,
+    ):
+        self.radios = radios
+        self.render_interval = render_interval
+        self.latency = latency
+        self._samples = {}
+
+    def render(
+        self, radio: CC1101, rates: Tuple[float, float] = (0.0, 0.0)
+    ) -> Dict[str, List[str]]:
+        """Render the samples for a device, grouped by metric family"""
+
+        stats = radio.stats
+
+        fingerprint = ""
+        if radio.rx_config is not None:
+            fingerprint = radio.rx_config.fingerprint()
+
+        labels = f'device="{_label_value(radio.dev)}",fingerprint="{fingerprint}"'
+
+        samples = {
+            "cc1101_packets": [f"cc1101_packets_total{{{labels}}} {stats.packets}"],
+            "cc1101_bytes": [f"cc1101_bytes_total{{{labels}}} {stats.bytes}"],
+            "cc1101_packet_rate": [f"cc1101_packet_rate{{{labels}}} {rates[0]}"],
+            "cc1101_byte_rate": [f"cc1101_byte_rate{{{labels}}} {rates[1]}"],
+            "cc1101_reconfigurations": [
+                f"cc1101_reconfigurations_total{{{labels}}} {stats.reconfigurations}"
+            ],
+            "cc1101_drain_batch_packets": _histogram_lines(
+                "cc1101_drain_batch_packets", labels, stats.drain_batch
+            ),
+            "cc1101_rssi_dbm": _histogram_lines("cc1101_rssi_dbm", labels, stats.rssi),
+            "cc1101_ioctl_latency_seconds": [],
+            "cc1101_errors": [],
+            "cc1101_lbt_transmits": [
+                f"cc1101_lbt_transmits_total{{{labels}}} {stats.lbt_transmits}"
+            ],
+            "cc1101_lbt_timeouts": [
+                f"cc1101_lbt_timeouts_total{{{labels}}} {stats.lbt_timeouts}"
+            ],
+            "cc1101_channel_busy_seconds": _histogram_lines(
+                "cc1101_channel_busy_seconds", labels, stats.channel_busy
+            ),
+            "cc1101_filter_passed": [],
+            "cc1101_filter_dropped": [],
+        }
+
+        for command, histogram in stats.ioctl_latency.items():
+            if histogram.count > 0:
+                samples["cc1101_ioctl_latency_seconds"] += _histogram_lines(
+                    "cc1101_ioctl_latency_seconds",
+                    f'{labels},ioctl="{command.name}"',
+                    histogram,
+                )
+
+        for error, count in stats.errors.items():
+            samples["cc1101_errors"].append(
+                f'cc1101_errors_total{{{labels},error="{error.name}"}} {count}'
+            )
+
+        packet_filter = radio.packet_filter
+        if packet_filter is not None:
+            samples["cc1101_filter_passed"].append(
+                f"cc1101_filter_passed_total{{{labels}}} {packet_filter.passed}"
+            )
+            for name, count in packet_filter.dropped.items():
+                samples["cc1101_filter_dropped"].append(
+                    f'cc1101_filter_dropped_total{{{labels},condition="{_label_value(name)}"}}'
+                    f" {count}"
+                )
+
+        return samples
+
+    def scrape(self) -> bytes:
+        """Get the most recently rendered samples of all devices"""
+
+        # Take a reference - receive loops replace entries rather than modifying them
+        samples = list(self._samples.values())
+
+        lines = []
+        for name, metric_type, description in FAMILIES:
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"# HELP {name} {description}")
+            for device_samples in samples:
+                lines += device_samples[name]
+
+        lines.append("# EOF\n")
+        return "\n".join(lines).encode("utf-8")
+
+    def receive_loop(self, radio: CC1101) -> None:
+        """Receive packets from a device forever, periodically rendering its statistics"""
+
+        last_render = time.monotonic()
+        last_packets = radio.stats.packets
+        last_bytes = radio.stats.bytes
+
+        self._samples[radio.dev] = self.render(radio)
+        poller = AdaptivePoller.for_radio(radio, self.latency)
+        last_error = None
+
+        while True:
+            received = 0
+            try:
+                batch = radio.receive_batch(read_rssi=True)
+                received = batch.drained
+                if batch.rssi is not None:
+                    radio.stats.rssi.observe(batch.rssi)
+                last_error = None
+            except DeviceException as e:
+                print(f"{radio.dev}: {e.error.name}", file=sys.stderr)
+            except OSError as e:
+                # Keep retrying, e.g until a removed device is back, but only log changes
+                if str(e) != last_error:
+                    print(f"{radio.dev}: {e}", file=sys.stderr)
+                last_error = str(e)
+
+            now = time.monotonic()
+            if now - last_render >= self.render_interval:
+                elapsed = now - last_render
+                rates = (
+                    (radio.stats.packets - last_packets) / elapsed,
+                    (radio.stats.bytes - last_bytes) / elapsed,
+                )
+                self._samples[radio.dev] = self.render(radio, rates)
+
+                last_render = now
+                last_packets = radio.stats.packets
+                last_bytes = radio.stats.bytes
+
+            poller.wait(received)
+
+    def serve(self, address: str = "127.0.0.1", port: int = 9101) -> None:
+        """Start a receive loop for each device and serve /metrics until interrupted"""
+
+        for radio in self.radios:
+            threading.Thread(
+                target=self.receive_loop, args=(radio,), daemon=True
+            ).start()
+
+        server = _MetricsServer((address, port), _MetricsHandler)
+        server.exporter = self
+        server.serve_forever()
+
+
+class _MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    exporter: Optional[MetricsExporter] = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: _MetricsServer
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics" or self.server.exporter is None:
+            self.send_error(404)
+            return
+
+        body = self.server.exporter.scrape()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
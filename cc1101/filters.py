@@ -0,0 +1,183 @@
+"""
+Copyright (c) 2022
+"""
+
+import re
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+Predicate = Callable[[bytes], bool]
+
+_LENGTH = re.compile(r"^len(>=|<=|==)(\d+)$")
+_TRANSITIONS = re.compile(r"^transitions>=([0-9.]+)$")
+_RSSI = re.compile(r"^rssi>=(-?[0-9.]+)$")
+_BYTES = re.compile(r"^\[(\d+)(?::(\d+))?\](?:&(\w+))?==(\w+)$")
+
+
+class Condition(NamedTuple):
+    """A named check a packet must pass"""
+
+    name: str
+    predicate: Predicate
+
+
+def length(operator: str, value: int) -> Predicate:
+    """Packet length compared to a value"""
+    if operator == ">=":
+        return lambda packet: len(packet) >= value
+    elif operator == "<=":
+        return lambda packet: len(packet) <= value
+    else:
+        return lambda packet: len(packet) == value
+
+
+def transitions(density: float) -> Predicate:
+    """At least a fraction of adjacent bits differ, rejecting carrier and silence"""
+
+    def predicate(packet: bytes) -> bool:
+        bits = len(packet) * 8
+        if bits < 2:
+            return False
+
+        value = int.from_bytes(packet, "big")
+        changes = (value ^ (value >> 1)) & ((1 << (bits - 1)) - 1)
+        return bin(changes).count("1") >= density * (bits - 1)
+
+    return predicate
+
+
+def nonconstant() -> Predicate:
+    """Not all 0 or all 1 bits"""
+
+    def predicate(packet: bytes) -> bool:
+        size = len(packet)
+        return packet.count(0) != size and packet.count(0xFF) != size
+
+    return predicate
+
+
+def match(
+    offset: int, end: Optional[int], mask: Optional[int], value: int
+) -> Predicate:
+    """Bytes from offset, optionally masked, equal a value"""
+    if end is None:
+        if mask is None:
+            return lambda packet: len(packet) > offset and packet[offset] == value
+        return lambda packet: len(packet) > offset and packet[offset] & mask == value
+
+    bytes_mask = mask if mask is not None else (1 << ((end - offset) * 8)) - 1
+
+    def predicate(packet: bytes) -> bool:
+        if len(packet) < end:
+            return False
+        return int.from_bytes(packet[offset:end], "big") & bytes_mask == value
+
+    return predicate
+
+
+def parse_condition(expression: str) -> Condition:
+    """Compile a packet condition expression
+
+    len>=N, len<=N, len==N   - packet length in bytes
+    transitions>=F           - fraction of adjacent bits that differ
+    nonconstant              - not all 0 or all 1 bits
+    [O]==V, [O]&M==V         - byte at offset O, optionally masked
+    [O:E]==V, [O:E]&M==V     - big endian value of bytes O to E, optionally masked
+    """
+    expression = expression.replace(" ", "")
+
+    m = _LENGTH.match(expression)
+    if m is not None:
+        return Condition(expression, length(m.group(1), int(m.group(2))))
+
+    m = _TRANSITIONS.match(expression)
+    if m is not None:
+        return Condition(expression, transitions(float(m.group(1))))
+
+    if expression == "nonconstant":
+        return Condition(expression, nonconstant())
+
+    m = _BYTES.match(expression)
+    if m is not None:
+        offset = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) is not None else None
+        mask = int(m.group(3), 0) if m.group(3) is not None else None
+
+        if end is not None and end <= offset:
+            raise ValueError(f"Invalid byte range in filter {expression}")
+
+        return Condition(expression, match(offset, end, mask, int(m.group(4), 0)))
+
+    raise ValueError(f"Invalid filter {expression}")
+
+
+class PacketFilter:
+    """Drop packets from each drain of the receive buffer that fail any condition
+
+    Conditions are compiled to predicates once, and checked in order so the cheapest should
+    be first. rssi>=N compares the RSSI sampled once after a drain and drops the whole
+    batch. The number of packets passed and dropped by each condition are counted.
+    """
+
+    conditions: List[Condition]
+    min_rssi: Optional[float]
+    passed: int
+    dropped: Dict[str, int]
+
+    def __init__(
+        self, conditions: Sequence[Condition], min_rssi: Optional[float] = None
+    ):
+        self.conditions = list(conditions)
+        self.min_rssi = min_rssi
+        self.passed = 0
+        self.dropped = {c.name: 0 for c in self.conditions}
+
+        if min_rssi is not None:
+            self.dropped[self._rssi_name] = 0
+
+    @classmethod
+    def parse(cls, expressions: Sequence[str]) -> "PacketFilter":
+        """Construct a filter from condition expressions, see parse_condition() and rssi>=N"""
+        conditions = []
+        min_rssi = None
+
+        for expression in expressions:
+            m = _RSSI.match(expression.replace(" ", ""))
+            if m is not None:
+                min_rssi = float(m.group(1))
+            else:
+                conditions.append(parse_condition(expression))
+
+        return cls(conditions, min_rssi)
+
+    @property
+    def _rssi_name(self) -> str:
+        return f"rssi>={self.min_rssi}"
+
+    def select(self, packets: List[bytes], rssi: Optional[float] = None) -> List[int]:
+        """Get the indices of the packets passing all conditions"""
+        if len(packets) == 0:
+            return []
+
+        if self.min_rssi is not None and rssi is not None and rssi < self.min_rssi:
+            self.dropped[self._rssi_name] += len(packets)
+            return []
+
+        conditions = self.conditions
+        dropped = self.dropped
+        ret = []
+
+        for i, packet in enumerate(packets):
+            for name, predicate in conditions:
+                if not predicate(packet):
+                    dropped[name] += 1
+                    break
+            else:
+                ret.append(i)
+
+        self.passed += len(ret)
+        return ret
+
+    def apply(self, packets: List[bytes], rssi: Optional[float] = None) -> List[bytes]:
+        """Get the packets passing all conditions"""
+        return [packets[i] for i in self.select(packets, rssi)]
@@ -0,0 +1,167 @@
+"""
+Copyright (c) 2022
+"""
+
+import copy
+import time
+
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from cc1101 import CC1101
+from cc1101.batch import PacketBatch
+from cc1101.config import CommonConfig, RXConfig, TXConfig
+from cc1101.poll import AdaptivePoller
+
+
+class HopBatch(NamedTuple):
+    """A drain of the receive buffer, with the hop it was received on"""
+
+    hop: int
+    frequency: float
+    batch: PacketBatch
+
+
+class HopReport(NamedTuple):
+    """Time spent changing channel"""
+
+    hops: int
+    # Mean and maximum time taken by the config IOCTL of a hop (s)
+    mean_overhead: float
+    max_overhead: float
+
+
+class HopSequence:
+    """A channel list, with the driver structs for every hop serialized in advance
+
+    The base RX and/or TX config is copied for each channel and validated once. Hopping
+    then passes the stored struct bytes straight to the IOCTL, so changing channel doesn't
+    rebuild a config. Each transmit or receive loop continues from the hop the previous
+    one stopped at, cycling through the channel list.
+    """
+
+    channels: List[float]
+    rx_configs: List[RXConfig]
+    rx_config_bytes: List[bytearray]
+    tx_config_bytes: List[bytearray]
+    position: int
+    hops: int
+    _overhead: int
+    _max_overhead: int
+
+    def __init__(
+        self,
+        channels: Sequence[float],
+        rx_config: Optional[RXConfig] = None,
+        tx_config: Optional[TXConfig] = None,
+    ):
+        if len(channels) == 0:
+            raise ValueError("At least one channel is required")
+
+        if rx_config is None and tx_config is None:
+            raise ValueError("A RX or TX config is required")
+
+        self.channels = []
+        self.rx_configs = []
+        self.rx_config_bytes = []
+        self.tx_config_bytes = []
+
+        for frequency in channels:
+            if rx_config is not None:
+                hop_rx_config = copy.deepcopy(rx_config)
+                hop_rx_config.get_common_config().set_frequency(frequency)
+                self.rx_configs.append(hop_rx_config)
+                self.rx_config_bytes.append(hop_rx_config.to_bytes())
+
+            if tx_config is not None:
+                hop_tx_config = copy.deepcopy(tx_config)
+                hop_tx_config.get_common_config().set_frequency(frequency)
+                self.tx_config_bytes.append(hop_tx_config.to_bytes())
+
+            # The frequency the device is actually configured with
+            self.channels.append(
+                CommonConfig.config_to_frequency(
+                    CommonConfig.frequency_to_config(frequency)
+                )
+            )
+
+        self.position = 0
+        self.hops = 0
+        self._overhead = 0
+        self._max_overhead = 0
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def _record(self, overhead: int) -> None:
+        self.hops += 1
+        self._overhead += overhead
+        self._max_overhead = max(self._max_overhead, overhead)
+
+    def hop_transmit(self, radio: CC1101, payloads: Sequence[bytes]) -> None:
+        """Transmit each payload on the next hop"""
+        if len(self.tx_config_bytes) == 0:
+            raise ValueError("No TX config to transmit with")
+
+        count = len(self.channels)
+        configs = [
+            self.tx_config_bytes[(self.position + i) % count]
+            for i in range(len(payloads))
+        ]
+
+        for overhead in radio.transmit_configs(configs, payloads):
+            self._record(overhead)
+
+        self.position = (self.position + len(payloads)) % count
+
+    def hop_receive(
+        self,
+        radio: CC1101,
+        dwell: float,
+        hops: Optional[int] = None,
+        read_rssi: bool = False,
+    ) -> Iterator[HopBatch]:
+        """Receive on each hop for dwell seconds, for a number of hops or forever
+
+        The receive buffer is drained at the end of each dwell, and more often if the
+        dwell is longer than it takes to fill half of the buffer.
+        """
+        if len(self.rx_configs) == 0:
+            raise ValueError("No RX config to receive with")
+
+        max_interval = AdaptivePoller(
+            self.rx_configs[0], radio.get_max_packet_size(), dwell
+        ).max_interval
+        count = len(self.channels)
+        hop = 0
+
+        while hops is None or hop < hops:
+            position = self.position
+
+            start = time.perf_counter_ns()
+            radio.switch_rx_config(
+                self.rx_configs[position], self.rx_config_bytes[position]
+            )
+            self._record(time.perf_counter_ns() - start)
+
+            deadline = time.monotonic() + dwell
+            while True:
+                remaining = deadline - time.monotonic()
+                time.sleep(max(0.0, min(remaining, max_interval)))
+
+                batch = radio.receive_batch(read_rssi)
+                if len(batch) > 0:
+                    yield HopBatch(position, self.channels[position], batch)
+
+                if remaining <= max_interval:
+                    break
+
+            self.position = (position + 1) % count
+            hop += 1
+
+    def report(self) -> HopReport:
+        """Get the number of hops and the time taken to change channel"""
+        return HopReport(
+            self.hops,
+            self._overhead / self.hops / 1e9 if self.hops > 0 else 0.0,
+            self._max_overhead / 1e9,
+        )
@@ -33,15 +33,15 @@ def handle_status(status: int) -> None:
     if status == 0:
         return
     elif status == errno.EIO:
-        raise DeviceException(DeviceError.INVALID_IOCTL)
+        raise DeviceException(DeviceError.INVALID_IOCTL, status)
     elif status == errno.EFAULT:
-        raise DeviceException(DeviceError.COPY)
+        raise DeviceException(DeviceError.COPY, status)
     elif status == errno.EINVAL:
-        raise DeviceException(DeviceError.INVALID_CONFIG)
+        raise DeviceException(DeviceError.INVALID_CONFIG, status)
     elif status == errno.ENOMEM:
-        raise DeviceException(DeviceError.OUT_OF_MEMORY)
+        raise DeviceException(DeviceError.OUT_OF_MEMORY, status)
     else:
-        raise DeviceException(DeviceError.UNKNOWN)
+        raise DeviceException(DeviceError.UNKNOWN, status)
 
 
 def call(fh: int, cmd: IOCTL) -> None:
@@ -0,0 +1,196 @@
+"""
+Copyright (c) 2022
+"""
+
+import threading
+import time
+
+from collections import deque
+from enum import Enum
+from typing import BinaryIO, Deque, List, Optional, Sequence
+
+DEFAULT_QUEUE_SIZE = 4096
+DEFAULT_BUFFER_SIZE = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.1
+
+
+class DropPolicy(Enum):
+    """What to do with output when the queue is full"""
+
+    # Discard the oldest queued output to make space
+    OLDEST = "drop-oldest"
+    # Discard the new output
+    NEWEST = "drop-newest"
+    # Wait for space, stalling the receive loop
+    BLOCK = "block"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class OutputWriter:
+    """Write output from a thread, so a stalled reader doesn't stall receiving
+
+    Output is queued in a bounded queue of items (e.g packets or lines). A writer thread
+    joins queued items into buffer_size writes, writing and flushing at least every
+    flush_interval seconds while output is pending. When the queue is full, items are
+    dropped according to the policy and counted. Has write() and flush(), so can be used
+    in place of a binary file.
+
+    If writing fails, e.g because the reader closed the pipe, the error is stored and
+    further output is dropped.
+    """
+
+    f: BinaryIO
+    queue_size: int
+    policy: DropPolicy
+    buffer_size: int
+    flush_interval: float
+    written: int
+    dropped: int
+    error: Optional[OSError]
+    _queue: Deque[bytes]
+    _condition: threading.Condition
+    _flush: bool
+    _closed: bool
+    _thread: threading.Thread
+
+    def __init__(
+        self,
+        f: BinaryIO,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        policy: DropPolicy = DropPolicy.OLDEST,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.f = f
+        self.queue_size = queue_size
+        self.policy = policy
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._flush = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, items: Sequence[bytes]) -> None:
+        """Queue items to be written"""
+        if len(items) == 0:
+            return
+
+        queue = self._queue
+
+        with self._condition:
+            for item in items:
+                if self.error is not None or self._closed:
+                    self.dropped += 1
+                    continue
+
+                if len(queue) >= self.queue_size:
+                    if self.policy == DropPolicy.NEWEST:
+                        self.dropped += 1
+                        continue
+                    elif self.policy == DropPolicy.OLDEST:
+                        queue.popleft()
+                        self.dropped += 1
+                    else:
+                        self._condition.wait_for(
+                            lambda: len(queue) < self.queue_size
+                            or self.error is not None
+                            or self._closed
+                        )
+                        if self.error is not None or self._closed:
+                            self.dropped += 1
+                            continue
+
+                queue.append(item)
+
+            self._condition.notify_all()
+
+    def write(self, data: bytes) -> int:
+        """Queue data to be written as one item"""
+        self.put([data])
+        return len(data)
+
+    def flush(self) -> None:
+        """Ask the writer thread to write the buffered output now, without waiting"""
+        with self._condition:
+            self._flush = True
+            self._condition.notify_all()
+
+    def _take(self, timeout: Optional[float]) -> List[bytes]:
+        """Wait for queued items, a flush, close or a timeout, then take the queued items"""
+        with self._condition:
+            if len(self._queue) == 0 and not self._flush and not self._closed:
+                self._condition.wait(timeout)
+
+            items = list(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+            return items
+
+    def _run(self) -> None:
+        buffer: List[bytes] = []
+        size = 0
+        last_write = time.monotonic()
+
+        while True:
+            timeout = None
+            if len(buffer) > 0:
+                timeout = max(0.0, last_write + self.flush_interval - time.monotonic())
+
+            items = self._take(timeout)
+            buffer += items
+            size += sum(len(item) for item in items)
+
+            with self._condition:
+                flush = self._flush
+                closed = self._closed
+                self._flush = False
+
+            now = time.monotonic()
+            if len(buffer) > 0 and (
+                size >= self.buffer_size
+                or flush
+                or closed
+                or now - last_write >= self.flush_interval
+            ):
+                try:
+                    self.f.write(b"".join(buffer))
+                    self.f.flush()
+                except OSError as e:
+                    with self._condition:
+                        self.error = e
+                        self.dropped += len(buffer) + len(self._queue)
+                        self._queue.clear()
+                        self._condition.notify_all()
+                    return
+
+                self.written += len(buffer)
+                buffer = []
+                size = 0
+                last_write = now
+
+            if closed and len(buffer) == 0:
+                with self._condition:
+                    if len(self._queue) == 0:
+                        return
+
+    def close(self) -> None:
+        """Write the queued output and stop the writer thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
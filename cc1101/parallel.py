@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2022
+"""
+
+import mmap
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cc1101.protocols import Message, ProtocolRegistry, PROTOCOLS
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_OVERLAP = 1024
+
+# Registry of each worker process, constructed once by the pool initializer
+_registry: Optional[ProtocolRegistry] = None
+
+
+class Chunk(NamedTuple):
+    """A range of a capture to decode, with the margins read either side of it"""
+
+    start: int
+    end: int
+    read_start: int
+    read_end: int
+
+
+def chunks(size: int, chunk_size: int, overlap: int, packet_length: int) -> List[Chunk]:
+    """Split a capture into chunks on packet boundaries, overlapping their neighbours
+
+    Frames are assigned to the chunk their sync starts in. The overlap before a chunk must
+    hold the longest frame, and the overlap after it the longest sync.
+    """
+    chunk_size = max(packet_length, chunk_size - chunk_size % packet_length)
+
+    return [
+        Chunk(
+            start,
+            min(start + chunk_size, size),
+            max(0, start - overlap),
+            min(start + chunk_size + overlap, size),
+        )
+        for start in range(0, size, chunk_size)
+    ]
+
+
+def registry(
+    baud_rate: float, protocols: Sequence[str], packet_duration: Optional[int] = None
+) -> ProtocolRegistry:
+    """Construct a registry of protocols by name"""
+    by_name = {p.name: p for p in PROTOCOLS}
+    ret = ProtocolRegistry(baud_rate, packet_duration)
+
+    for name in protocols:
+        if name not in by_name:
+            raise ValueError(f"Unknown protocol {name}")
+        ret.register(by_name[name])
+
+    return ret
+
+
+def _init_worker(baud_rate: float, protocols: Sequence[str]) -> None:
+    global _registry
+    _registry = registry(baud_rate, protocols)
+
+
+def _decode_chunk(args: Tuple[str, Chunk]) -> List[Message]:
+    """Decode the frames that end in a chunk, with sample offsets from the start of the file"""
+    path, chunk = args
+    assert _registry is not None
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[chunk.read_start : chunk.read_end]
+
+    base = chunk.read_start * 8
+    start = chunk.start * 8
+    end = chunk.end * 8
+
+    messages = []
+    for message in _registry.decode(data):
+        offset = base + message.frame.end
+        if start <= offset < end:
+            messages.append(message._replace(frame=message.frame._replace(end=offset)))
+
+    # Messages are grouped by decoder
+    messages.sort(key=lambda m: m.frame.end)
+    return messages
+
+
+def decode_file(
+    path: str,
+    baud_rate: float,
+    protocols: Sequence[str],
+    packet_length: int = 1,
+    processes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+) -> List[Message]:
+    """Decode a capture of back-to-back received packets using a pool of processes
+
+    Each process maps the file and decodes a chunk at a time. Messages are returned in the
+    order they were received, with frame end offsets counted from the start of the file.
+    """
+    # Check the protocols before starting the pool
+    registry(baud_rate, protocols)
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    jobs = [(path, c) for c in chunks(size, chunk_size, overlap, packet_length)]
+
+    with ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(baud_rate, list(protocols))
+    ) as pool:
+        return [m for messages in pool.map(_decode_chunk, jobs) for m in messages]
@@ -0,0 +1,175 @@
+"""
+Copyright (c) 2022
+"""
+
+import struct
+import time
+
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from cc1101.batch import PacketBatch
+from cc1101.config import Modulation, RXConfig
+
+# Block types
+SECTION_HEADER_BLOCK = 0x0A0D0D0A
+INTERFACE_DESCRIPTION_BLOCK = 0x00000001
+ENHANCED_PACKET_BLOCK = 0x00000006
+
+BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# There is no link type for CC1101 packets, so use the first of the user reserved types
+LINKTYPE_USER0 = 147
+
+# Option codes
+OPT_ENDOFOPT = 0
+OPT_COMMENT = 1
+SHB_USERAPPL = 4
+IF_NAME = 2
+IF_DESCRIPTION = 3
+IF_TSRESOL = 9
+
+# Enhanced packet block - type, total length, interface, timestamp high, timestamp low,
+# captured length, original length
+EPB_HEADER = struct.Struct("<IIIIIII")
+
+_TIMESTAMP = struct.Struct("<II")
+
+
+def _pad(data: bytes) -> bytes:
+    return data + bytes(-len(data) % 4)
+
+
+def option(code: int, value: bytes) -> bytes:
+    """Encode a block option"""
+    return struct.pack("<HH", code, len(value)) + _pad(value)
+
+
+def options(*encoded: bytes) -> bytes:
+    """Join encoded options, terminated with an end of options option"""
+    return b"".join(encoded) + option(OPT_ENDOFOPT, b"")
+
+
+def block(block_type: int, body: bytes) -> bytes:
+    """Encode a block with a body padded to 32 bits"""
+    body = _pad(body)
+    length = len(body) + 12
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+def config_description(rx_config: RXConfig) -> str:
+    """Describe the settings of a RXConfig that apply to every packet"""
+    common_config = rx_config.get_common_config()
+    modulation, baud_rate = common_config.get_modulation_and_baud_rate()
+
+    return (
+        f"frequency={common_config.get_frequency()}MHz "
+        f"modulation={Modulation(modulation).name} "
+        f"baud_rate={baud_rate}kBaud"
+    )
+
+
+class PcapngWriter:
+    """Write received packets to a pcapng stream for Wireshark
+
+    Each packet is an enhanced packet block with a nanosecond timestamp and a comment
+    holding the RSSI and the frequency, modulation and baud rate of the RXConfig. The
+    packet length is fixed and the RSSI only has 256 values, so everything but the
+    timestamp and packet is rendered once. Each drain is written with a single write.
+    """
+
+    f: BinaryIO
+    rx_config: RXConfig
+    packets: int
+    _baud_rate: float
+    _description: str
+    _clock_offset: int
+    _lengths: bytes
+    _padding: bytes
+    _blocks: Dict[Optional[float], Tuple[bytes, bytes]]
+
+    def __init__(self, f: BinaryIO, rx_config: RXConfig, device: str = "cc1101"):
+        self.f = f
+        self.rx_config = rx_config
+        self.packets = 0
+
+        common_config = rx_config.get_common_config()
+        _, self._baud_rate = common_config.get_modulation_and_baud_rate()
+        self._description = config_description(rx_config)
+
+        packet_length = rx_config.packet_length
+        self._lengths = struct.pack("<II", packet_length, packet_length)
+        self._padding = bytes(-packet_length % 4)
+        self._blocks = {}
+
+        # Packets are timestamped with the monotonic clock, pcapng uses the epoch
+        self._clock_offset = time.time_ns() - time.monotonic_ns()
+
+        self.f.write(self._header(device))
+
+    def _header(self, device: str) -> bytes:
+        """Render the section header and interface description blocks"""
+        section = block(
+            SECTION_HEADER_BLOCK,
+            struct.pack("<IHHq", BYTE_ORDER_MAGIC, 1, 0, -1)
+            + options(option(SHB_USERAPPL, b"cc1101-python")),
+        )
+
+        interface = block(
+            INTERFACE_DESCRIPTION_BLOCK,
+            struct.pack("<HHI", LINKTYPE_USER0, 0, self.rx_config.packet_length)
+            + options(
+                option(IF_NAME, device.encode()),
+                option(IF_DESCRIPTION, self._description.encode()),
+                option(IF_TSRESOL, bytes([9])),
+            ),
+        )
+
+        return section + interface
+
+    def _block(self, rssi: Optional[float]) -> Tuple[bytes, bytes]:
+        """Get the parts of a block before the timestamp and after the packet"""
+        if rssi in self._blocks:
+            return self._blocks[rssi]
+
+        comment = self._description
+        if rssi is not None:
+            comment = f"rssi={rssi}dBm {comment}"
+
+        block_options = options(option(OPT_COMMENT, comment.encode()))
+        length = EPB_HEADER.size + self.rx_config.packet_length + len(self._padding)
+        length += len(block_options) + 4
+
+        head = struct.pack("<III", ENHANCED_PACKET_BLOCK, length, 0)
+        tail = self._padding + block_options + struct.pack("<I", length)
+
+        self._blocks[rssi] = (head, tail)
+        return head, tail
+
+    def write_batch(self, batch: PacketBatch) -> None:
+        """Write the packets of a drain"""
+        if len(batch) == 0:
+            return
+
+        head, tail = self._block(batch.rssi)
+        lengths = self._lengths
+        packet_length = self.rx_config.packet_length
+
+        pack = _TIMESTAMP.pack
+        offset = self._clock_offset
+        parts: List[bytes] = []
+
+        for packet, timestamp in zip(
+            batch.packets, batch.packet_times(self._baud_rate)
+        ):
+            timestamp += offset
+            if len(packet) != packet_length:
+                packet = packet[:packet_length].ljust(packet_length, b"\x00")
+
+            parts += [head, pack(timestamp >> 32, timestamp & 0xFFFFFFFF), lengths]
+            parts += [packet, tail]
+
+        self.f.write(b"".join(parts))
+        self.packets += len(batch)
+
+    def flush(self) -> None:
+        self.f.flush()
@@ -0,0 +1,100 @@
+"""
+Copyright (c) 2022
+"""
+
+import time
+
+from typing import TYPE_CHECKING
+
+from cc1101.batch import packet_duration
+from cc1101.config import RXConfig
+
+if TYPE_CHECKING:
+    from cc1101 import CC1101
+
+# Default bound on the time between drains (seconds)
+DEFAULT_LATENCY = 0.1
+
+# Shortest interval between drains (seconds)
+MIN_INTERVAL = 0.001
+
+# Fraction of the driver buffer a drain should find filled
+TARGET_FILL = 0.25
+
+# Factor the interval grows by after each idle drain
+BACKOFF = 2.0
+
+
+class AdaptivePoller:
+    """Choose how long to wait between drains of the receive buffer
+
+    The interval is bounded by the time the configured baud rate takes to fill half of
+    the driver's buffer (max_packet_size bytes), so bursts can't overrun it, and by the
+    latency bound. The latency bound is raised to the time to receive one packet, as a
+    drain can't return a packet sooner, but the buffer bound is not, so if the buffer
+    holds less than two packets the interval is shorter than a packet. After each drain the interval is scaled so the next drain
+    finds TARGET_FILL of the buffer filled at the observed rate: it shortens as batches
+    grow, down to one packet time, and backs off by up to BACKOFF per drain when batches
+    shrink or the channel is idle.
+    """
+
+    packet_time: float
+    fill_time: float
+    min_interval: float
+    max_interval: float
+    interval: float
+    _packet_length: int
+    _max_packet_size: int
+    _last: float
+
+    def __init__(
+        self,
+        rx_config: RXConfig,
+        max_packet_size: int,
+        latency: float = DEFAULT_LATENCY,
+    ):
+        _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+
+        self._packet_length = rx_config.packet_length
+        self._max_packet_size = max(max_packet_size, rx_config.packet_length)
+
+        self.packet_time = packet_duration(rx_config.packet_length, baud_rate) / 1e9
+        self.fill_time = packet_duration(self._max_packet_size, baud_rate) / 1e9
+
+        self.max_interval = min(self.fill_time / 2, max(latency, self.packet_time))
+        self.min_interval = min(self.max_interval, max(MIN_INTERVAL, self.packet_time))
+        self.interval = self.max_interval
+        self._last = time.monotonic()
+
+    @classmethod
+    def for_radio(
+        cls, radio: "CC1101", latency: float = DEFAULT_LATENCY
+    ) -> "AdaptivePoller":
+        """Create a poller for the RX config and maximum packet size of a device"""
+        assert radio.rx_config is not None
+        return cls(radio.rx_config, radio.get_max_packet_size(), latency)
+
+    def update(self, packets: int) -> float:
+        """Adjust the interval to the number of packets returned by a drain"""
+        factor = BACKOFF
+        if packets > 0:
+            fill = packets * self._packet_length / self._max_packet_size
+            factor = min(TARGET_FILL / fill, BACKOFF)
+
+        self.interval = min(
+            max(self.interval * factor, self.min_interval), self.max_interval
+        )
+        return self.interval
+
+    def wait(self, packets: int) -> None:
+        """Adjust the interval to a drain, then sleep until the next drain is due
+
+        The interval is measured from the previous wait, so time spent processing the
+        drain is not added to it.
+        """
+        interval = self.update(packets)
+        delay = self._last + interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        self._last = time.monotonic()
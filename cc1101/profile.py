@@ -0,0 +1,122 @@
+"""
+Copyright (c) 2022
+"""
+
+import time
+
+from enum import IntEnum
+from types import TracebackType
+from typing import Callable, ContextManager, Dict, List, Optional, Type
+
+Hook = Callable[["Stage"], ContextManager[None]]
+
+
+class Stage(IntEnum):
+    """Stages of device access that hooks are run around"""
+
+    OPEN = 0
+    CONFIG_CHECK = 1
+    DRAIN = 2
+    DELIVER = 3
+    TRANSMIT = 4
+
+
+class StageTimes:
+    """Aggregated times for a single stage"""
+
+    calls: int
+    samples: int
+    total: int
+    max: int
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def estimated_total(self) -> float:
+        """Estimate the total time in ns spent in the stage from the sampled calls"""
+        if self.samples == 0:
+            return 0.0
+
+        return self.total * self.calls / self.samples
+
+
+class _StageTimer:
+    """Context manager timing one in every sample_every entries of a stage"""
+
+    times: StageTimes
+    sample_every: int
+    _start: int
+
+    def __init__(self, times: StageTimes, sample_every: int):
+        self.times = times
+        self.sample_every = sample_every
+        self._start = 0
+
+    def __enter__(self) -> None:
+        times = self.times
+        times.calls += 1
+
+        if times.calls % self.sample_every == 0:
+            self._start = time.perf_counter_ns()
+        else:
+            self._start = 0
+
+    def __exit__(
+        self,
+        t: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if self._start != 0:
+            duration = time.perf_counter_ns() - self._start
+            times = self.times
+            times.samples += 1
+            times.total += duration
+            if duration > times.max:
+                times.max = duration
+
+
+class StageProfiler:
+    """Hook aggregating the time spent in each stage
+
+    Register with CC1101.add_hook(). Times are inclusive of nested stages (e.g DRAIN includes
+    OPEN when the device is not held open). Setting sample_every times only one in every N
+    entries to each stage, with totals scaled up accordingly.
+    """
+
+    times: Dict[Stage, StageTimes]
+    _timers: Dict[Stage, _StageTimer]
+
+    def __init__(self, sample_every: int = 1):
+        self.times = {s: StageTimes() for s in Stage}
+        self._timers = {s: _StageTimer(self.times[s], sample_every) for s in Stage}
+
+    def __call__(self, stage: Stage) -> ContextManager[None]:
+        return self._timers[stage]
+
+    def report(self) -> List[str]:
+        """Render the per-stage breakdown as lines of a table"""
+        estimated = {s: t.estimated_total() for s, t in self.times.items()}
+        total = sum(estimated.values())
+
+        lines = [
+            f"{'Stage':<14}{'Calls':>10}{'Total (ms)':>14}{'Mean (us)':>12}"
+            f"{'Max (us)':>12}{'Share':>8}"
+        ]
+
+        for stage, times in self.times.items():
+            if times.calls == 0:
+                continue
+
+            mean = times.total / times.samples if times.samples > 0 else 0
+            share = estimated[stage] / total * 100 if total > 0 else 0
+
+            lines.append(
+                f"{stage.name:<14}{times.calls:>10}{estimated[stage] / 1e6:>14.3f}"
+                f"{mean / 1e3:>12.1f}{times.max / 1e3:>12.1f}{share:>7.1f}%"
+            )
+
+        return lines
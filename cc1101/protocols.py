@@ -0,0 +1,257 @@
+"""
+Copyright (c) 2022
+"""
+
+from enum import IntEnum
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from cc1101.batch import PacketBatch
+from cc1101.crc import Checksum
+from cc1101.decode import Frame, LineCoding, PulseDecoder
+from cc1101.stream import StreamReassembler
+
+Value = Union[int, float, bool]
+Fields = Dict[str, Value]
+
+
+class FieldType(IntEnum):
+    """How the bits of a field are interpreted"""
+
+    UINT = 0
+    INT = 1
+    BOOL = 2
+
+
+class Field(NamedTuple):
+    """A field of a protocol's frame, in transmitted order"""
+
+    name: str
+    width: int
+    type: FieldType = FieldType.UINT
+    # Divisor applied to the raw value, e.g 10 for temperatures sent in tenths
+    divisor: Optional[int] = None
+
+
+class Timing(NamedTuple):
+    """Nominal line coding timings in microseconds"""
+
+    coding: LineCoding
+    zero: float
+    one: float
+    sync: float
+    separator: Optional[float] = None
+
+
+class Message(NamedTuple):
+    """A frame parsed by a protocol"""
+
+    protocol: str
+    fields: Fields
+    frame: Frame
+
+
+# Compiled field - name, shift, mask, sign bit (0 if unsigned), type, divisor
+_Extractor = Tuple[str, int, int, int, FieldType, Optional[int]]
+
+
+class Protocol:
+    """A sensor protocol's timing, frame length and field layout
+
+    The field layout is compiled once into shifts and masks of the frame bits. Constant
+    fields are checked with a single mask and compare, then the checksum (stored in the
+    last bytes of the frame) before any field is extracted. validate is called with the
+    extracted fields to reject implausible values.
+    """
+
+    name: str
+    timing: Timing
+    length: int
+    fields: Sequence[Field]
+    constants: Dict[str, int]
+    checksum: Optional[Checksum]
+    validate: Optional[Callable[[Fields], bool]]
+    _extractors: List[_Extractor]
+    _constant_mask: int
+    _constant_value: int
+
+    def __init__(
+        self,
+        name: str,
+        timing: Timing,
+        fields: Sequence[Field],
+        constants: Optional[Dict[str, int]] = None,
+        validate: Optional[Callable[[Fields], bool]] = None,
+        checksum: Optional[Checksum] = None,
+    ):
+        self.name = name
+        self.timing = timing
+        self.length = sum(f.width for f in fields)
+        self.fields = fields
+        self.constants = constants if constants is not None else {}
+        self.validate = validate
+        self.checksum = checksum
+
+        if checksum is not None and self.length % 8 != 0:
+            raise ValueError(f"{self.name} must be whole bytes to have a checksum")
+
+        self._extractors = []
+        self._constant_mask = 0
+        self._constant_value = 0
+
+        shift = self.length
+        for field in fields:
+            shift -= field.width
+            mask = (1 << field.width) - 1
+
+            if field.name in self.constants:
+                self._constant_mask |= mask << shift
+                self._constant_value |= (self.constants[field.name] & mask) << shift
+                continue
+
+            sign = 1 << (field.width - 1) if field.type == FieldType.INT else 0
+            self._extractors.append(
+                (field.name, shift, mask, sign, field.type, field.divisor)
+            )
+
+        for name in self.constants:
+            if name not in [f.name for f in fields]:
+                raise ValueError(f"Constant {name} is not a field of {self.name}")
+
+    def parse(self, bits: int) -> Optional[Fields]:
+        """Extract the fields from a frame's bits, or None if the frame does not match"""
+        if bits & self._constant_mask != self._constant_value:
+            return None
+
+        checksum = self.checksum
+        if checksum is not None and not checksum.check(
+            bits.to_bytes(self.length // 8, "big")
+        ):
+            return None
+
+        fields: Fields = {}
+        for name, shift, mask, sign, field_type, divisor in self._extractors:
+            value = (bits >> shift) & mask
+
+            if field_type == FieldType.BOOL:
+                fields[name] = value != 0
+                continue
+
+            if value & sign:
+                value -= sign << 1
+
+            fields[name] = value if divisor is None else value / divisor
+
+        if self.validate is not None and not self.validate(fields):
+            return None
+
+        return fields
+
+
+class ProtocolRegistry:
+    """Set of protocols received with the same RX config
+
+    Protocols are grouped by the decoder their timing requires at the baud rate, so each
+    group of protocols decodes the received data once. Frames are then only parsed by the
+    protocols of that group with a matching length.
+    """
+
+    baud_rate: float
+    packet_duration: Optional[int]
+    protocols: List[Protocol]
+    _decoders: Dict[PulseDecoder, Dict[int, List[Protocol]]]
+    _streams: Dict[PulseDecoder, StreamReassembler]
+
+    def __init__(self, baud_rate: float, packet_duration: Optional[int] = None):
+        self.baud_rate = baud_rate
+        self.packet_duration = packet_duration
+        self.protocols = []
+        self._decoders = {}
+        self._streams = {}
+
+    def _decoder(self, timing: Timing) -> PulseDecoder:
+        """Get the decoder for a timing, shared with protocols that decode identically"""
+        decoder = PulseDecoder.from_timing(
+            timing.coding,
+            self.baud_rate,
+            timing.zero,
+            timing.one,
+            timing.sync,
+            timing.separator,
+        )
+
+        for existing in self._decoders:
+            if (
+                existing.coding == decoder.coding
+                and existing.zero == decoder.zero
+                and existing.one == decoder.one
+                and existing.sync == decoder.sync
+                and existing.separator == decoder.separator
+            ):
+                return existing
+
+        decoder.lengths = set()
+        self._decoders[decoder] = {}
+        self._streams[decoder] = StreamReassembler(decoder, self.packet_duration)
+        return decoder
+
+    def register(self, protocol: Protocol) -> None:
+        """Add a protocol to the registry"""
+        decoder = self._decoder(protocol.timing)
+
+        assert isinstance(decoder.lengths, set)
+        decoder.lengths.add(protocol.length)
+        self._decoders[decoder].setdefault(protocol.length, []).append(protocol)
+        self.protocols.append(protocol)
+
+    def _dispatch(self, decoder: PulseDecoder, frames: List[Frame]) -> List[Message]:
+        """Parse frames with the candidate protocols for their length"""
+        by_length = self._decoders[decoder]
+        messages = []
+
+        for frame in frames:
+            for protocol in by_length.get(frame.length, []):
+                fields = protocol.parse(frame.bits)
+                if fields is not None:
+                    messages.append(Message(protocol.name, fields, frame))
+
+        return messages
+
+    def decode(self, data: bytes) -> List[Message]:
+        """Decode the messages of all protocols from a single packet"""
+        messages = []
+        for decoder in self._decoders:
+            messages += self._dispatch(decoder, decoder.decode(data))
+        return messages
+
+    def feed(self, batch: PacketBatch) -> List[Message]:
+        """Decode the messages of all protocols from a batch continuing a stream"""
+        messages = []
+        for decoder, stream in self._streams.items():
+            messages += self._dispatch(decoder, stream.feed(batch))
+        return messages
+
+    def reset(self) -> None:
+        """Restart the streams of all decoders"""
+        for stream in self._streams.values():
+            stream.reset()
+
+
+# Nexus, FreeTec NC-7345, infactory NX-3980, Solight TE82S and TFA 30.3209.02 sensors
+# (from https://github.com/merbanan/rtl_433/blob/master/src/devices/nexus.c)
+NEXUS = Protocol(
+    "nexus",
+    Timing(LineCoding.PPM, zero=1000, one=2000, sync=4000, separator=500),
+    [
+        Field("id", 8),
+        Field("battery_ok", 1, FieldType.BOOL),
+        Field("const0", 1),
+        Field("channel", 2),
+        Field("temperature", 12, FieldType.INT, 10),
+        Field("const1", 4),
+        Field("humidity", 8),
+    ],
+    constants={"const0": 0, "const1": 0xF},
+    validate=lambda f: f["channel"] in (0, 1, 2) and f["humidity"] <= 100,
+)
+
+PROTOCOLS = [NEXUS]
@@ -0,0 +1,102 @@
+"""
+Copyright (c) 2022
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cc1101 import CC1101
+from cc1101.capture import CaptureReader
+from cc1101.config import TXConfig
+
+
+class ReplayReport(NamedTuple):
+    """Achieved rate and timing of a replay"""
+
+    packets: int
+    bytes: int
+    # Time from the first to the last transmission (s)
+    duration: float
+    # Mean and maximum lateness of transmissions compared to the schedule (ns)
+    mean_error: float
+    max_error: int
+
+    @property
+    def packet_rate(self) -> float:
+        """Packets transmitted per second"""
+        return self.packets / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def byte_rate(self) -> float:
+        """Bytes transmitted per second"""
+        return self.bytes / self.duration if self.duration > 0 else 0.0
+
+
+def load(
+    reader: CaptureReader, start: Optional[int] = None, end: Optional[int] = None
+) -> Tuple[List[bytes], List[int]]:
+    """Load the packets of a capture time range with their receive times in ns
+
+    Packets drained together share a timestamp, so their times are estimated from the
+    baud rate as if they were received back-to-back, ending at the drain time.
+    """
+    rx_config = reader.header.rx_config()
+    if rx_config is None:
+        raise ValueError("Invalid RX config in capture")
+
+    _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+
+    packets: List[bytes] = []
+    times: List[int] = []
+
+    for batch in reader.read_range(start, end).batches():
+        packets += batch.packets
+        times += batch.packet_times(baud_rate)
+
+    return packets, times
+
+
+def schedule(times: Sequence[int], speed: Optional[float] = 1.0) -> Optional[List[int]]:
+    """Get the transmit time of each packet in ns after the first, at a speed multiplier
+
+    A speed of None transmits as fast as possible.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("Speed must be greater than 0")
+
+    if speed is None or len(times) == 0:
+        return None
+
+    first = times[0]
+    return [round((t - first) / speed) for t in times]
+
+
+def report(
+    packets: Sequence[bytes], sent: Sequence[int], times: Optional[Sequence[int]]
+) -> ReplayReport:
+    """Compare the time each packet was sent to its schedule"""
+    errors = [s - t for s, t in zip(sent, times)] if times is not None else [0]
+    duration = (sent[-1] - sent[0]) / 1e9 if len(sent) > 1 else 0.0
+
+    return ReplayReport(
+        len(sent),
+        sum(len(p) for p in packets[: len(sent)]),
+        duration,
+        sum(errors) / len(errors),
+        max(errors),
+    )
+
+
+def replay(
+    radio: CC1101,
+    tx_config: TXConfig,
+    packets: Sequence[bytes],
+    times: Sequence[int],
+    speed: Optional[float] = 1.0,
+) -> ReplayReport:
+    """Transmit packets at their original timing scaled by a speed multiplier"""
+    if len(packets) == 0:
+        return ReplayReport(0, 0, 0.0, 0.0, 0)
+
+    scheduled = schedule(times, speed)
+    sent = radio.transmit_batch(tx_config, packets, scheduled)
+    return report(packets, sent, scheduled)
@@ -0,0 +1,261 @@
+"""
+Copyright (c) 2022
+"""
+
+import math
+import struct
+import sys
+import time
+
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional
+
+from cc1101.batch import PacketBatch
+
+RING_MAGIC = b"CC1101RG"
+
+# Header - magic, number of slots, packet length, slot size, number of consumers, write sequence
+RING_HEADER = struct.Struct("<8sIIIIQ")
+
+# Per consumer - read sequence, packets lost to overflow
+RING_CURSOR = struct.Struct("<QQ")
+
+# Per slot, followed by the packet - sequence + 1 (0 if never written), timestamp (ns),
+# RSSI (dBm, NaN if not sampled), packet length
+RING_SLOT = struct.Struct("<QqfI")
+
+DEFAULT_SLOTS = 1024
+
+# Offset of the write sequence in the header
+_WRITE_SEQUENCE = RING_HEADER.size - 8
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class RingPacket(NamedTuple):
+    """A packet read from the ring"""
+
+    sequence: int
+    timestamp: int
+    rssi: Optional[float]
+    packet: bytes
+
+
+class PacketRing:
+    """Fixed-size ring of received packets in shared memory
+
+    One producer (the receive loop) writes packets into fixed size slots, with a timestamp
+    and RSSI, and never waits for consumers - the oldest slots are overwritten. Consumers
+    in other processes attach by name and read with their own cursor. Slots store their
+    sequence number, so a consumer detects a slot overwritten while it was reading it and
+    counts it as an overflow.
+    """
+
+    shm: shared_memory.SharedMemory
+    slots: int
+    packet_length: int
+    slot_size: int
+    consumers: int
+    _buf: memoryview
+    _slots_offset: int
+    _write_sequence: int
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        assert shm.buf is not None
+        self.shm = shm
+        self._buf = shm.buf
+
+        magic, slots, packet_length, slot_size, consumers, sequence = (
+            RING_HEADER.unpack_from(self._buf, 0)
+        )
+
+        if magic != RING_MAGIC:
+            raise ValueError(f"{shm.name} is not a packet ring")
+
+        self.slots = slots
+        self.packet_length = packet_length
+        self.slot_size = slot_size
+        self.consumers = consumers
+        self._slots_offset = _align(RING_HEADER.size + RING_CURSOR.size * consumers)
+        self._write_sequence = sequence
+
+    @classmethod
+    def create(
+        cls,
+        packet_length: int,
+        slots: int = DEFAULT_SLOTS,
+        consumers: int = 1,
+        name: Optional[str] = None,
+    ) -> "PacketRing":
+        """Create a ring in a new shared memory block"""
+        slot_size = _align(RING_SLOT.size + packet_length)
+        slots_offset = _align(RING_HEADER.size + RING_CURSOR.size * consumers)
+
+        shm = shared_memory.SharedMemory(
+            name, create=True, size=slots_offset + slot_size * slots
+        )
+        buf = shm.buf
+        assert buf is not None
+
+        buf[:slots_offset] = bytes(slots_offset)
+        RING_HEADER.pack_into(
+            buf, 0, RING_MAGIC, slots, packet_length, slot_size, consumers, 0
+        )
+
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "PacketRing":
+        """Attach to a ring created by another process"""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name)
+
+        return cls(shm)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_sequence(self) -> int:
+        """Sequence number of the next packet to be written"""
+        return int(struct.unpack_from("<Q", self._buf, _WRITE_SEQUENCE)[0])
+
+    def write(
+        self, packet: bytes, timestamp: int, rssi: Optional[float] = None
+    ) -> None:
+        """Write a packet, overwriting the oldest slot if the ring is full"""
+        sequence = self._write_sequence
+        offset = self._slots_offset + (sequence % self.slots) * self.slot_size
+        length = min(len(packet), self.packet_length)
+        buf = self._buf
+
+        # Invalidate the slot while it is written
+        struct.pack_into("<Q", buf, offset, 0)
+        start = offset + RING_SLOT.size
+        buf[start : start + length] = packet[:length]
+        RING_SLOT.pack_into(
+            buf,
+            offset,
+            sequence + 1,
+            timestamp,
+            math.nan if rssi is None else rssi,
+            length,
+        )
+
+        self._write_sequence = sequence + 1
+        struct.pack_into("<Q", buf, _WRITE_SEQUENCE, sequence + 1)
+
+    def write_batch(self, batch: PacketBatch) -> None:
+        """Write the packets of a drain, timestamped with the drain time"""
+        for packet in batch.packets:
+            self.write(packet, batch.timestamp, batch.rssi)
+
+    def reader(self, consumer: int = 0, stride: int = 1) -> "RingReader":
+        """Get a reader using a consumer's cursor
+
+        With a stride of N, the reader only returns every Nth packet starting from consumer,
+        so N consumers with a stride of N share the packets between them.
+        """
+        if consumer >= self.consumers:
+            raise ValueError(f"Ring only has {self.consumers} consumers")
+
+        return RingReader(self, consumer, stride)
+
+    def close(self) -> None:
+        """Detach from the shared memory"""
+        self._buf.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Remove the shared memory once all processes have closed it"""
+        self.shm.unlink()
+
+
+class RingReader:
+    """A consumer's cursor into a PacketRing"""
+
+    ring: PacketRing
+    consumer: int
+    stride: int
+    _cursor_offset: int
+
+    def __init__(self, ring: PacketRing, consumer: int, stride: int):
+        self.ring = ring
+        self.consumer = consumer
+        self.stride = stride
+        self._cursor_offset = RING_HEADER.size + RING_CURSOR.size * consumer
+
+        sequence, _ = RING_CURSOR.unpack_from(ring._buf, self._cursor_offset)
+        if sequence % stride != consumer % stride:
+            sequence += (consumer - sequence) % stride
+            self._store(sequence, self.overflows)
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the next packet to be read"""
+        return int(RING_CURSOR.unpack_from(self.ring._buf, self._cursor_offset)[0])
+
+    @property
+    def overflows(self) -> int:
+        """Number of packets overwritten before they were read"""
+        return int(RING_CURSOR.unpack_from(self.ring._buf, self._cursor_offset)[1])
+
+    def _store(self, sequence: int, overflows: int) -> None:
+        RING_CURSOR.pack_into(self.ring._buf, self._cursor_offset, sequence, overflows)
+
+    def read(self, max_packets: Optional[int] = None) -> List[RingPacket]:
+        """Read the available packets"""
+        ring = self.ring
+        buf = ring._buf
+        stride = self.stride
+
+        sequence, overflows = RING_CURSOR.unpack_from(buf, self._cursor_offset)
+        end = ring.write_sequence
+
+        # Skip packets that have already been overwritten
+        oldest = end - ring.slots
+        if sequence < oldest:
+            skip = (oldest - sequence + stride - 1) // stride * stride
+            overflows += skip // stride
+            sequence += skip
+
+        packets: List[RingPacket] = []
+        while sequence < end:
+            if max_packets is not None and len(packets) == max_packets:
+                break
+
+            offset = ring._slots_offset + (sequence % ring.slots) * ring.slot_size
+            written, timestamp, rssi, length = RING_SLOT.unpack_from(buf, offset)
+            start = offset + RING_SLOT.size
+            packet = bytes(buf[start : start + length])
+
+            # Check the slot was not rewritten while it was being copied
+            (after,) = struct.unpack_from("<Q", buf, offset)
+            if written == sequence + 1 and after == written:
+                packets.append(
+                    RingPacket(
+                        sequence, timestamp, None if math.isnan(rssi) else rssi, packet
+                    )
+                )
+            else:
+                overflows += 1
+
+            sequence += stride
+
+        self._store(sequence, overflows)
+        return packets
+
+    def wait(self, timeout: float, poll_interval: float = 0.001) -> List[RingPacket]:
+        """Read packets, polling until at least one is available or the timeout expires"""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            packets = self.read()
+            if len(packets) > 0 or time.monotonic() >= deadline:
+                return packets
+            time.sleep(poll_interval)
@@ -0,0 +1,216 @@
+"""
+Copyright (c) 2022
+"""
+
+import time
+
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from cc1101 import CC1101
+from cc1101.batch import PacketBatch, packet_duration
+from cc1101.config import RXConfig
+from cc1101.poll import DEFAULT_LATENCY, AdaptivePoller
+
+# Default time spent receiving with each profile per cycle (seconds)
+DEFAULT_DWELL = 1.0
+
+# Share of each cycle allocated to profiles in proportion to their traffic
+ACTIVE_SHARE = 0.5
+
+# Weight of the latest cycle in each profile's packet rate
+RATE_ALPHA = 0.5
+
+
+class RXProfile:
+    """A RX config to receive with for part of each cycle"""
+
+    name: str
+    rx_config: RXConfig
+    dwell: float
+    config_bytes: bytearray
+    packet_time: float
+
+    def __init__(self, name: str, rx_config: RXConfig, dwell: float = DEFAULT_DWELL):
+        self.name = name
+        self.rx_config = rx_config
+        self.dwell = dwell
+        self.config_bytes = rx_config.to_bytes()
+
+        _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+        self.packet_time = packet_duration(rx_config.packet_length, baud_rate) / 1e9
+
+        if dwell < self.packet_time:
+            raise ValueError(f"Dwell time of {name} is shorter than a packet")
+
+
+class ProfileBatch(NamedTuple):
+    """A drain of the receive buffer, with the profile it was received with"""
+
+    profile: RXProfile
+    batch: PacketBatch
+
+
+class ProfileStats:
+    """Time spent receiving with a profile and switching to it"""
+
+    packets: int
+    # Total time receiving with the profile (s)
+    dwell_time: float
+    switches: int
+    # Total time taken to switch to the profile (s)
+    switch_time: float
+    # Smoothed packets per second while receiving with the profile
+    packet_rate: float
+
+    def __init__(self) -> None:
+        self.packets = 0
+        self.dwell_time = 0.0
+        self.switches = 0
+        self.switch_time = 0.0
+        self.packet_rate = 0.0
+
+
+class ProfileReport(NamedTuple):
+    """Share of the radio's time used by a profile"""
+
+    name: str
+    packets: int
+    # Current dwell time per cycle (s)
+    dwell: float
+    # Fraction of the total time spent receiving with the profile
+    duty_cycle: float
+    packet_rate: float
+    switches: int
+    # Mean time to switch to the profile (s)
+    mean_switch_time: float
+
+
+class ProfileScheduler:
+    """Share a radio between RX profiles, e.g sensors on different frequencies
+
+    Each cycle receives with every profile in turn for its dwell time, draining the receive
+    buffer before switching so every packet is tagged with the profile it was received
+    with. Configs are serialized once, so a switch only costs the IOCTL.
+
+    The dwell times of the profiles are their weights. If adapt is set, after each cycle
+    half of the total cycle time is reallocated in proportion to the packet rate each
+    profile received, so profiles with traffic get longer dwells, while quiet profiles keep
+    half of theirs and are still monitored. Dwells return to the defaults when traffic
+    stops.
+    """
+
+    radio: CC1101
+    profiles: List[RXProfile]
+    adapt: bool
+    read_rssi: bool
+    dwells: List[float]
+    stats: List[ProfileStats]
+    _pollers: List[AdaptivePoller]
+
+    def __init__(
+        self,
+        radio: CC1101,
+        profiles: Sequence[RXProfile],
+        adapt: bool = True,
+        read_rssi: bool = False,
+        latency: float = DEFAULT_LATENCY,
+    ):
+        if len(profiles) == 0:
+            raise ValueError("At least one profile is required")
+
+        self.radio = radio
+        self.profiles = list(profiles)
+        self.adapt = adapt
+        self.read_rssi = read_rssi
+        self.dwells = [p.dwell for p in profiles]
+        self.stats = [ProfileStats() for _ in profiles]
+
+        max_packet_size = radio.get_max_packet_size()
+        self._pollers = [
+            AdaptivePoller(p.rx_config, max_packet_size, latency) for p in profiles
+        ]
+
+    def receive(self, index: int) -> Iterator[ProfileBatch]:
+        """Switch to a profile and receive with it for its dwell time"""
+        radio = self.radio
+        profile = self.profiles[index]
+        stats = self.stats[index]
+        poller = self._pollers[index]
+
+        start = time.perf_counter()
+        radio.switch_rx_config(profile.rx_config, profile.config_bytes)
+        switched = time.perf_counter()
+
+        stats.switches += 1
+        stats.switch_time += switched - start
+
+        deadline = time.monotonic() + self.dwells[index]
+        packets = 0
+
+        while True:
+            batch = radio.receive_batch(self.read_rssi)
+            packets += len(batch)
+            if len(batch) > 0:
+                yield ProfileBatch(profile, batch)
+
+            # The last drain is after the deadline, so the buffer is empty when switching
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(poller.update(batch.drained), remaining))
+
+        dwell_time = time.perf_counter() - switched
+        stats.packets += packets
+        stats.dwell_time += dwell_time
+        stats.packet_rate += RATE_ALPHA * (packets / dwell_time - stats.packet_rate)
+
+    def run(self, cycles: Optional[int] = None) -> Iterator[ProfileBatch]:
+        """Receive with each profile in turn, for a number of cycles or forever"""
+        cycle = 0
+
+        while cycles is None or cycle < cycles:
+            for index in range(len(self.profiles)):
+                yield from self.receive(index)
+
+            if self.adapt:
+                self.reallocate()
+            cycle += 1
+
+    def reallocate(self) -> None:
+        """Reallocate dwell times toward the profiles receiving packets"""
+        # Less than a packet per dwell is noise, or traffic that has stopped
+        rates = [
+            s.packet_rate if s.packet_rate * p.dwell >= 1 else 0.0
+            for p, s in zip(self.profiles, self.stats)
+        ]
+        total_rate = sum(rates)
+        if total_rate == 0:
+            self.dwells = [p.dwell for p in self.profiles]
+            return
+
+        cycle_time = sum(p.dwell for p in self.profiles)
+        self.dwells = [
+            max(
+                (1 - ACTIVE_SHARE) * p.dwell
+                + ACTIVE_SHARE * cycle_time * rate / total_rate,
+                p.packet_time,
+            )
+            for p, rate in zip(self.profiles, rates)
+        ]
+
+    def report(self) -> List[ProfileReport]:
+        """Get the duty cycle and switch overhead of each profile"""
+        total = sum(s.dwell_time + s.switch_time for s in self.stats)
+
+        return [
+            ProfileReport(
+                profile.name,
+                stats.packets,
+                dwell,
+                stats.dwell_time / total if total > 0 else 0.0,
+                stats.packet_rate,
+                stats.switches,
+                stats.switch_time / stats.switches if stats.switches > 0 else 0.0,
+            )
+            for profile, stats, dwell in zip(self.profiles, self.stats, self.dwells)
+        ]
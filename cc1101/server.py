@@ -0,0 +1,496 @@
+"""
+Copyright (c) 2022
+"""
+
+import errno
+import itertools
+import math
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+from collections import deque
+from typing import BinaryIO, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from cc1101 import CC1101
+from cc1101.batch import PacketBatch
+from cc1101.config import RXConfig, TXConfig
+from cc1101.errors import DeviceError, DeviceException
+from cc1101.output import DEFAULT_QUEUE_SIZE, DropPolicy, OutputWriter
+from cc1101.poll import DEFAULT_LATENCY, AdaptivePoller
+
+DEFAULT_SOCKET = "/tmp/cc1101.sock"
+DEFAULT_TX_QUEUE_SIZE = 256
+
+# Frame - type, body length
+FRAME_HEADER = struct.Struct("<BI")
+
+# Frame types sent by clients
+SUBSCRIBE = 1
+TRANSMIT = 2
+
+# Frame types sent by the server
+SUBSCRIBED = 3
+PACKETS = 4
+TRANSMITTED = 5
+ERROR = 6
+
+# Subscribed - subscription id, followed by the cc1101_rx_config struct bytes
+SUBSCRIBED_HEADER = struct.Struct("<H")
+
+# Packets - subscription id, drain sequence, timestamp (ns), RSSI (dBm, NaN if not
+# sampled), number of packets, number of packets drained. Followed by the packets and, if
+# packets were dropped from the drain, the uint32 position of each packet in the drain
+PACKETS_HEADER = struct.Struct("<HQqfII")
+
+# Transmit - device name length, followed by the device name, the cc1101_tx_config
+# struct bytes and the packet
+TRANSMIT_HEADER = struct.Struct("<H")
+
+# Transmitted - errno (0 on success), followed by the DeviceError name on failure
+TRANSMITTED_HEADER = struct.Struct("<i")
+
+
+def frame(frame_type: int, body: bytes) -> bytes:
+    """Encode a frame"""
+    return FRAME_HEADER.pack(frame_type, len(body)) + body
+
+
+def read_frame(f: BinaryIO) -> Optional[Tuple[int, bytes]]:
+    """Read a frame, or None if the connection was closed"""
+    header = f.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+
+    frame_type, length = FRAME_HEADER.unpack(header)
+    body = f.read(length)
+    if len(body) < length:
+        return None
+
+    return frame_type, body
+
+
+class TXRequest(NamedTuple):
+    """A packet queued to be transmitted for a client"""
+
+    config: bytes
+    packet: bytes
+    output: OutputWriter
+
+
+class _Device:
+    """A device owned by the server, with its subscribers and TX queue"""
+
+    radio: CC1101
+    subscription: int
+    subscribers: Tuple[OutputWriter, ...]
+    tx_queue: Deque[TXRequest]
+    sequence: int
+
+    def __init__(self, radio: CC1101, subscription: int):
+        self.radio = radio
+        self.subscription = subscription
+        self.subscribers = ()
+        self.tx_queue = deque()
+        self.sequence = 0
+
+
+class RadioServer:
+    """Own a set of CC1101 devices and share them with clients over a Unix socket
+
+    Each device is held open and configured once, and a receive loop fans every drain out
+    to the clients subscribed to it. If a device fails with an OSError (e.g it was
+    removed), it is closed and its clients are sent an error. Each client has a bounded output queue drained by its
+    own writer thread, so a slow client loses its oldest packets (or blocks the receive
+    loop, with the block policy) without affecting the others. Clients see lost drains as
+    gaps in the sequence numbers.
+
+    Clients can also queue packets to transmit. The receive loop transmits queued packets
+    between drains, so transmitting never races receiving, and consecutive packets with
+    the same TX config are transmitted with one configuration of the device.
+    """
+
+    devices: Dict[str, _Device]
+    queue_size: int
+    policy: DropPolicy
+    tx_queue_size: int
+    latency: float
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        radios: List[CC1101],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        policy: DropPolicy = DropPolicy.OLDEST,
+        tx_queue_size: int = DEFAULT_TX_QUEUE_SIZE,
+        latency: float = DEFAULT_LATENCY,
+    ):
+        self.devices = {r.dev: _Device(r, i) for i, r in enumerate(radios)}
+        self.queue_size = queue_size
+        self.policy = policy
+        self.tx_queue_size = tx_queue_size
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def subscribe(self, device: _Device, output: OutputWriter) -> None:
+        # Replace rather than modify, so receive loops can iterate without the lock
+        with self._lock:
+            device.subscribers = device.subscribers + (output,)
+
+    def unsubscribe(self, output: OutputWriter) -> None:
+        with self._lock:
+            for device in self.devices.values():
+                device.subscribers = tuple(s for s in device.subscribers if s != output)
+
+    def fan_out(self, device: _Device, batch: PacketBatch) -> None:
+        """Queue a drain for each subscriber of a device"""
+        if batch.drained == 0:
+            return
+
+        body = PACKETS_HEADER.pack(
+            device.subscription,
+            device.sequence,
+            batch.timestamp,
+            math.nan if batch.rssi is None else batch.rssi,
+            len(batch),
+            batch.drained,
+        )
+        body += batch.data
+        if not batch.contiguous:
+            body += struct.pack(f"<{len(batch)}I", *batch.positions())
+
+        packets = frame(PACKETS, body)
+        device.sequence += 1
+
+        for output in device.subscribers:
+            output.put([packets])
+
+    def transmit_queued(self, device: _Device) -> None:
+        """Transmit the queued packets, configuring once per run of equal TX configs"""
+        requests = []
+        while len(device.tx_queue) > 0:
+            requests.append(device.tx_queue.popleft())
+
+        for config, group in itertools.groupby(requests, lambda r: r.config):
+            run = list(group)
+            tx_config = TXConfig.from_bytes(config)
+            assert tx_config is not None
+
+            reply = TRANSMITTED_HEADER.pack(0)
+            try:
+                device.radio.transmit_batch(tx_config, [r.packet for r in run])
+            except DeviceException as e:
+                reply = TRANSMITTED_HEADER.pack(e.errno) + e.error.name.encode()
+            except OSError as e:
+                reply = TRANSMITTED_HEADER.pack(e.errno or errno.EIO)
+
+            for request in run:
+                request.output.put([frame(TRANSMITTED, reply)])
+
+    def close_device(self, device: _Device, error: OSError) -> None:
+        """Stop serving a failed device, sending its clients an error"""
+        radio = device.radio
+        with self._lock:
+            del self.devices[radio.dev]
+            subscribers = device.subscribers
+            device.subscribers = ()
+
+        message = frame(ERROR, f"{radio.dev}: {error}".encode())
+        for output in subscribers:
+            output.put([message])
+
+        reply = frame(TRANSMITTED, TRANSMITTED_HEADER.pack(error.errno or errno.EIO))
+        while len(device.tx_queue) > 0:
+            device.tx_queue.popleft().output.put([reply])
+
+        if radio.handle is not None:
+            radio.handle.close()
+            radio.handle = None
+
+    def receive_loop(self, device: _Device) -> None:
+        """Receive from a device forever, fanning out drains and transmitting queued packets"""
+        radio = device.radio
+        poller = AdaptivePoller.for_radio(radio, self.latency)
+
+        while True:
+            received = 0
+            try:
+                batch = radio.receive_batch(read_rssi=True)
+                received = batch.drained
+                self.fan_out(device, batch)
+
+                if len(device.tx_queue) > 0:
+                    self.transmit_queued(device)
+            except DeviceException as e:
+                print(f"{radio.dev}: {e.error.name}", file=sys.stderr)
+            except OSError as e:
+                print(f"{radio.dev}: {e}", file=sys.stderr)
+                self.close_device(device, e)
+                return
+
+            poller.wait(received)
+
+    def handle(self, rfile: BinaryIO, output: OutputWriter) -> None:
+        """Handle the requests of a client until it disconnects"""
+        while True:
+            request = read_frame(rfile)
+            if request is None:
+                return
+
+            frame_type, body = request
+
+            if frame_type == SUBSCRIBE:
+                name = body.decode()
+                device = self.devices.get(name)
+                if device is None:
+                    output.put([frame(ERROR, f"Unknown device {name}".encode())])
+                    continue
+
+                rx_config = device.radio.rx_config
+                assert rx_config is not None
+
+                # Reply before any drains are queued for the client
+                output.put(
+                    [
+                        frame(
+                            SUBSCRIBED,
+                            SUBSCRIBED_HEADER.pack(device.subscription)
+                            + bytes(rx_config.to_bytes()),
+                        )
+                    ]
+                )
+                self.subscribe(device, output)
+
+            elif frame_type == TRANSMIT:
+                (length,) = TRANSMIT_HEADER.unpack_from(body)
+                start = TRANSMIT_HEADER.size
+                name = body[start : start + length].decode()
+                config = body[start + length : start + length + TXConfig.size()]
+                packet = body[start + length + TXConfig.size() :]
+
+                device = self.devices.get(name)
+                if device is None:
+                    error = errno.ENODEV
+                elif len(config) != TXConfig.size() or sum(config) == 0:
+                    error = errno.EINVAL
+                elif len(device.tx_queue) >= self.tx_queue_size:
+                    error = errno.ENOBUFS
+                else:
+                    device.tx_queue.append(TXRequest(config, packet, output))
+                    continue
+
+                output.put([frame(TRANSMITTED, TRANSMITTED_HEADER.pack(error))])
+
+            else:
+                output.put([frame(ERROR, f"Unknown request {frame_type}".encode())])
+
+    def listen(self, path: str = DEFAULT_SOCKET) -> socketserver.BaseServer:
+        """Start a receive loop for each device and listen for clients on a socket"""
+        for device in self.devices.values():
+            threading.Thread(
+                target=self.receive_loop, args=(device,), daemon=True
+            ).start()
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+        server = _RadioSocketServer(path, _ClientHandler)
+        server.radio_server = self
+        return server
+
+    def serve(self, path: str = DEFAULT_SOCKET) -> None:
+        """Start a receive loop for each device and serve clients until interrupted"""
+        server = self.listen(path)
+
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.unlink(path)
+
+
+class _RadioSocketServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    radio_server: Optional[RadioServer] = None
+
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    server: _RadioSocketServer
+
+    def handle(self) -> None:
+        radio_server = self.server.radio_server
+        assert radio_server is not None
+
+        # Frames are written as soon as they are queued
+        output = OutputWriter(
+            self.wfile,  # type: ignore
+            radio_server.queue_size,
+            radio_server.policy,
+            flush_interval=0,
+        )
+
+        try:
+            radio_server.handle(self.rfile, output)  # type: ignore
+        except (OSError, struct.error, UnicodeDecodeError):
+            pass
+        finally:
+            radio_server.unsubscribe(output)
+            output.close()
+
+
+class ReceivedBatch(NamedTuple):
+    """A drain of a subscribed device's receive buffer"""
+
+    device: str
+    sequence: int
+    batch: PacketBatch
+
+
+class RadioClient:
+    """Client of a RadioServer
+
+    Receives the drains of subscribed devices and queues packets to transmit. Drains the
+    server dropped because the client was too slow are counted in lost.
+    """
+
+    sock: socket.socket
+    lost: int
+    _rfile: BinaryIO
+    _subscriptions: Dict[int, Tuple[str, RXConfig]]
+    _sequences: Dict[int, int]
+    _pending: Deque[ReceivedBatch]
+
+    def __init__(self, path: str = DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.lost = 0
+        self._rfile = self.sock.makefile("rb")
+        self._subscriptions = {}
+        self._sequences = {}
+        self._pending = deque()
+
+    def _read(self) -> Tuple[int, bytes]:
+        """Read the next reply, queueing any drains received before it"""
+        while True:
+            response = read_frame(self._rfile)
+            if response is None:
+                raise ConnectionError("Server closed the connection")
+
+            frame_type, body = response
+            if frame_type == PACKETS:
+                self._pending.append(self._unpack(body))
+            elif frame_type == ERROR:
+                raise ValueError(body.decode())
+            else:
+                return frame_type, body
+
+    def _unpack(self, body: bytes) -> ReceivedBatch:
+        (
+            subscription,
+            sequence,
+            timestamp,
+            rssi,
+            count,
+            drained,
+        ) = PACKETS_HEADER.unpack_from(body)
+        device, rx_config = self._subscriptions[subscription]
+        length = rx_config.packet_length
+        start = PACKETS_HEADER.size
+
+        if subscription in self._sequences:
+            self.lost += sequence - self._sequences[subscription] - 1
+        self._sequences[subscription] = sequence
+
+        packets = [
+            body[start + i * length : start + (i + 1) * length] for i in range(count)
+        ]
+
+        indices = None
+        if count != drained:
+            indices = list(
+                struct.unpack_from(f"<{count}I", body, start + count * length)
+            )
+
+        return ReceivedBatch(
+            device,
+            sequence,
+            PacketBatch(
+                packets,
+                length,
+                timestamp,
+                None if math.isnan(rssi) else rssi,
+                indices,
+                drained,
+            ),
+        )
+
+    def subscribe(self, device: str) -> RXConfig:
+        """Receive the drains of a device, returning the RX config it is receiving with"""
+        self.sock.sendall(frame(SUBSCRIBE, device.encode()))
+
+        frame_type, body = self._read()
+        if frame_type != SUBSCRIBED:
+            raise ValueError(f"Unexpected response {frame_type}")
+
+        (subscription,) = SUBSCRIBED_HEADER.unpack_from(body)
+        rx_config = RXConfig.from_bytes(body[SUBSCRIBED_HEADER.size :])
+        assert rx_config is not None
+
+        self._subscriptions[subscription] = (device, rx_config)
+        return rx_config
+
+    def receive(self) -> ReceivedBatch:
+        """Wait for the next drain of a subscribed device
+
+        Raises ValueError if the server reports an error, e.g a subscribed device failed.
+        """
+        if len(self._pending) > 0:
+            return self._pending.popleft()
+
+        while True:
+            response = read_frame(self._rfile)
+            if response is None:
+                raise ConnectionError("Server closed the connection")
+
+            frame_type, body = response
+            if frame_type == PACKETS:
+                return self._unpack(body)
+            elif frame_type == ERROR:
+                raise ValueError(body.decode())
+
+    def transmit(self, device: str, tx_config: TXConfig, packet: bytes) -> None:
+        """Queue a packet to be transmitted by a device and wait until it is sent"""
+        device_name = device.encode()
+        self.sock.sendall(
+            frame(
+                TRANSMIT,
+                TRANSMIT_HEADER.pack(len(device_name))
+                + device_name
+                + bytes(tx_config.to_bytes())
+                + packet,
+            )
+        )
+
+        frame_type, body = self._read()
+        if frame_type != TRANSMITTED:
+            raise ValueError(f"Unexpected response {frame_type}")
+
+        (error,) = TRANSMITTED_HEADER.unpack_from(body)
+        if error != 0:
+            name = body[TRANSMITTED_HEADER.size :].decode()
+            if name in DeviceError.__members__:
+                raise DeviceException(DeviceError[name], error)
+            raise OSError(error, os.strerror(error))
+
+    def close(self) -> None:
+        self._rfile.close()
+        self.sock.close()
+
+    def __enter__(self) -> "RadioClient":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
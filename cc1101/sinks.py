@@ -0,0 +1,220 @@
+"""
+Copyright (c) 2022
+"""
+
+import json
+import struct
+import time
+
+from abc import ABC, abstractmethod
+from binascii import hexlify
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence
+
+from cc1101.batch import PacketBatch
+from cc1101.config import RXConfig
+from cc1101.protocols import Message
+
+
+def pack(obj: Any) -> bytes:
+    """Encode an object in MessagePack format"""
+    if obj is None:
+        return b"\xc0"
+    elif obj is True:
+        return b"\xc3"
+    elif obj is False:
+        return b"\xc2"
+    elif isinstance(obj, int):
+        return _pack_int(obj)
+    elif isinstance(obj, float):
+        return b"\xcb" + struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        return _pack_length(len(data), 0xA0, 32, 0xD9) + data
+    elif isinstance(obj, (bytes, bytearray)):
+        return _pack_length(len(obj), None, 0, 0xC4) + bytes(obj)
+    elif isinstance(obj, (list, tuple)):
+        return _pack_length(len(obj), 0x90, 16, 0xDC) + b"".join(pack(o) for o in obj)
+    elif isinstance(obj, dict):
+        return _pack_length(len(obj), 0x80, 16, 0xDE) + b"".join(
+            pack(k) + pack(v) for k, v in obj.items()
+        )
+
+    raise TypeError(f"Can't encode {type(obj).__name__} in MessagePack format")
+
+
+def _pack_int(value: int) -> bytes:
+    if 0 <= value < 128:
+        return bytes([value])
+    elif -32 <= value < 0:
+        return bytes([value & 0xFF])
+    elif value >= 0:
+        for code, fmt, limit in ((0xCC, ">B", 8), (0xCD, ">H", 16), (0xCE, ">I", 32)):
+            if value < 1 << limit:
+                return bytes([code]) + struct.pack(fmt, value)
+        return b"\xcf" + struct.pack(">Q", value)
+    else:
+        for code, fmt, limit in ((0xD0, ">b", 7), (0xD1, ">h", 15), (0xD2, ">i", 31)):
+            if value >= -(1 << limit):
+                return bytes([code]) + struct.pack(fmt, value)
+        return b"\xd3" + struct.pack(">q", value)
+
+
+def _pack_length(length: int, fix: Optional[int], fix_limit: int, code: int) -> bytes:
+    """Encode the header of a str, bin, array or map
+
+    Each has a fixed size form for short lengths (except bin), then forms with 8 (except
+    array and map), 16 and 32 bit lengths with consecutive type codes.
+    """
+    if fix is not None and length < fix_limit:
+        return bytes([fix | length])
+
+    if code in (0xD9, 0xC4):
+        if length < 1 << 8:
+            return bytes([code]) + struct.pack(">B", length)
+        code += 1
+
+    if length < 1 << 16:
+        return bytes([code]) + struct.pack(">H", length)
+    return bytes([code + 1]) + struct.pack(">I", length)
+
+
+def message_fields(message: Message) -> Dict[str, Any]:
+    """Get a decoded message as a record"""
+    return {"protocol": message.protocol, **message.fields}
+
+
+class RecordSink(ABC):
+    """Base for sinks writing a record per received packet
+
+    Records hold the device, config fingerprint, timestamp (ns since the epoch), RSSI and
+    packet. Messages decoded from a drain are added to the record of its last packet, as
+    decoding them completed with it. Fields that are the same for every packet are
+    rendered once, and each drain is written with a single write.
+    """
+
+    f: BinaryIO
+    rx_config: RXConfig
+    device: str
+    records: int
+    _baud_rate: float
+    _clock_offset: int
+
+    def __init__(self, f: BinaryIO, rx_config: RXConfig, device: str = "cc1101"):
+        self.f = f
+        self.rx_config = rx_config
+        self.device = device
+        self.records = 0
+
+        common_config = rx_config.get_common_config()
+        _, self._baud_rate = common_config.get_modulation_and_baud_rate()
+
+        # Packets are timestamped with the monotonic clock
+        self._clock_offset = time.time_ns() - time.monotonic_ns()
+
+    @abstractmethod
+    def _render(
+        self,
+        batch: PacketBatch,
+        timestamps: List[int],
+        messages: Sequence[Message],
+    ) -> bytes:
+        """Render the records of a drain"""
+
+    def write_batch(self, batch: PacketBatch, messages: Sequence[Message] = ()) -> None:
+        """Write the records of a drain, with the messages decoded from it"""
+        if len(batch) == 0:
+            return
+
+        offset = self._clock_offset
+        timestamps = [t + offset for t in batch.packet_times(self._baud_rate)]
+
+        self.f.write(self._render(batch, timestamps, messages))
+        self.records += len(batch)
+
+    def flush(self) -> None:
+        self.f.flush()
+
+
+class JsonSink(RecordSink):
+    """Write records as JSON lines, with the packet in hexadecimal"""
+
+    _prefix: str
+
+    def __init__(self, f: BinaryIO, rx_config: RXConfig, device: str = "cc1101"):
+        super().__init__(f, rx_config, device)
+
+        self._prefix = (
+            f'{{"device":{json.dumps(device)},'
+            f'"fingerprint":"{rx_config.fingerprint()}","timestamp":'
+        )
+
+    def _render(
+        self,
+        batch: PacketBatch,
+        timestamps: List[int],
+        messages: Sequence[Message],
+    ) -> bytes:
+        prefix = self._prefix
+        rssi = ',"rssi":' + ("null" if batch.rssi is None else repr(batch.rssi))
+        payload = rssi + ',"payload":"'
+
+        lines = [
+            f'{prefix}{timestamp}{payload}{hexlify(packet).decode("ascii")}"}}\n'
+            for packet, timestamp in zip(batch.packets, timestamps)
+        ]
+
+        if len(messages) > 0:
+            decoded = json.dumps(
+                [message_fields(m) for m in messages], separators=(",", ":")
+            )
+            lines[-1] = f'{lines[-1][:-2]},"messages":{decoded}}}\n'
+
+        return "".join(lines).encode("utf-8")
+
+
+class MsgpackSink(RecordSink):
+    """Write records as a stream of MessagePack maps, with the packet as binary"""
+
+    _head: bytes
+    _rssi_key: bytes
+    _payload_key: bytes
+    _messages_key: bytes
+
+    def __init__(self, f: BinaryIO, rx_config: RXConfig, device: str = "cc1101"):
+        super().__init__(f, rx_config, device)
+
+        # Map header and static fields, up to the timestamp
+        self._head = (
+            b"\x85"
+            + pack("device")
+            + pack(device)
+            + pack("fingerprint")
+            + pack(rx_config.fingerprint())
+            + pack("timestamp")
+        )
+        self._rssi_key = pack("rssi")
+        self._payload_key = pack("payload")
+        self._messages_key = pack("messages")
+
+    def _render(
+        self,
+        batch: PacketBatch,
+        timestamps: List[int],
+        messages: Sequence[Message],
+    ) -> bytes:
+        head = self._head
+        rssi = self._rssi_key + pack(batch.rssi) + self._payload_key
+        parts: List[bytes] = []
+
+        for packet, timestamp in zip(batch.packets, timestamps):
+            parts += [head, _pack_int(timestamp), rssi, pack(packet)]
+
+        if len(messages) > 0:
+            # One more entry in the map of the last record
+            parts[-4] = b"\x86" + head[1:]
+            parts += [
+                self._messages_key,
+                pack([message_fields(m) for m in messages]),
+            ]
+
+        return b"".join(parts)
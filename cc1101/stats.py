@@ -0,0 +1,110 @@
+"""
+Copyright (c) 2022
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+from cc1101.errors import DeviceError
+from cc1101.ioctl import IOCTL
+
+# Bucket upper bounds for the number of packets returned by a single drain of the receive buffer
+DRAIN_BATCH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# Bucket upper bounds for IOCTL latency (seconds)
+IOCTL_LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+# Bucket upper bounds for RSSI (dBm)
+RSSI_BUCKETS = (-110, -100, -90, -80, -70, -60, -50, -40, -30, -20)
+
+# Bucket upper bounds for the time listen before talk waited for a clear channel (seconds)
+CHANNEL_BUSY_BUCKETS = (0, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+
+class Histogram:
+    """Histogram with fixed bucket upper bounds"""
+
+    bounds: Sequence[float]
+    counts: List[int]
+    count: int
+    sum: float
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # Final bucket holds values above the largest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value to the histogram"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[int]:
+        """Get the cumulative bucket counts, ending with the +Inf bucket"""
+        ret = []
+        total = 0
+
+        for count in self.counts:
+            total += count
+            ret.append(total)
+
+        return ret
+
+
+class RadioStats:
+    """Runtime counters for a CC1101 device
+
+    Counters are only ever incremented from the thread using the device, so can be read
+    without locking for reporting purposes.
+    """
+
+    packets: int
+    bytes: int
+    drains: int
+    reconfigurations: int
+    errors: Dict[DeviceError, int]
+    drain_batch: Histogram
+    ioctl_latency: Dict[IOCTL, Histogram]
+    rssi: Histogram
+    lbt_transmits: int
+    lbt_timeouts: int
+    channel_busy: Histogram
+
+    def __init__(self) -> None:
+        self.packets = 0
+        self.bytes = 0
+        self.drains = 0
+        self.reconfigurations = 0
+        self.errors = {e: 0 for e in DeviceError}
+        self.drain_batch = Histogram(DRAIN_BATCH_BUCKETS)
+        self.ioctl_latency = {c: Histogram(IOCTL_LATENCY_BUCKETS) for c in IOCTL}
+        self.rssi = Histogram(RSSI_BUCKETS)
+        self.lbt_transmits = 0
+        self.lbt_timeouts = 0
+        self.channel_busy = Histogram(CHANNEL_BUSY_BUCKETS)
+
+    def record_drain(self, packets: int, packet_length: int) -> None:
+        """Record the result of draining the receive buffer"""
+        self.drains += 1
+        self.packets += packets
+        self.bytes += packets * packet_length
+        self.drain_batch.observe(packets)
+
+    def record_ioctl(self, command: IOCTL, duration: float) -> None:
+        """Record the duration in seconds of an IOCTL"""
+        self.ioctl_latency[command].observe(duration)
+
+    def record_lbt(self, busy_time: float, transmitted: bool) -> None:
+        """Record the time in seconds listen before talk found the channel busy"""
+        if transmitted:
+            self.lbt_transmits += 1
+        else:
+            self.lbt_timeouts += 1
+        self.channel_busy.observe(busy_time)
+
+    def record_error(self, error: DeviceError) -> None:
+        """Record a device error"""
+        self.errors[error] += 1
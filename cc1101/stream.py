@@ -0,0 +1,144 @@
+"""
+Copyright (c) 2022
+"""
+
+from typing import List, Optional
+
+from cc1101.batch import PacketBatch
+from cc1101.decode import Frame, PulseDecoder
+
+# Default limit on carried over samples when no sync has been seen
+DEFAULT_MAX_CARRY = 4096
+
+
+class StreamReassembler:
+    """Decode frames from consecutive packets as a continuous stream of samples
+
+    With a sync word of 0, the device returns the air as back-to-back fixed length packets,
+    so frames can span packet boundaries. Samples after the last complete frame are carried
+    over and prepended to the next packet, so each sample is only scanned again if it may
+    be part of an incomplete frame.
+
+    The stream is restarted when reset() is called (e.g after a drain error), or when a
+    batch arrives later than the packets it contains account for, meaning packets have been
+    lost. Where packets were dropped from a batch (e.g by a PacketFilter), the carry is
+    discarded and the dropped samples skipped, so no frame spans the gap. Frame end offsets
+    count samples from the start of the stream.
+    """
+
+    decoder: PulseDecoder
+    packet_duration: Optional[int]
+    tolerance: float
+    max_carry: int
+    discontinuities: int
+    _carry: int
+    _carry_length: int
+    _offset: int
+    _origin: int
+    _packets: int
+
+    def __init__(
+        self,
+        decoder: PulseDecoder,
+        packet_duration: Optional[int] = None,
+        tolerance: float = 0.5,
+        max_carry: int = DEFAULT_MAX_CARRY,
+    ):
+        self.decoder = decoder
+        self.packet_duration = packet_duration
+        self.tolerance = tolerance
+        self.max_carry = max_carry
+        self.discontinuities = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard carried over samples and start a new stream"""
+        self._carry = 0
+        self._carry_length = 0
+        self._offset = 0
+        self._origin = -1
+        self._packets = 0
+
+    def _check_timing(self, batch: PacketBatch) -> None:
+        """Restart the stream if packets are missing between the previous batch and this one"""
+        if self.packet_duration is None:
+            return
+
+        if self._origin != -1:
+            self._packets += batch.drained
+            expected = (batch.timestamp - self._origin) / self.packet_duration
+            lag = expected - self._packets
+
+            # The packet being received when the drain completed is not yet returned
+            if lag <= 1 + self.tolerance:
+                if lag < 0:
+                    # Packets arrived earlier than estimated, so move the origin back
+                    self._origin = (
+                        batch.timestamp - self._packets * self.packet_duration
+                    )
+                return
+
+            self.discontinuities += 1
+            self.reset()
+
+        if batch.drained > 0:
+            self._packets = batch.drained
+            self._origin = batch.timestamp - self._packets * self.packet_duration
+
+    def feed(self, batch: PacketBatch) -> List[Frame]:
+        """Decode the frames completed by a batch of packets"""
+        self._check_timing(batch)
+
+        if batch.contiguous:
+            return self.feed_bytes(batch.data) if len(batch) > 0 else []
+
+        # Feed each run of consecutive packets, skipping the dropped packets between them
+        bits = batch.packet_length * 8
+        frames: List[Frame] = []
+        run: List[bytes] = []
+        position = 0
+
+        for index, packet in zip(batch.positions(), batch.packets):
+            if index != position:
+                if len(run) > 0:
+                    frames += self.feed_bytes(b"".join(run))
+                    run = []
+                self.skip((index - position) * bits)
+
+            run.append(packet)
+            position = index + 1
+
+        if len(run) > 0:
+            frames += self.feed_bytes(b"".join(run))
+        self.skip((batch.drained - position) * bits)
+
+        return frames
+
+    def skip(self, samples: int) -> None:
+        """Discard the carried over samples and skip samples missing from the stream"""
+        if samples == 0:
+            return
+
+        self._offset += self._carry_length + samples
+        self._carry = 0
+        self._carry_length = 0
+
+    def feed_bytes(self, data: bytes) -> List[Frame]:
+        """Decode the frames completed by data continuing the stream"""
+        length = self._carry_length + len(data) * 8
+        value = (self._carry << (len(data) * 8)) | int.from_bytes(data, "big")
+
+        frames, consumed = self.decoder.decode_int(value, length)
+
+        offset = self._offset
+        if offset != 0:
+            frames = [f._replace(end=f.end + offset) for f in frames]
+
+        # Bound the carry if no sync has been seen for a long time
+        consumed = max(consumed, length - self.max_carry)
+
+        self._carry_length = length - consumed
+        self._carry = value & ((1 << self._carry_length) - 1)
+        self._offset = offset + consumed
+
+        return frames
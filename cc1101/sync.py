@@ -0,0 +1,167 @@
+"""
+Copyright (c) 2022
+"""
+
+from typing import List, Set, Tuple
+
+# Minimum chunk length to search for with bytes.find - at any bit offset, it contains a whole byte
+MIN_FIND_BITS = 15
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+class _Chunk:
+    """Part of the pattern that must match exactly for the whole pattern to be a candidate"""
+
+    bits: int
+    length: int
+    # Offset of the chunk in the pattern
+    offset: int
+    # For each bit shift - the whole bytes of the chunk and their bit offset in the chunk
+    needles: List[Tuple[bytes, int]]
+
+    def __init__(self, bits: int, length: int, offset: int):
+        self.bits = bits
+        self.length = length
+        self.offset = offset
+        self.needles = []
+
+        if length >= MIN_FIND_BITS:
+            for shift in range(8):
+                # First bit of the chunk on a byte boundary when it starts shift bits into a byte
+                start = (8 - shift) % 8
+                count = (length - start) // 8
+                end = length - start - count * 8
+
+                whole = (bits >> end) & ((1 << (count * 8)) - 1)
+                self.needles.append((whole.to_bytes(count, "big"), start))
+
+    def find(self, data: bytes) -> List[int]:
+        """Get the bit offsets the chunk's whole bytes are found at, for each bit shift"""
+        starts = []
+
+        for needle, start in self.needles:
+            position = data.find(needle)
+            while position != -1:
+                starts.append(position * 8 - start)
+                position = data.find(needle, position + 1)
+
+        return starts
+
+    def match(self, value: int, length: int) -> List[int]:
+        """Get the bit offsets of exact matches by ANDing shifted copies of the data"""
+        ones = value
+        zeros = value ^ ((1 << length) - 1)
+        matches = (1 << length) - 1
+
+        for i in range(self.length):
+            bit = (self.bits >> (self.length - 1 - i)) & 1
+            matches &= (ones if bit else zeros) << i
+
+        # Only offsets where the whole chunk is within the data
+        matches = (matches >> (self.length - 1)) << (self.length - 1)
+        matches &= (1 << length) - 1
+
+        starts = []
+        while matches != 0:
+            top = matches.bit_length() - 1
+            starts.append(length - 1 - top)
+            matches ^= 1 << top
+
+        return starts
+
+
+class SyncSearcher:
+    """Find a sync pattern at any bit offset, allowing up to max_errors bit errors
+
+    The pattern is split into max_errors + 1 chunks, at least one of which must match
+    exactly. Chunks are found with bytes.find of the whole bytes they contain at each of the
+    8 bit shifts, or with shifts and masks of the data for chunks too short to contain a
+    whole byte at every shift. Candidates are confirmed by counting differing bits of the
+    whole pattern.
+
+    feed() searches consecutive packets as a stream, carrying over only the bytes needed for
+    a pattern to span a packet boundary.
+    """
+
+    pattern: int
+    length: int
+    max_errors: int
+    _chunks: List[_Chunk]
+    _mask: int
+    _tail: bytes
+    _position: int
+
+    def __init__(self, pattern: int, length: int, max_errors: int = 0):
+        if max_errors >= length:
+            raise ValueError("max_errors must be less than the pattern length")
+
+        self.pattern = pattern
+        self.length = length
+        self.max_errors = max_errors
+        self._mask = (1 << length) - 1
+
+        self._chunks = []
+        count = max_errors + 1
+        offset = 0
+        for i in range(count):
+            chunk_length = length // count + (1 if i < length % count else 0)
+            shift = length - offset - chunk_length
+            bits = (pattern >> shift) & ((1 << chunk_length) - 1)
+            self._chunks.append(_Chunk(bits, chunk_length, offset))
+            offset += chunk_length
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard the carried over data and start a new stream"""
+        self._tail = b""
+        self._position = 0
+
+    def search(self, data: bytes) -> List[int]:
+        """Get the bit offsets of the pattern in data"""
+        length = len(data) * 8
+        if length < self.length:
+            return []
+
+        value = int.from_bytes(data, "big")
+
+        candidates: Set[int] = set()
+        for chunk in self._chunks:
+            if len(chunk.needles) > 0:
+                starts = chunk.find(data)
+            else:
+                starts = chunk.match(value, length)
+
+            candidates.update(start - chunk.offset for start in starts)
+
+        matches = []
+        last = length - self.length
+
+        for start in sorted(candidates):
+            if start < 0 or start > last:
+                continue
+
+            window = (value >> (last - start)) & self._mask
+            if _popcount(window ^ self.pattern) <= self.max_errors:
+                matches.append(start)
+
+        return matches
+
+    def feed(self, data: bytes) -> List[int]:
+        """Get the bit offsets from the start of the stream of patterns ending in data"""
+        tail = self._tail
+        base = self._position - len(tail) * 8
+
+        # Matches entirely within the tail were found by the previous call
+        first = len(tail) * 8 - self.length + 1
+
+        matches = [base + m for m in self.search(tail + data) if m >= first]
+
+        keep = (self.length - 1 + 7) // 8
+        self._tail = (tail + data)[-keep:] if keep > 0 else b""
+        self._position += len(data) * 8
+
+        return matches
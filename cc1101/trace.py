@@ -0,0 +1,154 @@
+"""
+Copyright (c) 2022
+"""
+
+import errno
+import signal
+import struct
+
+from array import array
+from enum import IntEnum
+from types import FrameType
+from typing import List, Optional, Tuple
+
+from cc1101.ioctl import IOCTL
+
+TRACE_MAGIC = b"CC1101TR"
+TRACE_VERSION = 1
+
+# Header - magic, version, fields per event, number of events
+TRACE_HEADER = struct.Struct("<8sHHI")
+
+# Fields per event - start (ns), opcode, command, size, errno, duration (ns)
+FIELDS = 6
+
+DEFAULT_TRACE_SIZE = 1024
+
+Event = Tuple[int, int, int, int, int, int]
+
+
+class Opcode(IntEnum):
+    """Operations recorded in the trace"""
+
+    OPEN = 0
+    IOCTL = 1
+    READ = 2
+    WRITE = 3
+
+
+class TraceRing:
+    """Fixed-size ring of the most recent device operations
+
+    Events are stored as consecutive integers in a preallocated array, so recording an
+    event is a few integer stores with no allocation.
+    """
+
+    size: int
+    count: int
+    _data: array
+    _next: int
+
+    def __init__(self, size: int = DEFAULT_TRACE_SIZE):
+        self.size = size
+        self.count = 0
+        self._data = array("q", bytes(8 * FIELDS * size))
+        self._next = 0
+
+    def record(
+        self,
+        opcode: int,
+        command: int,
+        size: int,
+        err: int,
+        start: int,
+        duration: int,
+    ) -> None:
+        """Record an operation. command is -1 for non-IOCTL operations"""
+        data = self._data
+        i = self._next
+        data[i] = start
+        data[i + 1] = opcode
+        data[i + 2] = command
+        data[i + 3] = size
+        data[i + 4] = err
+        data[i + 5] = duration
+        i += FIELDS
+        self._next = 0 if i == len(data) else i
+        self.count += 1
+
+    def events(self) -> List[Event]:
+        """Get the recorded events, oldest first"""
+        if self.count < self.size:
+            data = self._data[: self._next]
+        else:
+            data = self._data[self._next :] + self._data[: self._next]
+
+        return [
+            (data[i], data[i + 1], data[i + 2], data[i + 3], data[i + 4], data[i + 5])
+            for i in range(0, len(data), FIELDS)
+        ]
+
+    def dump(self, path: str, text: bool = False) -> None:
+        """Write the recorded events to a file as binary or a text timeline"""
+        events = self.events()
+
+        if text:
+            with open(path, "w") as f:
+                f.write("\n".join(format_timeline(events)) + "\n")
+        else:
+            data = array("q", [field for event in events for field in event])
+            with open(path, "wb") as f:
+                f.write(
+                    TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, FIELDS, len(events))
+                )
+                f.write(data.tobytes())
+
+    def install_signal_handler(
+        self, path: str, signum: int = signal.SIGUSR1, text: bool = False
+    ) -> None:
+        """Dump the trace to a file whenever a signal is received"""
+
+        def handler(signum: int, frame: Optional[FrameType]) -> None:
+            self.dump(path, text)
+
+        signal.signal(signum, handler)
+
+
+def load(path: str) -> List[Event]:
+    """Read the events from a binary trace dump"""
+    with open(path, "rb") as f:
+        magic, version, fields, count = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+
+        if magic != TRACE_MAGIC or version != TRACE_VERSION or fields != FIELDS:
+            raise ValueError(f"{path} is not a CC1101 trace")
+
+        data = array("q")
+        data.frombytes(f.read(8 * FIELDS * count))
+
+    return [
+        (data[i], data[i + 1], data[i + 2], data[i + 3], data[i + 4], data[i + 5])
+        for i in range(0, len(data), FIELDS)
+    ]
+
+
+def format_timeline(events: List[Event]) -> List[str]:
+    """Render events as lines of a timeline relative to the first event"""
+    if len(events) == 0:
+        return []
+
+    first = events[0][0]
+    lines = []
+
+    for start, opcode, command, size, err, duration in events:
+        name = Opcode(opcode).name
+        if command >= 0:
+            name += f" {IOCTL(command).name}"
+
+        line = f"+{(start - first) / 1000:12.1f} us  {name:<28} size={size:<6}"
+        line += f" {duration / 1000:9.1f} us"
+        if err != 0:
+            line += f"  {errno.errorcode.get(err, str(err))}"
+
+        lines.append(line)
+
+    return lines
@@ -0,0 +1,59 @@
+"""
+Copyright (c) 2022
+
+Example showing protocol decoding spread across processes. The main process only drains the
+CC1101 into a shared memory ring, and each decoder process reads every Nth packet from it.
+"""
+
+import multiprocessing
+
+from cc1101 import CC1101
+from cc1101.config import RXConfig, Modulation
+from cc1101.poll import AdaptivePoller
+from cc1101.protocols import NEXUS, ProtocolRegistry
+from cc1101.ring import PacketRing
+
+DEVICE = "/dev/cc1101.0.0"
+FREQUENCY = 433.92
+BAUD_RATE = 4
+PACKET_LENGTH = 1024
+DECODERS = multiprocessing.cpu_count()
+
+
+def decode(name: str, consumer: int) -> None:
+    """Decode the packets assigned to a consumer"""
+    ring = PacketRing.attach(name)
+    reader = ring.reader(consumer, DECODERS)
+
+    registry = ProtocolRegistry(BAUD_RATE)
+    registry.register(NEXUS)
+
+    while True:
+        for packet in reader.wait(1):
+            for message in registry.decode(packet.packet):
+                print(f"[{consumer}] {message.protocol} {message.fields}")
+
+        if reader.overflows > 0:
+            print(f"[{consumer}] {reader.overflows} packets lost")
+
+
+if __name__ == "__main__":
+    ring = PacketRing.create(PACKET_LENGTH, consumers=DECODERS)
+
+    for consumer in range(DECODERS):
+        multiprocessing.Process(
+            target=decode, args=(ring.name, consumer), daemon=True
+        ).start()
+
+    rx_config = RXConfig.new(FREQUENCY, Modulation.OOK, BAUD_RATE, PACKET_LENGTH)
+    radio = CC1101(DEVICE, rx_config, blocking=True)
+    poller = AdaptivePoller.for_radio(radio)
+
+    try:
+        while True:
+            batch = radio.receive_batch()
+            ring.write_batch(batch)
+            poller.wait(batch.drained)
+    finally:
+        ring.close()
+        ring.unlink()
@@ -28,13 +28,14 @@ The data is grouped in 9 nibbles:
 - humidity is 8 bits
 """
 
-import bitstring
 import time
 
 from cc1101 import CC1101
 from cc1101.config import RXConfig, Modulation
-
-from typing import List
+from cc1101.batch import packet_duration
+from cc1101.dedup import Deduplicator
+from cc1101.poll import AdaptivePoller
+from cc1101.protocols import NEXUS, ProtocolRegistry
 
 DEVICE = "/dev/cc1101.0.0"
 FREQUENCY = 433.92
@@ -47,56 +48,36 @@ Pulse width is ~500us = 500 * 10^-6
 """
 BAUD_RATE = 4
 
-def decode_rx_bytes(rx_bytes: bytes) -> List[str]:
-    """Decode the received bytes to a sequence of Nexus packets (36-bit strings)"""
-
-    # Convert the received bytes to a string of bits
-    rx_bits = bitstring.BitArray(bytes=rx_bytes).bin
-
-    packets = []
-
-    bits = ""
-    count = 0
-
-    # Decode OOK by iterating over each bit
-    for bit in rx_bits:
-        # A sequence of 1's seperate each OOK-encoded bit
-        if bit == "1":
-            # 10 or more 0's indicates the start of a packet
-            if count > 10:
-                # Nexus data packets are 36-bits
-                if len(bits) == 36:
-                    packets.append(bits)
-                bits = ""
-            # 4 or more 0's is an OOK 1
-            elif count > 4:
-                bits += "1"
-            # 1 or more 0's is an OOK 0
-            elif count > 0: 
-                bits += "0"
-            count = 0
-        else:
-            # Count the number of zeros
-            count += 1
-    
-    return packets
+# The Nexus protocol declares its timing and field layout (cc1101/protocols.py). Packets are
+# received back-to-back, so they are decoded as a continuous stream to find frames split
+# across packets. Other protocols on the same frequency can also be registered.
+REGISTRY = ProtocolRegistry(BAUD_RATE, packet_duration(PACKET_LENGTH, BAUD_RATE))
+REGISTRY.register(NEXUS)
+
+# Each frame is sent 12 times, only output the first copy
+DEDUP = Deduplicator(window=2)
 
 # Create the RX config and device
 rx_config = RXConfig.new(FREQUENCY, Modulation.OOK, BAUD_RATE, PACKET_LENGTH)
 radio = CC1101(DEVICE, rx_config)
 
+# Drain about once per packet, and sooner if the buffer fills faster
+poller = AdaptivePoller.for_radio(radio, latency=1)
+
 # RX Loop
 print("Receiving:")
 while True:
-    # Read bytes from the CC1101
-    for rx_bytes in radio.receive():
-        # Decode using OOK
-        for packet in decode_rx_bytes(rx_bytes):
-            # Decode the OOK decoded bitstrings based on the packet format 
-            id, battery_ok, const0, channel, temperature, const1, humidity = bitstring.Bits(bin=packet).unpack("uint:8, bool:1, uint:1, uint:2, int:12, uint:4, uint:8")
-            
-            # Basic data checks
-            if channel in [0,1,2] and const0 == 0 and const1 == 0xF and humidity <= 100:
-                print(f"ID: {id}\nChannel: {channel + 1}\nTemperature: {temperature / 10} °C\nHumidity: {humidity}%\nBattery: {'OK' if battery_ok else 'LOW'}\n")
-
-    time.sleep(1)
+    # Read bytes from the CC1101 and decode using OOK
+    # Frames failing the protocol's constant and range checks are discarded
+    batch = radio.receive_batch()
+    messages = REGISTRY.feed(batch)
+    rssi = radio.get_rssi() if len(messages) > 0 else None
+
+    for message in DEDUP.filter(messages, batch.timestamp, rssi):
+        f = message.fields
+        print(f"ID: {f['id']}\nChannel: {f['channel'] + 1}\nTemperature: {f['temperature']} °C\nHumidity: {f['humidity']}%\nBattery: {'OK' if f['battery_ok'] else 'LOW'}\n")
+
+    for repeats in DEDUP.expire(time.monotonic_ns()):
+        print(f"ID: {repeats.message.fields['id']} received {repeats.copies} times, best RSSI {repeats.best_rssi} dB\n")
+
+    poller.wait(batch.drained)
@@ -0,0 +1,90 @@
+"""
+Copyright (c) 2022
+
+Benchmark of decoding a capture file with increasing numbers of processes.
+
+Usage: parallel_decode_benchmark.py [capture.bin baud_rate]
+
+Without arguments, a capture of Nexus frames separated by noise is generated.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from cc1101.encode import LineEncoder
+from cc1101.parallel import decode_file
+from cc1101.protocols import NEXUS, PROTOCOLS
+
+CAPTURE_SIZE = 16 * 1024 * 1024
+
+
+def generate_capture(path: str, size: int) -> None:
+    """Write Nexus frames at 4 kBaud separated by random noise"""
+    encoder = LineEncoder.from_timing(NEXUS.timing, 4)
+    rng = random.Random(0)
+
+    # Encode a block and repeat it to fill the capture
+    samples = ""
+    while len(samples) < 64 * 1024 * 8:
+        bits = (rng.getrandbits(8) << 28) | (1 << 27) | (rng.getrandbits(12) << 12)
+        bits |= (0xF << 8) | rng.randrange(101)
+
+        samples += encoder.encode_bits(bits, 36) * 12
+        samples += format(rng.getrandbits(512), "0512b")
+
+    samples = samples[: len(samples) - len(samples) % 8]
+    block = int(samples, 2).to_bytes(len(samples) // 8, "big")
+
+    with open(path, "wb") as f:
+        for _ in range(size // len(block)):
+            f.write(block)
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        baud_rate = float(sys.argv[2])
+        temporary = None
+    else:
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        temporary = path
+        baud_rate = 4
+        generate_capture(path, CAPTURE_SIZE)
+
+    size = os.path.getsize(path)
+    protocols = [p.name for p in PROTOCOLS]
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+
+    print(f"{size / 1024 / 1024:.1f} MiB capture")
+
+    try:
+        baseline = None
+        expected = None
+
+        for processes in counts:
+            start = time.perf_counter()
+            messages = decode_file(path, baud_rate, protocols, processes=processes)
+            elapsed = time.perf_counter() - start
+
+            if baseline is None:
+                baseline = elapsed
+                expected = messages
+            elif messages != expected:
+                print(f"{processes} processes decoded different messages")
+
+            print(
+                f"{processes:>3} processes {len(messages):>8} messages {elapsed:>8.2f} s"
+                f" {size / elapsed / 1024 / 1024:>8.2f} MiB/s"
+                f" speedup {baseline / elapsed:.1f}x"
+            )
+    finally:
+        if temporary is not None:
+            os.unlink(temporary)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/28757B2/cc1101-python",
     packages=setuptools.find_packages(),
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     classifiers=[
         "Topic :: Home Automation",
         "Operating System :: POSIX :: Linux",
@@ -0,0 +1,75 @@
+import os
+import struct
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from cc1101 import CC1101, dbm_to_rssi
+from cc1101.batch import PacketBatch
+from cc1101.config import RXConfig
+from cc1101.ioctl import IOCTL
+
+
+class FakeRadio(CC1101):
+    """A CC1101 whose driver is emulated, recording what is sent to it
+
+    Drains return the queued batches, then traffic - packets for the configured frequency.
+    RSSI reads return the values in rssi in turn, repeating the last. The struct bytes of
+    each RX and TX config set are recorded in switches and tx_configs, and each transmitted
+    packet in sent with the TX config it was sent with.
+    """
+
+    batches: Deque[PacketBatch]
+    traffic: Dict[float, List[bytes]]
+    error: Optional[OSError] = None
+    rssi: List[float]
+    switches: List[bytes]
+    tx_configs: List[bytes]
+    sent: List[Tuple[bytes, bytes]]
+
+    def __init__(
+        self,
+        rx_config: Optional[RXConfig] = None,
+        traffic: Optional[Dict[float, List[bytes]]] = None,
+        rssi: Sequence[float] = (-100.0,),
+    ) -> None:
+        super().__init__("/dev/cc1101.0.0")
+        self.rx_config = rx_config
+        self.batches = deque()
+        self.traffic = traffic if traffic is not None else {}
+        self.rssi = list(rssi)
+        self.switches = []
+        self.tx_configs = []
+        self.sent = []
+
+    def _open(self) -> int:
+        return os.open(os.devnull, os.O_RDWR)
+
+    def _ioctl_write(self, fh: int, command: IOCTL, data: bytearray) -> None:
+        if command == IOCTL.SET_TX_CONF:
+            self.tx_configs.append(bytes(data))
+        elif command == IOCTL.SET_RX_CONF:
+            self.switches.append(bytes(data))
+
+    def _ioctl_read(self, fh: int, command: IOCTL, out: bytearray) -> None:
+        if command == IOCTL.GET_RSSI:
+            rssi = self.rssi.pop(0) if len(self.rssi) > 1 else self.rssi[0]
+            out[0] = dbm_to_rssi(rssi)
+        elif command == IOCTL.GET_MAX_PACKET_SIZE:
+            out[:] = struct.pack("I", 1024)
+
+    def _write(self, fh: int, packet: bytes) -> None:
+        self.sent.append((self.tx_configs[-1], bytes(packet)))
+
+    def receive_batch(self, read_rssi: bool = False) -> PacketBatch:
+        if self.error is not None:
+            raise self.error
+
+        assert self.rx_config is not None
+        packet_length = self.rx_config.packet_length
+
+        if len(self.batches) > 0:
+            return self.batches.popleft()
+
+        frequency = self.rx_config.get_common_config().get_frequency()
+        return PacketBatch(list(self.traffic.get(frequency, [])), packet_length, 0)
@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from cc1101.batch import PacketBatch
+from cc1101.capture import (
+    CaptureReader,
+    CaptureWriter,
+    INDEX_ENTRY,
+    INDEX_HEADER,
+    RECORD_HEADER,
+    RecordFlags,
+    index_path,
+    iter_records,
+    read_header,
+    record_size,
+)
+from cc1101.config import Modulation, RXConfig
+
+
+@pytest.fixture
+def rx_config() -> RXConfig:
+    return RXConfig.new(433.92, Modulation.OOK, 1, 5)
+
+
+def test_round_trip(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config) as writer:
+        writer.write_batch(PacketBatch([b"\x01" * 5, b"\x02" * 5], 5, 100, -70.5))
+        writer.write_batch(PacketBatch([b"\x03" * 5], 5, 200))
+
+    with open(path, "rb") as f:
+        header = read_header(f)
+
+    assert header.packet_length == 5
+    assert header.record_size == 24
+    assert header.header_size % 8 == 0
+    assert header.rx_config_bytes == rx_config.to_bytes()
+
+    records = list(iter_records(path))
+    assert [r.packet for r in records] == [b"\x01" * 5, b"\x02" * 5, b"\x03" * 5]
+    assert [r.timestamp for r in records] == [100, 100, 200]
+    assert [r.rssi for r in records] == [-70.5, -70.5, None]
+    assert [r.flags & RecordFlags.DRAIN_START for r in records] == [
+        RecordFlags.DRAIN_START,
+        0,
+        RecordFlags.DRAIN_START,
+    ]
+
+    assert os.path.getsize(path) == header.header_size + 3 * record_size(5)
+
+
+def test_aligned_records(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config, buffer_size=1) as writer:
+        for i in range(4):
+            writer.write(bytes([i]) * 5, i * 1000)
+
+    with open(path, "rb") as f:
+        header = read_header(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)[header.header_size :]
+            timestamps: List[int] = []
+            for i in range(4):
+                offset = i * header.record_size
+                assert offset % 8 == 0
+                (timestamp,) = struct.unpack_from("<q", view, offset)
+                timestamps.append(timestamp)
+                start = offset + RECORD_HEADER.size
+                assert bytes(view[start : start + 5]) == bytes([i]) * 5
+            view.release()
+
+    assert timestamps == [0, 1000, 2000, 3000]
+
+
+def test_rotate_size(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config, rotate_size=200) as writer:
+        for i in range(20):
+            writer.write(bytes([i]) * 5, i)
+
+    assert len(writer.files) > 1
+    assert writer.files[0] == str(tmp_path / "test.0000.cc1101cap")
+
+    records = [r for f in writer.files for r in iter_records(f)]
+    assert [r.timestamp for r in records] == list(range(20))
+
+
+def test_read_range(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config, index_interval=4) as writer:
+        for i in range(50):
+            writer.write(bytes([i]) * 5, i * 10, -100.0 + i)
+
+    with CaptureReader(path) as reader:
+        assert len(reader) == 50
+        assert reader.index_interval == 4
+
+        records = reader.read_range(95, 200)
+        assert [r.timestamp for r in records] == list(range(100, 200, 10))
+        assert records.packets()[0] == b"\x0a" * 5
+        assert records[-1].timestamp == 190
+
+        data = records.data
+        assert len(data) == 10 * reader.header.record_size
+        data.release()
+
+        assert len(reader.read_range(None, 0)) == 0
+        assert len(reader.read_range(1000, None)) == 0
+        assert len(reader.read_range()) == 50
+
+        assert [r.timestamp for r in reader.filter(rssi_min=-60.5)] == list(
+            range(400, 500, 10)
+        )
+        assert [r.rssi for r in reader.filter(-53, 0, 490)] == [-53.0, -52.0]
+
+
+def test_build_index(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config, index_interval=None) as writer:
+        for i in range(50):
+            writer.write(bytes([i]) * 5, i)
+
+    assert not os.path.exists(index_path(path))
+
+    with CaptureReader(path, index_interval=8) as reader:
+        assert reader.find(17) == 17
+
+    # The index is saved, and extended once the capture grows
+    assert os.path.getsize(index_path(path)) == INDEX_HEADER.size + 7 * INDEX_ENTRY.size
+
+    with CaptureWriter(path, rx_config, index_interval=None) as writer:
+        for i in range(100):
+            writer.write(bytes([i]) * 5, 1000 + i)
+
+    with CaptureReader(path) as reader:
+        assert reader.index_interval == 8
+        assert reader.find(1050) == 50
+        assert reader.find(2000) == 100
+
+
+def test_batches(tmp_path: Path, rx_config: RXConfig) -> None:
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config) as writer:
+        writer.write_batch(PacketBatch([b"\x01" * 5, b"\x02" * 5], 5, 100, -70.5))
+        writer.write_batch(PacketBatch([b"\x03" * 5], 5, 100))
+        writer.write_batch(PacketBatch([b"\x04" * 5], 5, 200, None, [2], 4))
+
+    with CaptureReader(path) as reader:
+        batches = list(reader.read_range().batches())
+
+    assert [b.packets for b in batches] == [
+        [b"\x01" * 5, b"\x02" * 5],
+        [b"\x03" * 5],
+        [b"\x04" * 5],
+    ]
+    assert [b.timestamp for b in batches] == [100, 100, 200]
+    assert [b.rssi for b in batches] == [-70.5, None, None]
+    assert [b.indices for b in batches] == [None, None, [2]]
+    assert [b.drained for b in batches] == [2, 1, 4]
@@ -0,0 +1,70 @@
+from array import array
+
+import pytest
+
+from cc1101.batch import PacketBatch
+from cc1101.crc import CRC, PRESETS, Checksum
+
+CHECK = b"123456789"
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("crc8/maxim", 0xA1),
+        ("crc8/smbus", 0xF4),
+        ("crc16/xmodem", 0x31C3),
+        ("crc16/ccitt-false", 0x29B1),
+        ("crc16/kermit", 0x2189),
+        ("crc16/arc", 0xBB3D),
+        ("crc16/modbus", 0x4B37),
+        ("crc16/cc1101", 0xAEE7),
+        ("crc32", 0xCBF43926),
+        ("sum8", 0xDD),
+        ("xor8", 0x31),
+    ],
+)
+def test_presets(name: str, expected: int) -> None:
+    assert PRESETS[name].compute(CHECK) == expected
+
+
+def test_table() -> None:
+    # Same parameters as the binascii and zlib variants, but computed from the table
+    ccitt_false = CRC(16, 0x1021, init=0xFFFF)
+    crc32 = CRC(32, 0x04C11DB7, 0xFFFFFFFF, True, True, 0xFFFFFFFF)
+
+    assert ccitt_false.compute_table(CHECK) == 0x29B1
+    assert crc32.compute_table(CHECK) == 0xCBF43926
+
+    with pytest.raises(ValueError):
+        CRC(4, 0x3)
+
+    with pytest.raises(TypeError):
+        Checksum(8)  # type: ignore
+
+
+def test_check() -> None:
+    crc = PRESETS["crc16/modbus"]
+    frame = CHECK + (0x4B37).to_bytes(2, "little")
+
+    assert crc.check(frame)
+    assert crc.check(memoryview(frame))
+    assert not crc.check(b"0" + frame[1:])
+    assert not crc.check(b"\x00")
+
+
+def test_check_batch() -> None:
+    crc = PRESETS["crc8"]
+    good = [bytes([i, i + 1, i + 2]) for i in range(4)]
+    good = [frame + bytes([crc.compute(frame)]) for frame in good]
+    frames = [good[0], good[1][:3] + b"\x00", good[2], good[3]]
+    expected = [True, crc.compute(good[1][:3]) == 0, True, True]
+
+    batch = PacketBatch(frames, 4, 0)
+    assert crc.check_batch(batch) == expected
+    assert crc.check_batch(b"".join(frames), 4) == expected
+    assert crc.check_batch(array("B", b"".join(frames)), 4) == expected
+    assert crc.filter(frames) == [f for f, ok in zip(frames, expected) if ok]
+
+    with pytest.raises(ValueError):
+        crc.check_batch(b"".join(frames))
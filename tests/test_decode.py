@@ -0,0 +1,89 @@
+from typing import List
+
+from cc1101.decode import LineCoding, PulseDecoder, to_bit_string
+
+NEXUS = PulseDecoder(LineCoding.PPM, zero=(1, 4), one=(5, 10), sync=11, lengths={36})
+
+
+def ppm(bits: str, pulse: int = 2, zero: int = 4, one: int = 8, sync: int = 16) -> str:
+    """Render bits as PPM samples, ending with a sync gap"""
+    samples = ""
+    for bit in bits:
+        samples += "1" * pulse + "0" * (one if bit == "1" else zero)
+    return samples + "1" * pulse + "0" * sync
+
+
+def to_bytes(samples: str) -> bytes:
+    samples += "0" * (-len(samples) % 8)
+    return int(samples, 2).to_bytes(len(samples) // 8, "big")
+
+
+def test_to_bit_string() -> None:
+    assert to_bit_string(b"") == ""
+    assert to_bit_string(b"\x01\x80") == "0000000110000000"
+
+
+def test_ppm() -> None:
+    first = "101100111000111100001010101011110000"
+    second = "000011110000101010101111000011001101"
+
+    frames = NEXUS.decode(to_bytes("0000" + ppm(first) + ppm(second)))
+
+    assert [f.bits for f in frames] == [int(first, 2), int(second, 2)]
+    assert [f.length for f in frames] == [36, 36]
+
+
+def test_lengths() -> None:
+    assert NEXUS.decode(to_bytes(ppm("1011"))) == []
+
+    decoder = PulseDecoder(LineCoding.PPM, zero=(1, 4), one=(5, 10), sync=11)
+    frames = decoder.decode(to_bytes(ppm("1011")))
+    assert [(f.bits, f.length) for f in frames] == [(0b1011, 4)]
+
+
+def test_invalid() -> None:
+    decoder = PulseDecoder(
+        LineCoding.PPM, zero=(2, 4), one=(5, 10), sync=11, separator=(1, 3)
+    )
+
+    # A long pulse discards the bits before it, the gap after it still codes a bit
+    samples = "1100000" + "1" * 6 + "0000" + ppm("11")
+    frames = decoder.decode(to_bytes(samples))
+    assert [(f.bits, f.length) for f in frames] == [(0b011, 3)]
+
+
+def test_pwm() -> None:
+    decoder = PulseDecoder(LineCoding.PWM, zero=(1, 3), one=(4, 8), sync=12)
+
+    bits = "10010111"
+    samples = "".join(("1" * 6 if bit == "1" else "11") + "000" for bit in bits)
+    samples = samples[:-3] + "0" * 16
+
+    frames = decoder.decode(to_bytes(samples))
+    assert [(f.bits, f.length) for f in frames] == [(int(bits, 2), 8)]
+
+
+def test_from_timing() -> None:
+    decoder = PulseDecoder.from_timing(
+        LineCoding.PPM, baud_rate=1, zero=1000, one=2000, sync=4000, separator=500
+    )
+
+    assert decoder.zero == (1, 1)
+    assert decoder.one == (2, 3)
+    assert decoder.sync == 4
+    assert decoder.separator == (1, 1)
+
+
+def test_consumed() -> None:
+    samples = ppm("1011") + "1100110011"
+    value = int(samples, 2)
+
+    decoder = PulseDecoder(LineCoding.PPM, zero=(1, 4), one=(5, 10), sync=11)
+    frames, consumed = decoder.decode_int(value, len(samples))
+
+    assert [f.bits for f in frames] == [0b1011]
+    assert frames[0].end == len(ppm("1011")) - 16
+    assert consumed == len(ppm("1011")) - 16 + 11
+
+    empty: List[int] = []
+    assert decoder.decode_int(0, 100) == (empty, 100)
@@ -0,0 +1,50 @@
+from cc1101.decode import Frame
+from cc1101.dedup import Deduplicator
+from cc1101.protocols import Message
+
+SECOND = 1_000_000_000
+
+
+def message(bits: int, protocol: str = "test") -> Message:
+    return Message(protocol, {"value": bits}, Frame(bits, 36, 0))
+
+
+def test_repeats() -> None:
+    dedup = Deduplicator(window=2)
+
+    assert dedup.add(message(1), 0, -80)
+    assert not dedup.add(message(1), SECOND // 10, -60)
+    assert not dedup.add(message(1), SECOND // 5, -70)
+    assert dedup.add(message(2), SECOND // 5)
+    assert dedup.add(message(1, "other"), SECOND // 5)
+
+    assert dedup.duplicates == 2
+    assert dedup.expire(SECOND) == []
+
+    closed = dedup.expire(2 * SECOND)
+    assert len(closed) == 1
+    assert closed[0].message == message(1)
+    assert closed[0].copies == 3
+    assert closed[0].best_rssi == -60
+    assert closed[0].last == SECOND // 5
+
+    # A copy after the window is a new message
+    assert dedup.add(message(2), 3 * SECOND)
+    assert [r.copies for r in dedup.expire(3 * SECOND)] == [1, 1]
+    assert len(dedup) == 1
+
+
+def test_bounded() -> None:
+    dedup = Deduplicator(window=2, max_entries=4)
+
+    new = dedup.filter([message(i) for i in range(10)], 0)
+    assert len(new) == 10
+    assert len(dedup) == 4
+    assert dedup.evicted == 6
+
+    # Summaries of closed windows are bounded too
+    assert dedup.lost == 2
+    closed = dedup.expire(0)
+    assert [r.message.frame.bits for r in closed] == list(range(2, 6))
+    assert [r.message.frame.bits for r in dedup.flush()] == list(range(6, 10))
+    assert len(dedup) == 0
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import FakeRadio
+
+from cc1101.config import Modulation, RXConfig, TXConfig
+from cc1101.dutycycle import (
+    DutyCycleScheduler,
+    DutyCycleWindow,
+    SubBand,
+    airtime,
+)
+
+
+def tx_config(frequency: float) -> TXConfig:
+    rx_config = RXConfig.new(frequency, Modulation.FSK_2, 100, 4, sync_word=0xD391)
+    return TXConfig.from_rx_config(rx_config, 0xC0)
+
+
+def test_airtime() -> None:
+    # 4 byte preamble, 2 byte sync word and 20 byte packet at 100 kBaud
+    assert airtime(tx_config(868.3), 20) == pytest.approx(26 * 8 * 10_000, rel=0.01)
+
+
+def test_window() -> None:
+    window = DutyCycleWindow(SubBand("test", 868.0, 868.6, 0.01), window=100)
+    assert window.budget == 1.0
+
+    window.record(0, 0.4)
+    window.record(10, 0.4)
+    assert window.remaining(20) == pytest.approx(0.2)
+    assert window.delay(0.2, 20) == 0
+
+    # Fits once the first transmission leaves the window
+    assert window.delay(0.5, 20) == 80
+    assert window.delay(0.9, 20) == 90
+    assert window.remaining(100) == pytest.approx(0.6)
+
+    with pytest.raises(ValueError):
+        window.delay(1.1, 100)
+
+
+def test_scheduler() -> None:
+    radio = FakeRadio()
+    sub_band = SubBand("test", 868.0, 868.6, 0.1)
+    scheduler = DutyCycleScheduler(radio, [sub_band], window=0.1)
+
+    # 2.08ms of airtime each, so 4 fit the 10ms budget
+    for i in range(5):
+        scheduler.submit(tx_config(868.3), bytes([i] * 20))
+    scheduler.submit(tx_config(433.92), b"\xff" * 20)
+
+    assert scheduler.queue_delay(868.3) == pytest.approx(0.1, abs=0.01)
+    assert scheduler.transmit_ready() == 5
+    # One configuration per sub-band
+    assert len(radio.tx_configs) == 2
+    assert radio.sent[-1] == (bytes(tx_config(433.92).to_bytes()), b"\xff" * 20)
+    assert scheduler.remaining(868.3) == pytest.approx(
+        0.10 * 0.1 - 4 * 0.00208, abs=0.0001
+    )
+    assert scheduler.remaining(433.92) == float("inf")
+    release = scheduler.next_release()
+    assert release is not None
+    assert 0 < release <= 0.1
+
+    scheduler.run()
+
+    assert [p for _, p in radio.sent if p != b"\xff" * 20] == [
+        bytes([i] * 20) for i in range(5)
+    ]
+    assert scheduler.transmitted == 6
+    assert scheduler.max_delay >= 0.09
+    assert scheduler.next_release() is None
+
+    with pytest.raises(ValueError):
+        scheduler.submit(tx_config(868.3), bytes(1024))
@@ -0,0 +1,50 @@
+from cc1101.decode import LineCoding, PulseDecoder
+from cc1101.encode import FrameTemplate, LineEncoder, encode_frame, to_bytes
+from cc1101.protocols import NEXUS, ProtocolRegistry
+
+
+def test_encode_bits() -> None:
+    encoder = LineEncoder.manchester()
+
+    assert encoder.encode(b"\x0f") == "1010101001010101"
+    assert encoder.encode_bits(0b101, 3) == "011001"
+    assert encoder.encode_bits(0x1F0, 9) == encoder.encode_bits(1, 1) + encoder.encode(
+        b"\xf0"
+    )
+
+    assert LineEncoder.nrz(2).encode_bits(0b10, 2) == "1100"
+    assert LineEncoder.ppm(1, 2, 4, 8).encode_bits(0b10, 2) == "10000100" + "100000000"
+    assert LineEncoder.pwm(1, 3, 2, 5).encode_bits(0b10, 2) == "11100" + "100" + "000"
+
+
+def test_to_bytes() -> None:
+    assert to_bytes("") == b""
+    assert to_bytes("1") == b"\x80"
+    assert to_bytes("0000111100001") == b"\x0f\x08"
+
+
+def test_loopback() -> None:
+    decoder = PulseDecoder(LineCoding.PWM, zero=(1, 3), one=(4, 8), sync=12)
+    encoder = LineEncoder.for_decoder(decoder)
+
+    data = to_bytes("0000" + encoder.encode_bits(0x2C5, 10) * 3)
+    frames = decoder.decode(data)
+
+    assert [(f.bits, f.length) for f in frames] == [(0x2C5, 10)] * 3
+
+
+def test_nexus_loopback() -> None:
+    bits = (0x5A << 28) | (1 << 27) | (215 << 12) | (0xF << 8) | 60
+    template = FrameTemplate(LineEncoder.from_timing(NEXUS.timing, 4), 12, "0000")
+
+    data = encode_frame(template, bits, 36)
+    assert encode_frame(template, bits, 36) is data
+    assert encode_frame.cache_info().hits >= 1
+
+    registry = ProtocolRegistry(4)
+    registry.register(NEXUS)
+
+    messages = registry.decode(data)
+    assert len(messages) == 12
+    assert messages[0].fields["temperature"] == 21.5
+    assert messages[0].fields["humidity"] == 60
@@ -0,0 +1,61 @@
+from cc1101 import CC1101
+from cc1101.config import Modulation, RXConfig
+from cc1101.errors import DeviceError
+from cc1101.exporter import MetricsExporter
+from cc1101.filters import PacketFilter
+from cc1101.ioctl import IOCTL
+from cc1101.stats import Histogram
+
+
+def test_histogram() -> None:
+    histogram = Histogram((1, 2, 4))
+
+    for value in [0, 1, 2, 3, 5, 100]:
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1, 2]
+    assert histogram.cumulative() == [2, 3, 4, 6]
+    assert histogram.count == 6
+    assert histogram.sum == 111
+
+
+def test_scrape() -> None:
+    radio = CC1101("/dev/cc1101.0.0")
+    radio.rx_config = RXConfig.new(433.92, Modulation.OOK, 1, 64)
+    radio.stats.record_drain(3, 64)
+    radio.stats.record_ioctl(IOCTL.SET_RX_CONF, 0.0002)
+    radio.stats.record_error(DeviceError.PACKET_SIZE)
+    radio.stats.record_lbt(0.002, True)
+
+    exporter = MetricsExporter([radio])
+    exporter._samples[radio.dev] = exporter.render(radio)
+
+    lines = exporter.scrape().decode("utf-8").splitlines()
+    labels = f'device="/dev/cc1101.0.0",fingerprint="{radio.rx_config.fingerprint()}"'
+
+    assert f"cc1101_packets_total{{{labels}}} 3" in lines
+    assert f"cc1101_bytes_total{{{labels}}} 192" in lines
+    assert f'cc1101_drain_batch_packets_bucket{{{labels},le="4"}} 1' in lines
+    assert (
+        f'cc1101_ioctl_latency_seconds_count{{{labels},ioctl="SET_RX_CONF"}} 1' in lines
+    )
+    assert f'cc1101_errors_total{{{labels},error="PACKET_SIZE"}} 1' in lines
+    assert f"cc1101_lbt_transmits_total{{{labels}}} 1" in lines
+    assert f'cc1101_channel_busy_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert lines.count("# TYPE cc1101_packets counter") == 1
+    assert lines[-1] == "# EOF"
+
+
+def test_scrape_filter() -> None:
+    radio = CC1101("/dev/cc1101.0.0")
+    radio.packet_filter = PacketFilter.parse(["nonconstant"])
+    radio.packet_filter.apply([b"\x00", b"\x01"])
+
+    exporter = MetricsExporter([radio])
+    exporter._samples[radio.dev] = exporter.render(radio)
+
+    lines = exporter.scrape().decode("utf-8").splitlines()
+    labels = 'device="/dev/cc1101.0.0",fingerprint=""'
+
+    assert f"cc1101_filter_passed_total{{{labels}}} 1" in lines
+    assert f'cc1101_filter_dropped_total{{{labels},condition="nonconstant"}} 1' in lines
@@ -0,0 +1,43 @@
+import pytest
+
+from cc1101.filters import PacketFilter, parse_condition
+
+
+def test_conditions() -> None:
+    assert parse_condition("len>=4").predicate(b"1234")
+    assert not parse_condition("len==3").predicate(b"1234")
+
+    assert parse_condition("[1]==0x55").predicate(b"\x00\x55")
+    assert parse_condition("[0] & 0xf0 == 0x50").predicate(b"\x5a")
+    assert not parse_condition("[2]==0").predicate(b"\x00\x00")
+    assert parse_condition("[1:3]==0x1234").predicate(b"\x00\x12\x34\x00")
+    assert parse_condition("[1:3]&0xff00==0x1200").predicate(b"\x00\x12\x99")
+    assert not parse_condition("[1:3]==0x1234").predicate(b"\x00\x12")
+
+    nonconstant = parse_condition("nonconstant").predicate
+    assert not nonconstant(b"\x00" * 8)
+    assert not nonconstant(b"\xff" * 8)
+    assert nonconstant(b"\x00" * 7 + b"\x01")
+
+    transitions = parse_condition("transitions>=0.5").predicate
+    assert transitions(b"\x55" * 8)
+    assert not transitions(b"\x0f" * 8)
+
+    for expression in ["len>4", "[2:1]==0", "rssi>=-80", "foo"]:
+        with pytest.raises(ValueError):
+            parse_condition(expression)
+
+
+def test_apply() -> None:
+    packet_filter = PacketFilter.parse(["len==4", "nonconstant", "rssi>=-80"])
+    packets = [b"\x00" * 4, b"\x01\x02\x03\x04", b"\x01\x02", b"\x10\x00\x00\x00"]
+
+    assert packet_filter.apply(packets, -70) == [packets[1], packets[3]]
+    assert packet_filter.apply(packets, -90) == []
+
+    assert packet_filter.passed == 2
+    assert packet_filter.dropped == {
+        "len==4": 1,
+        "nonconstant": 1,
+        "rssi>=-80.0": 4,
+    }
@@ -0,0 +1,82 @@
+import pytest
+
+from conftest import FakeRadio
+
+from cc1101.config import Modulation, RXConfig, TXConfig
+from cc1101.hopping import HopSequence
+
+CHANNELS = [868.1, 868.3, 868.5]
+
+
+def test_configs() -> None:
+    rx_config = RXConfig.new(868.1, Modulation.FSK_2, 100, 4)
+    tx_config = TXConfig.from_rx_config(rx_config, 0xC0)
+    sequence = HopSequence(CHANNELS, rx_config, tx_config)
+
+    assert len(sequence) == 3
+    assert sequence.channels == pytest.approx(CHANNELS, abs=0.001)
+
+    for frequency, rx_bytes, tx_bytes in zip(
+        CHANNELS, sequence.rx_config_bytes, sequence.tx_config_bytes
+    ):
+        hop_rx_config = RXConfig.new(frequency, Modulation.FSK_2, 100, 4)
+        assert rx_bytes == hop_rx_config.to_bytes()
+        assert tx_bytes == TXConfig.from_rx_config(hop_rx_config, 0xC0).to_bytes()
+
+    # The base config is not modified
+    assert rx_config.get_common_config().get_frequency() == pytest.approx(
+        868.1, abs=0.001
+    )
+
+    with pytest.raises(ValueError):
+        HopSequence(CHANNELS)
+
+
+def test_hop_transmit() -> None:
+    rx_config = RXConfig.new(868.1, Modulation.FSK_2, 100, 4)
+    sequence = HopSequence(CHANNELS, tx_config=TXConfig.from_rx_config(rx_config, 0xC0))
+    radio = FakeRadio()
+
+    sequence.hop_transmit(radio, [b"\x01", b"\x02"])
+    sequence.hop_transmit(radio, [b"\x03", b"\x04"])
+
+    # Continues from the last hop, and wraps around
+    tx = sequence.tx_config_bytes
+    assert radio.sent == [
+        (tx[0], b"\x01"),
+        (tx[1], b"\x02"),
+        (tx[2], b"\x03"),
+        (tx[0], b"\x04"),
+    ]
+
+    report = sequence.report()
+    assert report.hops == 4
+    assert report.max_overhead >= report.mean_overhead > 0
+
+    with pytest.raises(ValueError):
+        sequence.hop_receive(radio, 0.01).__next__()
+
+
+def test_hop_receive() -> None:
+    sequence = HopSequence(CHANNELS, RXConfig.new(868.1, Modulation.FSK_2, 100, 4))
+    radio = FakeRadio(
+        traffic={
+            c.get_common_config().get_frequency(): [bytes([i] * 4)]
+            for i, c in enumerate(sequence.rx_configs)
+        }
+    )
+
+    received = list(sequence.hop_receive(radio, 0.001, hops=4))
+
+    assert radio.switches == [sequence.rx_config_bytes[i] for i in [0, 1, 2, 0]]
+    assert [r.hop for r in received] == [0, 1, 2, 0]
+    assert [r.frequency for r in received] == [
+        sequence.channels[i] for i in [0, 1, 2, 0]
+    ]
+    assert [r.batch.packets for r in received] == [
+        [bytes([i] * 4)] for i in [0, 1, 2, 0]
+    ]
+
+    report = sequence.report()
+    assert report.hops == 4
+    assert report.max_overhead >= report.mean_overhead > 0
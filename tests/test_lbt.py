@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import FakeRadio
+
+from cc1101.config import Modulation, RXConfig, TXConfig
+
+RX_CONFIG = RXConfig.new(868.3, Modulation.FSK_2, 10, 4)
+
+
+def tx_config(frequency: float = 868.3) -> TXConfig:
+    return TXConfig.from_rx_config(
+        RXConfig.new(frequency, Modulation.FSK_2, 10, 4), 0xC0
+    )
+
+
+def test_transmit_lbt() -> None:
+    radio = FakeRadio(RX_CONFIG, rssi=[-60, -65, -95])
+    config = bytes(tx_config().to_bytes())
+
+    result = radio.transmit_lbt(tx_config(), b"\x01\x02", -90, backoff=0.001)
+
+    # Written after the first clear sample, with the TX config set once
+    assert result.transmitted
+    assert result.samples == 3
+    assert result.rssi == -95
+    assert result.busy_time > 0
+    assert radio.tx_configs == [config]
+    assert radio.sent == [(config, b"\x01\x02")]
+
+    result = radio.transmit_lbt(tx_config(), b"\x03", -90)
+    assert result.transmitted
+    assert result.samples == 1
+    assert result.busy_time == 0
+
+    assert radio.stats.lbt_transmits == 2
+    assert radio.stats.channel_busy.count == 2
+
+
+def test_transmit_lbt_busy() -> None:
+    radio = FakeRadio(RX_CONFIG, rssi=[-50])
+
+    result = radio.transmit_lbt(tx_config(), b"\x01", -90, max_wait=0.01, backoff=0.001)
+
+    assert not result.transmitted
+    assert result.busy_time >= 0.01
+    assert radio.sent == []
+    assert radio.stats.lbt_timeouts == 1
+
+
+def test_transmit_lbt_frequency() -> None:
+    # The channel can't be sensed on another frequency
+    with pytest.raises(ValueError):
+        FakeRadio(RX_CONFIG).transmit_lbt(tx_config(433.92), b"\x01", -90)
+
+    with pytest.raises(ValueError):
+        FakeRadio().transmit_lbt(tx_config(), b"\x01", -90)
@@ -0,0 +1,105 @@
+import io
+import threading
+
+from typing import List
+
+from cc1101.output import DropPolicy, OutputWriter
+
+
+class StalledFile(io.BytesIO):
+    """A file whose writes wait until released"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, data: bytes) -> int:  # type: ignore
+        self.writing.set()
+        self.release.wait()
+        return super().write(data)
+
+
+class ClosedPipe(io.BytesIO):
+    def write(self, data: bytes) -> int:  # type: ignore
+        raise BrokenPipeError()
+
+
+def items(n: int) -> List[bytes]:
+    return [bytes([i]) for i in range(n)]
+
+
+def test_write() -> None:
+    f = io.BytesIO()
+
+    with OutputWriter(f, flush_interval=10) as output:
+        output.put(items(3))
+        output.write(b"\x03")
+
+    assert f.getvalue() == b"\x00\x01\x02\x03"
+    assert output.written == 4
+    assert output.dropped == 0
+
+
+def test_drop_oldest() -> None:
+    f = StalledFile()
+    output = OutputWriter(f, queue_size=2, policy=DropPolicy.OLDEST)
+
+    # The writer thread takes the first item and stalls writing it
+    output.put(items(1))
+    assert f.writing.wait(1)
+
+    output.put(items(5)[1:])
+    f.release.set()
+    output.close()
+
+    assert f.getvalue() == b"\x00\x03\x04"
+    assert output.dropped == 2
+
+
+def test_drop_newest() -> None:
+    f = StalledFile()
+    output = OutputWriter(f, queue_size=2, policy=DropPolicy.NEWEST)
+
+    output.put(items(1))
+    assert f.writing.wait(1)
+
+    output.put(items(5)[1:])
+    f.release.set()
+    output.close()
+
+    assert f.getvalue() == b"\x00\x01\x02"
+    assert output.dropped == 2
+
+
+def test_block() -> None:
+    f = StalledFile()
+    output = OutputWriter(f, queue_size=2, policy=DropPolicy.BLOCK)
+
+    output.put(items(1))
+    assert f.writing.wait(1)
+
+    put = threading.Thread(target=output.put, args=(items(5)[1:],))
+    put.start()
+    put.join(0.1)
+    assert put.is_alive()
+
+    f.release.set()
+    put.join(1)
+    output.close()
+
+    assert f.getvalue() == b"\x00\x01\x02\x03\x04"
+    assert output.dropped == 0
+
+
+def test_error() -> None:
+    output = OutputWriter(ClosedPipe())
+    output.put(items(2))
+    output.flush()
+    output.close()
+
+    assert isinstance(output.error, BrokenPipeError)
+    assert output.written == 0
+
+    output.put(items(1))
+    assert output.dropped == 3
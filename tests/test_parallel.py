@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from cc1101.encode import LineEncoder, to_bytes
+from cc1101.parallel import chunks, decode_file
+from cc1101.protocols import NEXUS
+
+
+def nexus_bits(i: int) -> int:
+    return (i << 28) | (1 << 27) | ((i * 3) << 12) | (0xF << 8) | (i % 100)
+
+
+def test_chunks() -> None:
+    assert chunks(100, 40, 8, 16) == [
+        (0, 32, 0, 40),
+        (32, 64, 24, 72),
+        (64, 96, 56, 100),
+        (96, 100, 88, 100),
+    ]
+
+
+def test_decode_file(tmp_path: Path) -> None:
+    encoder = LineEncoder.from_timing(NEXUS.timing, 4)
+    samples = "0000" + "".join(
+        encoder.encode_bits(nexus_bits(i), 36) for i in range(200)
+    )
+
+    path = tmp_path / "capture.bin"
+    path.write_bytes(to_bytes(samples))
+
+    # Small chunks, so many frames span chunk boundaries
+    messages = decode_file(
+        str(path), 4, ["nexus"], packet_length=16, processes=2, chunk_size=64
+    )
+
+    assert [m.fields["id"] for m in messages] == list(range(200))
+    assert [m.frame.end for m in messages] == sorted(m.frame.end for m in messages)
+
+    with pytest.raises(ValueError):
+        decode_file(str(path), 4, ["unknown"])
@@ -0,0 +1,69 @@
+import io
+import struct
+
+from typing import List, Tuple
+
+from cc1101.batch import PacketBatch
+from cc1101.config import Modulation, RXConfig
+from cc1101.pcapng import (
+    ENHANCED_PACKET_BLOCK,
+    INTERFACE_DESCRIPTION_BLOCK,
+    SECTION_HEADER_BLOCK,
+    PcapngWriter,
+)
+
+
+def blocks(data: bytes) -> List[Tuple[int, bytes]]:
+    ret = []
+    offset = 0
+
+    while offset < len(data):
+        block_type, length = struct.unpack_from("<II", data, offset)
+        assert length % 4 == 0
+        assert struct.unpack_from("<I", data, offset + length - 4)[0] == length
+        ret.append((block_type, data[offset + 8 : offset + length - 4]))
+        offset += length
+
+    assert offset == len(data)
+    return ret
+
+
+def test_write_batch() -> None:
+    rx_config = RXConfig.new(433.92, Modulation.OOK, 1, 5)
+    f = io.BytesIO()
+
+    writer = PcapngWriter(f, rx_config, "/dev/cc1101.0.0")
+    offset = writer._clock_offset
+    writer.write_batch(PacketBatch([b"\x01" * 5, b"\x02" * 5], 5, 10**9, -70.5))
+    writer.write_batch(PacketBatch([], 5, 2 * 10**9))
+    writer.write_batch(PacketBatch([b"\x03" * 5], 5, 3 * 10**9))
+
+    types = [t for t, _ in blocks(f.getvalue())]
+    assert types == [
+        SECTION_HEADER_BLOCK,
+        INTERFACE_DESCRIPTION_BLOCK,
+        ENHANCED_PACKET_BLOCK,
+        ENHANCED_PACKET_BLOCK,
+        ENHANCED_PACKET_BLOCK,
+    ]
+    assert writer.packets == 3
+
+    interface = blocks(f.getvalue())[1][1]
+    assert b"/dev/cc1101.0.0" in interface
+    assert b"modulation=OOK" in interface
+
+    packets = [body for t, body in blocks(f.getvalue()) if t == ENHANCED_PACKET_BLOCK]
+    _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+    times = PacketBatch([b"", b""], 5, 10**9).packet_times(baud_rate)
+
+    for body, packet, timestamp in zip(
+        packets, [b"\x01" * 5, b"\x02" * 5, b"\x03" * 5], times + [3 * 10**9]
+    ):
+        _, high, low, captured, length = struct.unpack_from("<IIIII", body)
+        assert (high << 32 | low) == timestamp + offset
+        assert captured == length == 5
+        assert body[20:25] == packet
+
+    assert b"rssi=-70.5dBm frequency=" in packets[0]
+    assert b"rssi=" not in packets[2]
+    assert b"baud_rate=" in packets[2]
@@ -0,0 +1,32 @@
+import pytest
+
+from cc1101.config import Modulation, RXConfig
+from cc1101.poll import AdaptivePoller
+
+
+def test_bounds() -> None:
+    # 64 byte packets at 1 kBaud take longer than the latency bound to receive
+    poller = AdaptivePoller(RXConfig.new(433.92, Modulation.OOK, 1, 64), 1024)
+    assert poller.packet_time == pytest.approx(0.511, abs=0.001)
+    assert poller.min_interval == poller.max_interval == poller.packet_time
+
+    # At 250 kBaud the buffer fills in 33ms, so is drained every 16ms at most
+    poller = AdaptivePoller(RXConfig.new(433.92, Modulation.FSK_2, 250, 64), 1024)
+    assert poller.fill_time == pytest.approx(0.0328, abs=0.0001)
+    assert poller.max_interval == poller.fill_time / 2
+    assert poller.min_interval == poller.packet_time
+
+
+def test_update() -> None:
+    poller = AdaptivePoller(RXConfig.new(433.92, Modulation.FSK_2, 250, 64), 1024)
+    assert poller.interval == poller.max_interval
+
+    # Half the buffer filled, drain twice as often
+    assert poller.update(8) == pytest.approx(poller.max_interval / 2)
+    assert poller.update(16) == pytest.approx(poller.min_interval)
+
+    # Back off while batches are small, then while idle
+    assert poller.update(1) == pytest.approx(poller.min_interval * 2)
+    assert poller.update(0) == pytest.approx(poller.min_interval * 4)
+    assert poller.update(0) == poller.max_interval
+    assert poller.update(0) == poller.max_interval
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from cc1101 import CC1101
+from cc1101.profile import Stage, StageProfiler
+
+
+def test_hooks() -> None:
+    radio = CC1101("/dev/cc1101.0.0")
+    entered: List[Stage] = []
+
+    @contextmanager
+    def hook(stage: Stage) -> Iterator[None]:
+        entered.append(stage)
+        yield
+
+    profiler = StageProfiler()
+    radio.add_hook(hook)
+    radio.add_hook(profiler)
+
+    with radio.stage(Stage.DELIVER):
+        pass
+
+    assert entered == [Stage.DELIVER]
+    assert profiler.times[Stage.DELIVER].calls == 1
+    assert profiler.times[Stage.DELIVER].samples == 1
+
+    radio.remove_hook(hook)
+    radio.remove_hook(profiler)
+
+    with radio.stage(Stage.DELIVER):
+        pass
+
+    assert entered == [Stage.DELIVER]
+
+
+def test_sampling() -> None:
+    profiler = StageProfiler(sample_every=4)
+
+    for _ in range(10):
+        with profiler(Stage.DRAIN):
+            pass
+
+    times = profiler.times[Stage.DRAIN]
+    assert times.calls == 10
+    assert times.samples == 2
+    assert times.estimated_total() == times.total * 5
+
+    report = profiler.report()
+    assert len(report) == 2
+    assert report[1].startswith("DRAIN")
@@ -0,0 +1,105 @@
+import pytest
+
+from cc1101.crc import PRESETS
+from cc1101.decode import LineCoding
+from cc1101.protocols import (
+    NEXUS,
+    Field,
+    FieldType,
+    Protocol,
+    ProtocolRegistry,
+    Timing,
+)
+
+
+def nexus_samples(bits: str) -> str:
+    """Render Nexus bits as samples at 4 kBaud, ending with a sync gap"""
+    samples = "".join("11" + ("0" * 8 if bit == "1" else "0000") for bit in bits)
+    return samples + "11" + "0" * 16
+
+
+def to_bytes(samples: str) -> bytes:
+    samples += "0" * (-len(samples) % 8)
+    return int(samples, 2).to_bytes(len(samples) // 8, "big")
+
+
+def test_parse() -> None:
+    # ID 0x5a, battery OK, channel 2, -12.3 C, 45%
+    bits = (0x5A << 28) | (1 << 27) | (1 << 24) | ((-123 & 0xFFF) << 12)
+    bits |= (0xF << 8) | 45
+
+    assert NEXUS.length == 36
+    assert NEXUS.parse(bits) == {
+        "id": 0x5A,
+        "battery_ok": True,
+        "channel": 1,
+        "temperature": -12.3,
+        "humidity": 45,
+    }
+
+    # Constant field mismatch
+    assert NEXUS.parse(bits & ~(0xF << 8)) is None
+
+    # Humidity out of range
+    assert NEXUS.parse((bits & ~0xFF) | 101) is None
+
+
+def test_unknown_constant() -> None:
+    timing = Timing(LineCoding.PPM, 1000, 2000, 4000)
+
+    with pytest.raises(ValueError):
+        Protocol("test", timing, [Field("a", 4)], constants={"b": 1})
+
+
+def test_registry() -> None:
+    other = Protocol(
+        "other",
+        Timing(LineCoding.PPM, zero=1000, one=2000, sync=4000, separator=500),
+        [Field("value", 20, FieldType.INT)],
+    )
+
+    registry = ProtocolRegistry(4)
+    registry.register(NEXUS)
+    registry.register(other)
+
+    # Protocols with the same timing share a decoder
+    assert len(registry._decoders) == 1
+
+    nexus_bits = f"{0x5A:08b}1001{(215 & 0xFFF):012b}1111{60:08b}"
+    other_bits = f"{(-5 & 0xFFFFF):020b}"
+
+    messages = registry.decode(
+        to_bytes("0000" + nexus_samples(nexus_bits) + nexus_samples(other_bits))
+    )
+
+    assert [(m.protocol, m.fields) for m in messages] == [
+        (
+            "nexus",
+            {
+                "id": 0x5A,
+                "battery_ok": True,
+                "channel": 1,
+                "temperature": 21.5,
+                "humidity": 60,
+            },
+        ),
+        ("other", {"value": -5}),
+    ]
+
+
+def test_checksum() -> None:
+    timing = Timing(LineCoding.PPM, 1000, 2000, 4000)
+    crc = PRESETS["crc8"]
+
+    protocol = Protocol(
+        "test", timing, [Field("value", 16), Field("crc", 8)], checksum=crc
+    )
+
+    value = 0x1234
+    bits = (value << 8) | crc.compute(value.to_bytes(2, "big"))
+
+    assert protocol.parse(bits) == {"value": value, "crc": bits & 0xFF}
+    assert protocol.parse(bits ^ 0x100) is None
+
+    with pytest.raises(ValueError):
+        Protocol("test", timing, [Field("value", 12)], checksum=crc)
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from cc1101.batch import PacketBatch, packet_duration
+from cc1101.capture import CaptureReader, CaptureWriter
+from cc1101.config import Modulation, RXConfig, TXConfig
+from cc1101.replay import load, report, schedule
+
+
+def test_load(tmp_path: Path) -> None:
+    rx_config = RXConfig.new(433.92, Modulation.OOK, 1, 4)
+    path = str(tmp_path / "test.cc1101cap")
+
+    with CaptureWriter(path, rx_config) as writer:
+        writer.write_batch(PacketBatch([b"\x01" * 4, b"\x02" * 4], 4, 10**9))
+        writer.write_batch(PacketBatch([b"\x03" * 4], 4, 2 * 10**9))
+
+    with CaptureReader(path) as reader:
+        packets, times = load(reader)
+
+    _, baud_rate = rx_config.get_common_config().get_modulation_and_baud_rate()
+    duration = packet_duration(4, baud_rate)
+
+    assert packets == [b"\x01" * 4, b"\x02" * 4, b"\x03" * 4]
+    assert times == [10**9 - duration, 10**9, 2 * 10**9]
+
+    tx_config = TXConfig.from_rx_config(rx_config, 0xC0)
+    assert (
+        tx_config.get_common_config().to_bytes()
+        == rx_config.get_common_config().to_bytes()
+    )
+    assert tx_config.get_tx_power_raw() == 0xC0
+
+
+def test_schedule() -> None:
+    times = [1000, 3000, 7000]
+
+    assert schedule(times) == [0, 2000, 6000]
+    assert schedule(times, 2) == [0, 1000, 3000]
+    assert schedule(times, None) is None
+
+    with pytest.raises(ValueError):
+        schedule(times, 0)
+
+
+def test_report() -> None:
+    packets = [b"\x00" * 10] * 3
+    result = report(
+        packets, [0, 500_000_000, 1_000_000_000], [0, 400_000_000, 1_000_000_000]
+    )
+
+    assert result.packets == 3
+    assert result.bytes == 30
+    assert result.duration == 1.0
+    assert result.packet_rate == 3.0
+    assert result.mean_error == 100_000_000 / 3
+    assert result.max_error == 100_000_000
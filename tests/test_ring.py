@@ -0,0 +1,76 @@
+import multiprocessing
+
+from typing import Iterator, List
+
+import pytest
+
+from cc1101.batch import PacketBatch
+from cc1101.ring import PacketRing
+
+
+@pytest.fixture
+def ring() -> Iterator[PacketRing]:
+    ring = PacketRing.create(8, slots=4, consumers=2)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def test_read(ring: PacketRing) -> None:
+    reader = ring.reader()
+
+    ring.write_batch(PacketBatch([b"\x01" * 8, b"\x02" * 8], 8, 100, -70.5))
+    ring.write(b"\x03" * 4, 200)
+
+    packets = reader.read()
+    assert [p.sequence for p in packets] == [0, 1, 2]
+    assert [p.packet for p in packets] == [b"\x01" * 8, b"\x02" * 8, b"\x03" * 4]
+    assert [p.timestamp for p in packets] == [100, 100, 200]
+    assert [p.rssi for p in packets] == [-70.5, -70.5, None]
+
+    assert reader.read() == []
+    assert reader.overflows == 0
+
+    with pytest.raises(ValueError):
+        ring.reader(2)
+
+
+def test_overflow(ring: PacketRing) -> None:
+    reader = ring.reader()
+
+    for i in range(10):
+        ring.write(bytes([i]) * 8, i)
+
+    packets = reader.read()
+    assert [p.sequence for p in packets] == [6, 7, 8, 9]
+    assert reader.overflows == 6
+
+
+def test_stride(ring: PacketRing) -> None:
+    readers = [ring.reader(0, 2), ring.reader(1, 2)]
+
+    for i in range(4):
+        ring.write(bytes([i]) * 8, i)
+
+    assert [p.sequence for p in readers[0].read()] == [0, 2]
+    assert [p.sequence for p in readers[1].read()] == [1, 3]
+
+
+def _consume(
+    name: str, consumer: int, out: "multiprocessing.Queue[List[bytes]]"
+) -> None:
+    ring = PacketRing.attach(name)
+    packets = ring.reader(consumer).wait(5)
+    out.put([p.packet for p in packets])
+    ring.close()
+
+
+def test_processes(ring: PacketRing) -> None:
+    out: "multiprocessing.Queue[List[bytes]]" = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_consume, args=(ring.name, 1, out))
+    process.start()
+
+    ring.write(b"\xaa" * 8, 0)
+
+    assert out.get(timeout=5) == [b"\xaa" * 8]
+    process.join()
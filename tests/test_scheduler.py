@@ -0,0 +1,72 @@
+from typing import List
+
+import pytest
+
+from conftest import FakeRadio
+
+from cc1101.config import Modulation, RXConfig
+from cc1101.scheduler import ProfileScheduler, RXProfile
+
+
+def profiles() -> List[RXProfile]:
+    return [
+        RXProfile(
+            str(frequency),
+            RXConfig.new(frequency, Modulation.FSK_2, 100, 4),
+            dwell=0.02,
+        )
+        for frequency in [315.0, 433.92, 868.3]
+    ]
+
+
+def test_run() -> None:
+    radio = FakeRadio()
+    radio.traffic = {
+        profile.rx_config.get_common_config().get_frequency(): [packet] * 4
+        for profile, packet in zip(profiles()[1:], [b"\x01" * 4, b"\x02" * 4])
+    }
+    scheduler = ProfileScheduler(radio, profiles(), adapt=False)
+
+    received = list(scheduler.run(cycles=2))
+
+    # Switched to each profile in turn with its pre-serialized config
+    assert radio.switches == [p.config_bytes for p in scheduler.profiles] * 2
+
+    # Every packet is tagged with the profile it was received with
+    assert {r.profile.name for r in received} == {"433.92", "868.3"}
+    for r in received:
+        assert (
+            r.batch.packets[0]
+            == (b"\x01" if r.profile.name == "433.92" else b"\x02") * 4
+        )
+
+    report = scheduler.report()
+    assert [r.switches for r in report] == [2, 2, 2]
+    assert report[0].packets == 0
+    assert report[1].packets == sum(
+        len(r.batch) for r in received if r.profile.name == "433.92"
+    )
+    assert sum(r.duty_cycle for r in report) == pytest.approx(1.0, abs=0.05)
+
+
+def test_reallocate() -> None:
+    radio = FakeRadio()
+    radio.traffic = {
+        profiles()[1].rx_config.get_common_config().get_frequency(): [b"\x01" * 4] * 4
+    }
+    scheduler = ProfileScheduler(radio, profiles())
+
+    list(scheduler.run(cycles=1))
+
+    # Half the cycle goes to the only profile with traffic
+    assert scheduler.dwells == pytest.approx([0.01, 0.04, 0.01])
+    assert sum(scheduler.dwells) == pytest.approx(0.06)
+
+    # Dwells return to the profile defaults when every profile is quiet
+    radio.traffic = {}
+    for _ in range(20):
+        list(scheduler.run(cycles=1))
+    assert scheduler.dwells[1] < 0.021
+
+    with pytest.raises(ValueError):
+        RXProfile("slow", RXConfig.new(433.92, Modulation.OOK, 1, 64), dwell=0.1)
@@ -0,0 +1,112 @@
+import errno
+import threading
+
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from conftest import FakeRadio
+
+from cc1101.batch import PacketBatch
+from cc1101.config import Modulation, RXConfig, TXConfig
+from cc1101.server import RadioClient, RadioServer, TXRequest
+
+RX_CONFIG = RXConfig.new(433.92, Modulation.OOK, 1, 4)
+
+
+@pytest.fixture
+def radio() -> FakeRadio:
+    return FakeRadio(RX_CONFIG)
+
+
+@pytest.fixture
+def server(tmp_path: Path, radio: FakeRadio) -> Iterator[Tuple[RadioServer, str]]:
+    path = str(tmp_path / "cc1101.sock")
+    radio_server = RadioServer([radio], latency=0.01)
+    server = radio_server.listen(path)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield radio_server, path
+    server.shutdown()
+    server.server_close()
+
+
+def test_subscribe(server: Tuple[RadioServer, str], radio: FakeRadio) -> None:
+    _, path = server
+
+    with RadioClient(path) as client:
+        assert client.subscribe("/dev/cc1101.0.0").packet_length == 4
+
+        with pytest.raises(ValueError):
+            client.subscribe("/dev/cc1101.0.1")
+
+        radio.batches.append(PacketBatch([b"\x01" * 4, b"\x02" * 4], 4, 100, -70.5))
+        radio.batches.append(PacketBatch([b"\x03" * 4], 4, 200, None, [1], 3))
+
+        received = [client.receive(), client.receive()]
+        assert [r.device for r in received] == ["/dev/cc1101.0.0"] * 2
+        assert [r.sequence for r in received] == [0, 1]
+        assert [r.batch.packets for r in received] == [
+            [b"\x01" * 4, b"\x02" * 4],
+            [b"\x03" * 4],
+        ]
+        assert [r.batch.timestamp for r in received] == [100, 200]
+        assert [r.batch.rssi for r in received] == [-70.5, None]
+        assert [r.batch.indices for r in received] == [None, [1]]
+        assert [r.batch.drained for r in received] == [2, 3]
+        assert client.lost == 0
+
+
+def test_transmit(server: Tuple[RadioServer, str], radio: FakeRadio) -> None:
+    radio_server, path = server
+    tx_config = TXConfig.from_rx_config(RX_CONFIG, 0xC0)
+    device = radio_server.devices["/dev/cc1101.0.0"]
+
+    # The server rebuilds the TXConfig from the request
+    received_config = TXConfig.from_bytes(bytes(tx_config.to_bytes()))
+    assert received_config is not None
+    config = bytes(received_config.to_bytes())
+
+    with RadioClient(path) as client:
+        client.transmit("/dev/cc1101.0.0", tx_config, b"\x01\x02")
+        assert radio.sent == [(config, b"\x01\x02")]
+
+        with pytest.raises(OSError):
+            client.transmit("/dev/cc1101.0.1", tx_config, b"\x01\x02")
+
+    # Queued packets with the same config are transmitted together
+    radio.sent = []
+    radio.tx_configs = []
+    replies = []
+
+    class Output:
+        def put(self, items: List[bytes]) -> None:
+            replies.extend(items)
+
+    for packet in [b"\x01", b"\x02", b"\x03"]:
+        device.tx_queue.append(
+            TXRequest(bytes(tx_config.to_bytes()), packet, Output())  # type: ignore
+        )
+    radio_server.transmit_queued(device)
+
+    assert radio.tx_configs == [config]
+    assert radio.sent == [(config, b"\x01"), (config, b"\x02"), (config, b"\x03")]
+    assert len(replies) == 3
+
+
+def test_device_error(server: Tuple[RadioServer, str], radio: FakeRadio) -> None:
+    radio_server, path = server
+
+    with RadioClient(path) as client:
+        client.subscribe("/dev/cc1101.0.0")
+        radio.error = OSError(errno.ENODEV, "No such device")
+
+        # The device is closed and its clients sent an error
+        with pytest.raises(ValueError):
+            client.receive()
+        assert radio_server.devices == {}
+
+        with pytest.raises(ValueError):
+            client.subscribe("/dev/cc1101.0.0")
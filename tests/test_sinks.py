@@ -0,0 +1,87 @@
+import io
+import json
+
+from cc1101.batch import PacketBatch
+from cc1101.config import Modulation, RXConfig
+from cc1101.decode import Frame
+from cc1101.protocols import Message
+from cc1101.sinks import JsonSink, MsgpackSink, pack
+
+RX_CONFIG = RXConfig.new(433.92, Modulation.OOK, 1, 2)
+BATCH = PacketBatch([b"\x01\x02", b"\x03\x04"], 2, 10**9, -70.5)
+MESSAGE = Message("nexus", {"id": 1, "temperature": 21.5}, Frame(0, 36, 100))
+
+
+def test_pack() -> None:
+    assert pack(None) == b"\xc0"
+    assert pack([True, False]) == b"\x92\xc3\xc2"
+    assert pack(1) == b"\x01"
+    assert pack(-1) == b"\xff"
+    assert pack(200) == b"\xcc\xc8"
+    assert pack(1000) == b"\xcd\x03\xe8"
+    assert pack(2**40) == b"\xcf\x00\x00\x01\x00\x00\x00\x00\x00"
+    assert pack(-100) == b"\xd0\x9c"
+    assert pack(-1000) == b"\xd1\xfc\x18"
+    assert pack(1.5) == b"\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00"
+    assert pack("abc") == b"\xa3abc"
+    assert pack("a" * 40) == b"\xd9\x28" + b"a" * 40
+    assert pack(b"\x00" * 300) == b"\xc5\x01\x2c" + b"\x00" * 300
+    assert pack({"a": 1}) == b"\x81\xa1a\x01"
+    assert pack(list(range(16)))[:3] == b"\xdc\x00\x10"
+
+
+def test_json_sink() -> None:
+    f = io.BytesIO()
+    sink = JsonSink(f, RX_CONFIG, "/dev/cc1101.0.0")
+    sink.write_batch(BATCH, [MESSAGE])
+    sink.write_batch(PacketBatch([b"\x05\x06"], 2, 2 * 10**9))
+
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+    times = [t + sink._clock_offset for t in BATCH.packet_times(sink._baud_rate)]
+
+    assert records == [
+        {
+            "device": "/dev/cc1101.0.0",
+            "fingerprint": RX_CONFIG.fingerprint(),
+            "timestamp": times[0],
+            "rssi": -70.5,
+            "payload": "0102",
+        },
+        {
+            "device": "/dev/cc1101.0.0",
+            "fingerprint": RX_CONFIG.fingerprint(),
+            "timestamp": times[1],
+            "rssi": -70.5,
+            "payload": "0304",
+            "messages": [{"protocol": "nexus", "id": 1, "temperature": 21.5}],
+        },
+        {
+            "device": "/dev/cc1101.0.0",
+            "fingerprint": RX_CONFIG.fingerprint(),
+            "timestamp": 2 * 10**9 + sink._clock_offset,
+            "rssi": None,
+            "payload": "0506",
+        },
+    ]
+    assert sink.records == 3
+
+
+def test_msgpack_sink() -> None:
+    f = io.BytesIO()
+    sink = MsgpackSink(f, RX_CONFIG, "/dev/cc1101.0.0")
+    sink.write_batch(BATCH, [MESSAGE])
+
+    times = [t + sink._clock_offset for t in BATCH.packet_times(sink._baud_rate)]
+    static = {"device": "/dev/cc1101.0.0", "fingerprint": RX_CONFIG.fingerprint()}
+
+    assert f.getvalue() == pack(
+        {**static, "timestamp": times[0], "rssi": -70.5, "payload": b"\x01\x02"}
+    ) + pack(
+        {
+            **static,
+            "timestamp": times[1],
+            "rssi": -70.5,
+            "payload": b"\x03\x04",
+            "messages": [{"protocol": "nexus", "id": 1, "temperature": 21.5}],
+        }
+    )
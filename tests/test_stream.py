@@ -0,0 +1,114 @@
+from typing import List
+
+from cc1101.batch import PacketBatch, packet_duration
+from cc1101.decode import LineCoding, PulseDecoder
+from cc1101.filters import Condition, PacketFilter
+from cc1101.stream import StreamReassembler
+
+FRAME = "10110011100011110000"
+
+DECODER = PulseDecoder(
+    LineCoding.PPM, zero=(1, 4), one=(5, 10), sync=11, lengths={len(FRAME)}
+)
+
+
+def ppm(bits: str) -> str:
+    """Render bits as PPM samples, ending with a sync gap"""
+    samples = "".join("11" + ("0" * 8 if bit == "1" else "0000") for bit in bits)
+    return samples + "11" + "0" * 16
+
+
+def packets(samples: str, packet_length: int) -> List[bytes]:
+    samples += "0" * (-len(samples) % (packet_length * 8))
+    data = int(samples, 2).to_bytes(len(samples) // 8, "big")
+    return [data[i : i + packet_length] for i in range(0, len(data), packet_length)]
+
+
+def test_packet_batch() -> None:
+    batch = PacketBatch([b"\x01\x02", b"\x03\x04"], 2, 10_000_000)
+
+    assert len(batch) == 2
+    assert list(batch) == [b"\x01\x02", b"\x03\x04"]
+    assert batch.data == b"\x01\x02\x03\x04"
+
+    assert packet_duration(2, 1) == 16_000_000
+    assert batch.packet_times(16) == [9_000_000, 10_000_000]
+
+
+def test_split_frames() -> None:
+    samples = "0" * 5 + (ppm(FRAME) + "0" * 7) * 8
+    chunks = packets(samples, 8)
+
+    # Decoding packets separately loses the frames that span packets
+    separate = [f for chunk in chunks for f in DECODER.decode(chunk)]
+    assert len(separate) < 8
+
+    stream = StreamReassembler(DECODER)
+    frames = [f for chunk in chunks for f in stream.feed_bytes(chunk)]
+
+    assert [f.bits for f in frames] == [int(FRAME, 2)] * 8
+    assert [f.end for f in frames] == [f.end for f in DECODER.decode(b"".join(chunks))]
+
+
+def test_discontinuity() -> None:
+    duration = packet_duration(8, 1)
+    chunks = packets(ppm(FRAME) * 2, 8)
+    split = len(chunks) // 2 + 1
+
+    stream = StreamReassembler(DECODER, duration)
+    first = stream.feed(PacketBatch(chunks[:split], 8, split * duration))
+    assert len(first) == 1
+
+    # Packets missing - the first half of the second frame must not be joined
+    stream.feed(PacketBatch([], 8, (split + 1) * duration))
+    late = (len(chunks) + 5) * duration
+    assert stream.feed(PacketBatch(chunks[split:], 8, late)) == []
+    assert stream.discontinuities == 1
+
+    # Continuous
+    stream = StreamReassembler(DECODER, duration)
+    stream.feed(PacketBatch(chunks[:split], 8, split * duration))
+    second = stream.feed(PacketBatch(chunks[split:], 8, len(chunks) * duration))
+    assert [f.bits for f in second] == [int(FRAME, 2)]
+    assert stream.discontinuities == 0
+
+
+def test_filtered_batch() -> None:
+    duration = packet_duration(8, 1)
+    chunks = packets(ppm(FRAME) * 3, 8)
+    timestamp = len(chunks) * duration
+
+    # Drop a packet in the middle of the second frame
+    dropped = chunks[4]
+    assert chunks.count(dropped) == 1
+    indices = PacketFilter([Condition("drop", lambda p: p != dropped)]).select(chunks)
+    batch = PacketBatch(
+        [chunks[i] for i in indices], 8, timestamp, None, indices, len(chunks)
+    )
+
+    assert not batch.contiguous
+    times = PacketBatch(chunks, 8, timestamp).packet_times(1)
+    assert batch.packet_times(1) == [times[i] for i in indices]
+
+    # The frame spanning the dropped packet must not be joined
+    expected = StreamReassembler(DECODER).feed(PacketBatch(chunks, 8, timestamp))
+    stream = StreamReassembler(DECODER, duration)
+    frames = stream.feed(batch)
+
+    assert [f.bits for f in frames] == [int(FRAME, 2)] * 2
+    assert [f.end for f in frames] == [expected[0].end, expected[2].end]
+    assert stream.discontinuities == 0
+
+    # The stream continues after the batch
+    frames = stream.feed(PacketBatch(chunks, 8, 2 * timestamp))
+    assert [f.end for f in frames] == [f.end + len(chunks) * 64 for f in expected]
+    assert stream.discontinuities == 0
+
+
+def test_max_carry() -> None:
+    stream = StreamReassembler(DECODER, max_carry=64)
+
+    for _ in range(10):
+        assert stream.feed_bytes(b"\x33" * 32) == []
+
+    assert stream._carry_length <= 64
@@ -0,0 +1,74 @@
+import random
+
+from typing import List
+
+import pytest
+
+from cc1101.sync import SyncSearcher
+
+SYNC = 0xD391D391
+
+
+def place(length: int, pattern: int, pattern_length: int, offsets: List[int]) -> bytes:
+    """Place a pattern at bit offsets in random data"""
+    rng = random.Random(length)
+    value = rng.getrandbits(length)
+
+    for offset in offsets:
+        shift = length - offset - pattern_length
+        value &= ~(((1 << pattern_length) - 1) << shift)
+        value |= pattern << shift
+
+    return value.to_bytes(length // 8, "big")
+
+
+def brute_force(data: bytes, pattern: int, length: int, max_errors: int) -> List[int]:
+    bits = format(int.from_bytes(data, "big"), f"0{len(data) * 8}b")
+    target = format(pattern, f"0{length}b")
+
+    return [
+        i
+        for i in range(len(bits) - length + 1)
+        if sum(a != b for a, b in zip(bits[i : i + length], target)) <= max_errors
+    ]
+
+
+@pytest.mark.parametrize("max_errors", [0, 1, 3])
+def test_search(max_errors: int) -> None:
+    offsets = [3, 100, 517, 1024, 2000]
+    data = place(4096, SYNC, 32, offsets)
+
+    searcher = SyncSearcher(SYNC, 32, max_errors)
+    matches = searcher.search(data)
+
+    assert set(offsets) <= set(matches)
+    assert matches == brute_force(data, SYNC, 32, max_errors)
+
+
+def test_short_pattern() -> None:
+    data = place(512, 0b101100111, 9, [0, 77, 503])
+
+    for max_errors in [0, 1]:
+        searcher = SyncSearcher(0b101100111, 9, max_errors)
+        assert searcher.search(data) == brute_force(data, 0b101100111, 9, max_errors)
+
+
+def test_bit_errors() -> None:
+    # Two bits of the sync corrupted
+    data = place(256, SYNC ^ 0x00100400, 32, [50])
+
+    assert 50 not in SyncSearcher(SYNC, 32, 1).search(data)
+    assert 50 in SyncSearcher(SYNC, 32, 2).search(data)
+
+
+def test_feed() -> None:
+    offsets = [10, 250, 508, 1020, 1500]
+    data = place(2048, SYNC, 32, offsets)
+
+    searcher = SyncSearcher(SYNC, 32)
+    matches = []
+    for i in range(0, len(data), 32):
+        matches += searcher.feed(data[i : i + 32])
+
+    assert matches == searcher.search(data)
+    assert set(offsets) <= set(matches)
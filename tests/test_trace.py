@@ -0,0 +1,36 @@
+import errno
+
+from cc1101.ioctl import IOCTL
+from cc1101.trace import Opcode, TraceRing, format_timeline, load
+
+
+def test_ring_wrap() -> None:
+    ring = TraceRing(4)
+
+    for i in range(3):
+        ring.record(Opcode.READ, -1, 64, 0, i, 1)
+
+    assert [e[0] for e in ring.events()] == [0, 1, 2]
+
+    for i in range(3, 10):
+        ring.record(Opcode.READ, -1, 64, 0, i, 1)
+
+    assert [e[0] for e in ring.events()] == [6, 7, 8, 9]
+    assert ring.count == 10
+
+
+def test_dump_load(tmp_path) -> None:  # type: ignore
+    ring = TraceRing(8)
+    ring.record(Opcode.OPEN, -1, 0, 0, 1000, 500)
+    ring.record(Opcode.IOCTL, IOCTL.SET_RX_CONF, 20, 0, 2000, 3000)
+    ring.record(Opcode.READ, -1, 1024, errno.EMSGSIZE, 6000, 1000)
+
+    path = str(tmp_path / "rx.trace")
+    ring.dump(path)
+    events = load(path)
+
+    assert events == ring.events()
+
+    timeline = format_timeline(events)
+    assert "IOCTL SET_RX_CONF" in timeline[1]
+    assert timeline[2].endswith("EMSGSIZE")